@@ -0,0 +1,649 @@
+#!/bin/python
+import os
+import sys
+import time
+import json
+import platform
+import argparse
+import shutil
+import tempfile
+import subprocess
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["SIMPLECOLORPICKER_HISTORY"] = os.path.join(tempfile.gettempdir(), "SimpleColorPicker-benchmark-history.bin")
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QColor, QMouseEvent, QWheelEvent
+from PyQt5.QtCore import Qt, QRect, QPoint, QPointF, QEvent, QT_VERSION_STR
+import capture
+
+
+benchmarks = {}
+COUNTER_KEYS = [ "events", "handled", "updates" ]
+
+
+def benchmark(name):
+    def register(func):
+        benchmarks[name] = func
+        return func
+    return register
+
+
+def measure(func, repeat, warmup=10) -> dict:
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "mean_us": sum(samples) / len(samples) * 1e6,
+        "p50_us": samples[len(samples) // 2] * 1e6,
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1e6,
+        "min_us": samples[0] * 1e6,
+    }
+
+
+class StubCaptureBackend(capture.CaptureBackend):
+    name = "stub"
+
+    def __init__(self):
+        super(StubCaptureBackend, self).__init__()
+        self.images = {}
+
+
+    def available(self) -> bool:
+        return True
+
+
+    def grab(self, entry, rect) -> QImage:
+        image = self.images.get((rect.width(), rect.height()))
+        if image is None:
+            image = QImage(rect.width(), rect.height(), QImage.Format.Format_RGB32)
+            for y in range(rect.height()):
+                for x in range(rect.width()):
+                    image.setPixel(x, y, QColor.fromHsv((x * 8 + y * 3) % 360, 200, 220).rgb())
+            self.images[(rect.width(), rect.height())] = image
+        self.grabs += 1
+        self.allocations += 1
+        return image.copy()
+
+
+def mouse_move(x, y) -> QMouseEvent:
+    return QMouseEvent(QEvent.Type.MouseMove, QPointF(x, y), Qt.MouseButton.NoButton, Qt.MouseButton.LeftButton, Qt.KeyboardModifier.NoModifier)
+
+
+def wheel(delta) -> QWheelEvent:
+    return QWheelEvent(QPointF(0, 0), QPointF(0, 0), QPoint(0, 0), QPoint(0, delta), Qt.MouseButton.NoButton, Qt.KeyboardModifier.NoModifier, Qt.ScrollPhase.NoScrollPhase, False)
+
+
+@benchmark("main_window")
+def bench_main_window(args):
+    import main
+    import colors
+    window = main.MainWindow()
+    window.show()
+    QApplication.processEvents()
+    steps = iter(range(10 ** 9))
+
+    def color_update():
+        step = next(steps)
+        window.current_color = colors.Color.from_rgb(step % 256, (step * 7) % 256, (step * 13) % 256)
+        window.on_color_updated()
+        window.apply_color_update()
+
+    def schedule_only():
+        step = next(steps)
+        window.current_color = colors.Color.from_rgb(step % 256, 128, 64)
+        window.on_color_updated()
+
+    def main_gradient_drag():
+        step = next(steps)
+        window.main_gradient.mouseMoveEvent(mouse_move(step % 370, (step * 3) % 370))
+        window.main_gradient.mouseMoveEvent.flush()
+        window.apply_color_update()
+
+    def hue_drag():
+        window.hue_gradient.mouseMoveEvent(mouse_move(15, next(steps) % window.hue_gradient.height()))
+        window.hue_gradient.mouseMoveEvent.flush()
+        window.apply_color_update()
+
+    def hue_scroll():
+        window.hue_gradient.wheelEvent(wheel(120 if next(steps) % 200 < 100 else -120))
+        window.hue_gradient.wheelEvent.flush()
+        window.apply_color_update()
+
+    def hex_typing():
+        name = "{:06X}".format((next(steps) * 104729) % 0x1000000)
+        window.hex_line_edit.setText("")
+        for digit in name:
+            window.hex_line_edit.insert(digit)
+        window.apply_color_update()
+
+    results = {
+        "on_color_updated": measure(color_update, args.repeat),
+        "on_color_updated_deferred": measure(schedule_only, args.repeat),
+        "main_gradient_drag": measure(main_gradient_drag, args.repeat),
+        "hue_gradient_drag": measure(hue_drag, args.repeat),
+        "hue_gradient_scroll": measure(hue_scroll, args.repeat),
+        "hex_typing_burst": measure(hex_typing, args.repeat),
+    }
+    window.update_timer.stop()
+    window.hide()
+    return results
+
+
+@benchmark("input_compression")
+def bench_input_compression(args):
+    import main
+    import colors
+    window = main.MainWindow()
+    window.show()
+    QApplication.processEvents()
+
+    def run(send, rate, duration, done=lambda: False):
+        updates = window.update_timer
+        start = time.perf_counter()
+        sent = 0
+        applied = 0
+        while time.perf_counter() - start < duration and not done():
+            send(sent)
+            sent += 1
+            deadline = start + sent / rate
+            while time.perf_counter() < deadline:
+                active = updates.isActive()
+                QApplication.processEvents()
+                applied += active and not updates.isActive()
+        return sent, applied, time.perf_counter() - start
+
+    height = window.hue_gradient.height()
+    drag = window.hue_gradient.mouseMoveEvent
+    sent, applied, elapsed = run(lambda i: drag(mouse_move(15, i % height)), 1000, 1.0)
+    results = { "hue_drag_1khz": { "events": sent, "handled": drag.delivered, "updates": applied, "elapsed_ms": elapsed * 1000 } }
+
+    window.current_color = colors.Color.from_hsv(0, 255, 255)
+    window.on_color_updated()
+    scroll = window.hue_gradient.wheelEvent
+    sent, applied, elapsed = run(lambda i: scroll(wheel(120)), 100, 10.0, lambda: window.current_hsv[0] == 359)
+    results["hue_wheel_traverse"] = { "events": sent, "handled": scroll.delivered, "updates": applied, "elapsed_ms": elapsed * 1000 }
+    window.update_timer.stop()
+    window.hide()
+    return results
+
+
+@benchmark("black_out")
+def bench_black_out(args):
+    import picker
+    window = picker.PickerWindow(None)
+    image = QImage(44, 44, QImage.Format.Format_RGB32)
+    image.fill(Qt.GlobalColor.white)
+    width = window.width()
+    height = window.height()
+    cases = {
+        "centre": QRect(width // 2, height // 2, 44, 44),
+        "edge": QRect(-30, height // 2, 44, 44),
+        "corner": QRect(width - 14, height - 14, 44, 44),
+    }
+    return { name: measure(lambda: capture.black_out_image(image, rect, window.screens.region), args.repeat) for name, rect in cases.items() }
+
+
+@benchmark("picker_frame")
+def bench_picker_frame(args):
+    import picker
+    window = picker.PickerWindow(None)
+    window.capture.backend = StubCaptureBackend()
+    rect = window.screens.virtual_rect
+    cases = {
+        "centre": (rect.center().x(), rect.center().y()),
+        "edge": (rect.x() + 2, rect.center().y()),
+        "corner": (rect.right() - 2, rect.bottom() - 2),
+    }
+    window.cursorX, window.cursorY = cases["centre"]
+    window.show()
+    QApplication.processEvents()
+    results = {}
+    for name, position in cases.items():
+        request = window.capture.make_request(position, window.screens.screen_at(*position), window.screens.region)
+        results["capture_" + name] = measure(lambda: window.capture.capture(request), args.repeat)
+        window.set_frame(window.capture.capture(request))
+        results["paint_" + name] = measure(window.repaint, args.repeat)
+
+    positions = iter(range(10 ** 9))
+
+    def pipeline():
+        presented = window.capture.buffer.presented
+        window.update_painter((cases["centre"][0] + next(positions) % 50, cases["centre"][1]))
+        while window.capture.buffer.presented == presented:
+            QApplication.processEvents()
+
+    results["pipeline"] = measure(pipeline, args.repeat)
+    results["pipeline"].update(window.capture.statistics())
+    window.hide()
+    return results
+
+
+@benchmark("picker_modes")
+def bench_picker_modes(args):
+    import picker
+    results = {}
+    for name, follow_cursor in [ ("overlay", False), ("follow_cursor", True) ]:
+        window = picker.PickerWindow(None, follow_cursor)
+        window.capture.backend = StubCaptureBackend()
+        centre = window.screens.virtual_rect.center()
+        window.cursorX = centre.x()
+        window.cursorY = centre.y()
+        window.show()
+        QApplication.processEvents()
+        positions = iter(range(10 ** 9))
+
+        def frame():
+            position = (centre.x() + next(positions) % 50, centre.y())
+            request = window.capture.make_request(position, window.screens.screen_at(*position), window.screens.region)
+            window.set_frame(window.capture.capture(request))
+            window.repaint() if follow_cursor else window.repaint(window.magnifier_rect())
+
+        results[name] = measure(frame, args.repeat)
+        results[name]["backing_store_kib"] = window.backing_store_bytes() / 1024.0
+        window.hide()
+    return results
+
+
+@benchmark("recording")
+def bench_recording(args):
+    import shutil
+    import numpy as np
+    import picker
+    import recording
+    ring = recording.SampleRing(10 ** 6)
+    results = { "ring_push": measure(lambda: ring.push(time.time(), 10, 20, 30, 40, 50), args.repeat) }
+
+    recorder = recording.Recorder()
+    recorder.ring = ring
+    records = np.zeros(10000, dtype=recording.RECORD_DTYPE)
+    with open(os.devnull, "wb") as recorder.stream:
+        for file_format in recording.FORMATS:
+            recorder.file_format = file_format
+            results["write_{}_10k".format(file_format)] = measure(lambda: recorder.write(records), 20, warmup=2)
+
+    window = picker.PickerWindow(None)
+    window.capture.backend = StubCaptureBackend()
+    window.recorder = recording.Recorder(rate=1000, backend=StubCaptureBackend())
+    centre = window.screens.virtual_rect.center()
+    window.show()
+    QApplication.processEvents()
+    positions = iter(range(10 ** 9))
+
+    def pipeline():
+        presented = window.capture.buffer.presented
+        window.update_painter((centre.x() + next(positions) % 50, centre.y()))
+        while window.capture.buffer.presented == presented:
+            QApplication.processEvents()
+
+    results["pipeline_idle"] = measure(pipeline, args.repeat)
+    directory = tempfile.mkdtemp(prefix="SimpleColorPicker-benchmark-")
+    try:
+        position = (centre.x(), centre.y())
+        window.recorder.start_recording((position, window.screens.screen_at(*position)), directory=directory, file_format="bin")
+        results["pipeline_recording_1khz"] = measure(pipeline, args.repeat)
+        window.recorder.stop_recording()
+        results["pipeline_recording_1khz"].update(window.recorder.statistics())
+        del results["pipeline_recording_1khz"]["recording"]
+    finally:
+        window.hide()
+        shutil.rmtree(directory)
+    return results
+
+
+@benchmark("palette")
+def bench_palette(args):
+    import numpy as np
+    import palette
+    random = np.random.default_rng(0)
+    base = np.array([ [ 200, 30, 40 ], [ 20, 120, 200 ], [ 240, 240, 230 ], [ 30, 30, 30 ], [ 90, 180, 60 ], [ 250, 200, 40 ] ])
+    blocks = random.integers(0, len(base), size=(40, 60))
+    labels = np.repeat(np.repeat(blocks, 100, axis=0), 100, axis=1)
+    pixels = np.clip(base[labels] + random.normal(0, 8, labels.shape + (3,)), 0, 255).astype(np.uint8)
+    repeat = max(3, args.repeat // 100)
+    results = {
+        "median_cut_24mp_array": measure(lambda: palette.extract(pixels, 8, "median-cut"), repeat, warmup=1),
+        "kmeans_24mp_array": measure(lambda: palette.extract(pixels, 8, "k-means"), repeat, warmup=1),
+    }
+
+    argb = np.empty(labels.shape + (4,), dtype=np.uint8)
+    argb[..., capture.RGB_CHANNELS] = pixels
+    argb[..., 3 if capture.RGB_CHANNELS[0] == 2 else 0] = 255
+    path = os.path.join(tempfile.gettempdir(), "SimpleColorPicker-benchmark-24mp.jpg")
+    QImage(argb.data, labels.shape[1], labels.shape[0], labels.shape[1] * 4, QImage.Format.Format_RGB32).save(path, "JPG", 90)
+    del argb
+    try:
+        results["load_24mp_jpeg"] = measure(lambda: palette.load_pixels(path), repeat, warmup=1)
+        results["kmeans_24mp_jpeg"] = measure(lambda: palette.extract(path, 8, "k-means"), repeat, warmup=1)
+
+        extractor = palette.PaletteExtractor()
+        done = []
+        extractor.finished.connect(lambda source, colors: done.append(colors))
+        gaps = []
+        for _ in range(repeat):
+            extractor.extract(path, 8, "k-means")
+            count = len(done)
+            last = time.perf_counter()
+            while len(done) == count:
+                QApplication.processEvents()
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+        extractor.shutdown()
+        gaps.sort()
+        results["event_loop_during_extraction"] = {
+            "mean_us": sum(gaps) / len(gaps) * 1e6,
+            "p50_us": gaps[len(gaps) // 2] * 1e6,
+            "p95_us": gaps[int(len(gaps) * 0.95)] * 1e6,
+            "min_us": gaps[0] * 1e6,
+            "max_us": gaps[-1] * 1e6,
+        }
+    finally:
+        os.remove(path)
+    return results
+
+
+@benchmark("matching")
+def bench_matching(args):
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    import matching
+    random = np.random.default_rng(0)
+    blocks = random.integers(0, 256, size=(72, 128, 4), dtype=np.uint8)
+    pixels = np.ascontiguousarray(np.repeat(np.repeat(blocks, 30, axis=0), 30, axis=1))
+    frame = QImage(pixels.data, 3840, 2160, 3840 * 4, QImage.Format.Format_RGB32).copy()
+    rgb = tuple(pixels[1000, 1000, capture.RGB_CHANNELS].tolist())
+    highlight = matching.highlight_color(rgb).rgba()
+    repeat = max(5, args.repeat // 50)
+    results = {}
+    for workers in sorted(set([ 1, min(8, os.cpu_count() or 1) ])):
+        pool = ThreadPoolExecutor(max_workers=workers)
+        for tolerance in [ 0, 8 ]:
+            results["4k_tolerance{}_workers{}".format(tolerance, workers)] = measure(lambda: matching.match_images(pool, [ frame ], rgb, tolerance, highlight), repeat, warmup=2)
+        results["dual_4k_workers{}".format(workers)] = measure(lambda: matching.match_images(pool, [ frame, frame ], rgb, 8, highlight), repeat, warmup=2)
+        pool.shutdown()
+    results["tables"] = measure(lambda: matching.channel_tables(rgb, 8), args.repeat // 10)
+    return results
+
+
+@benchmark("capture_backends")
+def bench_capture_backends(args):
+    import screens
+    index = screens.ScreenIndex()
+    centre = index.virtual_rect.center()
+    entry = index.screen_at(centre.x(), centre.y())
+    rect = QRect(centre.x() - 22, centre.y() - 22, 44, 44)
+    results = {}
+    for backend_class in capture.BACKENDS:
+        backend = backend_class()
+        if not backend.available():
+            print("{}: not available on {}".format(backend.name, QApplication.platformName()))
+            continue
+        results[backend.name] = measure(lambda: backend.grab(entry, rect), args.repeat)
+        results[backend.name]["grabs_per_second"] = 1e6 / results[backend.name]["mean_us"]
+        results[backend.name]["allocations_per_grab"] = backend.statistics()["allocations_per_grab"]
+        backend.close()
+    return results
+
+
+@benchmark("sampling")
+def bench_sampling(args):
+    image = QImage(88, 88, QImage.Format.Format_RGB32)
+    image.fill(Qt.GlobalColor.darkCyan)
+    results = { "pixel": measure(lambda: image.pixel(44, 44), args.repeat) }
+    for size in capture.KERNEL_SIZES:
+        results["mean_{0}x{0}".format(size)] = measure(lambda: capture.sample_color(image, size), args.repeat)
+        results["median_{0}x{0}".format(size)] = measure(lambda: capture.sample_color(image, size, True), args.repeat)
+    return results
+
+
+@benchmark("screen_lookup")
+def bench_screen_lookup(args):
+    import screens
+    index = screens.ScreenIndex()
+    rect = index.virtual_rect
+    points = iter(range(10 ** 9))
+
+    def moving():
+        offset = next(points)
+        index.screen_at(rect.x() + offset % rect.width(), rect.y() + offset % rect.height())
+
+    return {
+        "screen_index": measure(lambda: index.screen_at(rect.center().x(), rect.center().y()), args.repeat),
+        "screen_index_moving": measure(moving, args.repeat),
+        "outside": measure(lambda: index.screen_at(rect.x() - 10, rect.y() - 10), args.repeat),
+    }
+
+
+@benchmark("instrumentation")
+def bench_instrumentation(args):
+    import instrumentation
+
+    def noop():
+        pass
+
+    timed = instrumentation.timed("benchmark.noop", noop)
+    results = {
+        "disabled": measure(noop, args.repeat),
+        "timed": measure(timed, args.repeat),
+        "statistics": measure(instrumentation.statistics, args.repeat),
+    }
+    del instrumentation.timings["benchmark.noop"]
+    return results
+
+
+@benchmark("history")
+def bench_history(args):
+    import numpy as np
+    import history
+    path = os.path.join(tempfile.gettempdir(), "SimpleColorPicker-benchmark-history-large.bin")
+    records = np.zeros(300000, dtype=history.RECORD_DTYPE)
+    records["time"] = time.time() - np.arange(len(records))[::-1]
+    records["red"] = np.arange(len(records)) % 256
+    with open(path, "wb") as stream:
+        stream.write(history.HEADER.pack(history.MAGIC, history.VERSION, history.RECORD.size))
+        stream.write(records.tobytes())
+
+    stores = []
+
+    def open_store():
+        stores.append(history.HistoryStore(path, max_records=len(records)))
+
+    results = { "open_300k": measure(open_store, 20, warmup=2) }
+    model = history.HistoryModel(stores[-1])
+    rows = iter(range(10 ** 9))
+    results["model_data"] = measure(lambda: model.data(model.index(next(rows) % 40), Qt.ItemDataRole.DisplayRole), args.repeat)
+    values = iter(range(10 ** 9))
+    results["append"] = measure(lambda: model.add((next(values) % 256, 1, 2), history.EDITED), args.repeat)
+    stores[-1].close()
+    results["append"]["written"] = stores[-1].written
+    stores.clear()
+    os.remove(path)
+    return results
+
+
+@benchmark("names")
+def bench_names(args):
+    import numpy as np
+    import names
+    rgb = np.random.default_rng(0).integers(0, 256, size=(100000, 3)).tolist()
+    entries = [ ("name{}".format(i), tuple(value)) for i, value in enumerate(rgb) ] + names.css_colors()
+    index = names.NameIndex.build(entries)
+    queries = iter(rgb * 100)
+    cached = iter([ (40, 160, 200), (41, 160, 200) ] * (args.repeat + 10))
+    return {
+        "build_100k": measure(lambda: names.NameIndex.build(entries), 3, warmup=1),
+        "nearest_100k": measure(lambda: index.find_nearest(*next(queries)), args.repeat),
+        "nearest_cached": measure(lambda: index.nearest(*next(cached)), args.repeat),
+    }
+
+
+@benchmark("plane_cache")
+def bench_plane_cache(args):
+    import gradients
+    plane = gradients.SaturationValuePlane(370, 370)
+    hues = iter(range(10 ** 9))
+    cold = measure(lambda: plane.set_hue(next(hues) % 360), 360, warmup=0)
+    plane.cache.clear()
+    for hue in range(30):
+        plane.set_hue(hue)
+    hues = iter(range(10 ** 9))
+    warm = measure(lambda: plane.set_hue(next(hues) % 30), args.repeat)
+    return { "miss": cold, "hit": warm }
+
+
+@benchmark("colors")
+def bench_colors(args):
+    import numpy as np
+    import colors
+    rgb = np.random.default_rng(0).integers(0, 256, size=(1000000, 3), dtype=np.uint8)
+    hsv = colors.rgb_to_hsv(rgb, achromatic_hue=0)
+    names = colors.rgb_to_hex(rgb)
+    repeat = max(1, args.repeat // 100)
+    return {
+        "rgb_to_hsv_1m": measure(lambda: colors.rgb_to_hsv(rgb), repeat, warmup=1),
+        "hsv_to_rgb_1m": measure(lambda: colors.hsv_to_rgb(hsv), repeat, warmup=1),
+        "rgb_to_hex_1m": measure(lambda: colors.rgb_to_hex(rgb), repeat, warmup=1),
+        "hex_to_rgb_1m": measure(lambda: colors.hex_to_rgb(names), repeat, warmup=1),
+        "color_from_rgb": measure(lambda: colors.Color.from_rgb(40, 160, 200), args.repeat),
+    }
+
+
+@benchmark("perceptual")
+def bench_perceptual(args):
+    import numpy as np
+    import colors
+    import gradients
+    rgb = np.random.default_rng(0).integers(0, 256, size=(1000000, 3), dtype=np.uint8)
+    lab = colors.rgb_to_lab(rgb)
+    lch = colors.rgb_to_oklch(rgb)
+    repeat = max(1, args.repeat // 100)
+    results = {
+        "rgb_to_lab_1m": measure(lambda: colors.rgb_to_lab(rgb), repeat, warmup=1),
+        "lab_to_rgb_1m": measure(lambda: colors.lab_to_rgb(lab), repeat, warmup=1),
+        "rgb_to_oklch_1m": measure(lambda: colors.rgb_to_oklch(rgb), repeat, warmup=1),
+        "oklch_to_rgb_1m": measure(lambda: colors.oklch_to_rgb(lch), repeat, warmup=1),
+    }
+    linear = colors.SRGB_LINEAR[rgb]
+    reference = np.cbrt(linear @ colors.OKLAB_LMS.T) @ colors.OKLAB_LAB.T
+    results["rgb_to_lab_1m"]["round_trip_error"] = float(np.abs(colors.lab_to_rgb(lab).astype(np.int32) - rgb).max())
+    results["rgb_to_oklch_1m"]["oklab_error"] = float(np.abs(colors.rgb_to_oklab(rgb) - reference).max())
+    results["oklch_to_rgb_1m"]["round_trip_error"] = float(np.abs(colors.oklch_to_rgb(lch).astype(np.int32) - rgb).max())
+
+    values = iter(range(10 ** 9))
+    stops = lambda v: [ (0, QColor(0, v % 256, 40)), (1, QColor(255, v % 256, 40)) ]
+    results["rgb_gradient"] = measure(lambda: gradients.render_linear_gradient(310, 20, stops(next(values)), False), args.repeat)
+    results["lab_gradient"] = measure(lambda: gradients.render_channel_gradient(310, 20, [ 50.0, next(values) % 100, 20.0 ], 0, 0.0, 100.0, colors.lab_to_rgb), args.repeat)
+    results["oklch_gradient"] = measure(lambda: gradients.render_channel_gradient(310, 20, [ 0.6, 0.15, next(values) % 360 ], 2, 0.0, 360.0, colors.oklch_to_rgb), args.repeat)
+    return results
+
+
+@benchmark("daemon")
+def bench_daemon(args):
+    import daemon
+    directory = tempfile.mkdtemp(prefix="SimpleColorPicker-benchmark-")
+    os.environ["SIMPLECOLORPICKER_SOCKET"] = os.path.join(directory, "daemon.sock")
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    process = subprocess.Popen([ sys.executable, main_path, "--daemon" ])
+    try:
+        deadline = time.perf_counter() + 20.0
+        while not daemon.is_running():
+            if time.perf_counter() > deadline or process.poll() is not None:
+                raise RuntimeError("daemon did not start")
+            time.sleep(0.05)
+
+        round_trip = measure(lambda: daemon.send_command("last"), args.repeat)
+        client = measure(lambda: subprocess.run([ sys.executable, main_path, "last" ], stdout=subprocess.DEVNULL, check=True), 20, warmup=2)
+        return { "round_trip": round_trip, "client_process": client }
+    finally:
+        try:
+            daemon.send_command("quit")
+        except OSError:
+            process.terminate()
+        process.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def compared_keys(result) -> list:
+    if "p50_us" in result:
+        return [ ("p50_us", "us") ]
+    return [ (key, "") for key in COUNTER_KEYS if key in result ]
+
+
+def compare(results, baseline, tolerance) -> list:
+    regressions = []
+    for case, result in sorted(results.items()):
+        reference = baseline.get(case)
+        if reference is None:
+            continue
+        for key, unit in compared_keys(result):
+            if reference.get(key, 0.0) <= 0.0:
+                continue
+            ratio = result[key] / reference[key]
+            status = "REGRESSION" if ratio > 1.0 + tolerance else "ok"
+            print("{:<36} {:<7} {:>10.1f} {:<2}   baseline {:>10.1f} {:<2}   {:>+7.1f}%   {}".format(
+                case, key.replace("_us", ""), result[key], unit, reference[key], unit, (ratio - 1.0) * 100, status))
+            if status != "ok" and case not in regressions:
+                regressions.append(case)
+    return regressions
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description="SimpleColorPicker benchmarks")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON ('-' for stdout)")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a JSON file from --json and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown against the baseline (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    app = QApplication(sys.argv[:1])
+    results = {}
+    for name in args.names or list(benchmarks):
+        if name not in benchmarks:
+            parser.error("unknown benchmark: {}".format(name))
+        for case, result in benchmarks[name](args).items():
+            results[name + "/" + case] = result
+            extra = "".join("   {} {:.1f}".format(key, value) for key, value in result.items() if not key.endswith("_us"))
+            if "p50_us" in result:
+                line = "{:<36} mean {:>10.1f} us   p50 {:>10.1f} us   p95 {:>10.1f} us{}".format(
+                    name + "/" + case, result["mean_us"], result["p50_us"], result["p95_us"], extra)
+            else:
+                line = "{:<36}{}".format(name + "/" + case, extra)
+            print(line, file=sys.stderr if args.json == "-" else sys.stdout)
+    app.processEvents()
+
+    if args.json:
+        report = {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "qpa": QApplication.platformName(),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2, sort_keys=True)
+            print()
+        else:
+            with open(args.json, "w") as stream:
+                json.dump(report, stream, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, "r") as stream:
+            baseline = json.load(stream)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("{} benchmark(s) regressed by more than {:.0f}%: {}".format(len(regressions), args.tolerance * 100, ", ".join(regressions)), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,547 @@
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import threading
+from collections import deque
+import numpy as np
+from PyQt5.QtGui import QGuiApplication, QImage, QPainter, QColor, QRegion
+from PyQt5.QtCore import Qt, QThread, QRect, QPoint, pyqtSignal
+from PyQt5.sip import voidptr
+import instrumentation
+
+
+BACKEND_VARIABLE = "SIMPLECOLORPICKER_CAPTURE"
+CALIBRATION_GRABS = 20
+KERNEL_SIZES = [ 1, 3, 5, 11 ]
+RGB_CHANNELS = [ 2, 1, 0 ] if sys.byteorder == "little" else [ 1, 2, 3 ]
+ALPHA_MASK = 0xFF000000
+PIXEL_FORMATS = [ QImage.Format.Format_RGB32, QImage.Format.Format_ARGB32, QImage.Format.Format_ARGB32_Premultiplied ]
+
+
+def black_out_image(image, capture_rect, region):
+    hidden = QRegion(capture_rect).subtracted(region)
+    if hidden.isEmpty():
+        return image
+
+    hidden.translate(-capture_rect.x(), -capture_rect.y())
+    painter = QPainter(image)
+    painter.scale(image.width() / capture_rect.width(), image.height() / capture_rect.height())
+    painter.setClipRegion(hidden)
+    painter.fillRect(QRect(QPoint(0, 0), capture_rect.size()), Qt.GlobalColor.black)
+    painter.end()
+    return image
+
+
+def image_array(image) -> np.ndarray:
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    pixels = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine() // 4, 4)
+    return pixels[:, :image.width()]
+
+
+def fill_alpha(image) -> QImage:
+    bits = image.bits()
+    bits.setsize(image.sizeInBytes())
+    pixels = np.frombuffer(bits, dtype=np.uint32)
+    pixels |= np.uint32(ALPHA_MASK)
+    return image
+
+
+def sample_color(image, size=1, median=False) -> QColor:
+    if size == 1:
+        return QColor(image.pixel(image.width() // 2, image.height() // 2))
+    if image.format() not in PIXEL_FORMATS:
+        image = image.convertToFormat(QImage.Format.Format_RGB32)
+
+    half = size // 2
+    x = image.width() // 2
+    y = image.height() // 2
+    pixels = image_array(image)[max(0, y - half):y + half + 1, max(0, x - half):x + half + 1, RGB_CHANNELS]
+    pixels = pixels.reshape(-1, 3)
+    values = np.median(pixels, axis=0) if median else pixels.mean(axis=0)
+    red, green, blue = np.rint(values).astype(int).tolist()
+    return QColor(red, green, blue)
+
+
+def percentile(samples, fraction) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ImagePool:
+
+    def __init__(self, size=3):
+        self.images = [ QImage() for _ in range(size) ]
+        self.allocations = 0
+
+
+    def get(self, width, height) -> QImage:
+        for image in self.images:
+            if image.width() == width and image.height() == height and image.isDetached():
+                return image
+
+        for i, image in enumerate(self.images):
+            if image.isNull() or image.isDetached():
+                self.images[i] = QImage(width, height, QImage.Format.Format_RGB32)
+                self.allocations += 1
+                return self.images[i]
+
+        self.allocations += 1
+        return QImage(width, height, QImage.Format.Format_RGB32)
+
+
+class CaptureBackend:
+    name = "none"
+
+    def __init__(self):
+        self.grabs = 0
+        self.allocations = 0
+
+
+    def available(self) -> bool:
+        return False
+
+
+    def grab(self, entry, rect) -> QImage:
+        raise NotImplementedError
+
+
+    def close(self):
+        pass
+
+
+    def statistics(self) -> dict:
+        return {
+            "grabs": self.grabs,
+            "allocations": self.allocations,
+            "allocations_per_grab": self.allocations / self.grabs if self.grabs else 0.0,
+        }
+
+
+class QtCaptureBackend(CaptureBackend):
+    name = "qt"
+
+    def available(self) -> bool:
+        return True
+
+
+    def grab(self, entry, rect) -> QImage:
+        local = entry.local_point(rect.x(), rect.y())
+        image = entry.screen.grabWindow(voidptr(0), local.x(), local.y(), rect.width(), rect.height()).toImage()
+        self.grabs += 1
+        self.allocations += 1
+        return image
+
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+class XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+
+X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+Z_PIXMAP = 2
+ALL_PLANES = 0xffffffff
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+
+class XShmCaptureBackend(CaptureBackend):
+    name = "xshm"
+
+    def __init__(self):
+        super(XShmCaptureBackend, self).__init__()
+        self.display = None
+        self.ximage = None
+        self.segment = None
+        self.attached = False
+        self.pool = ImagePool()
+        self.errors = 0
+        self.error_handler = X_ERROR_HANDLER(self.on_x_error)
+
+
+    def on_x_error(self, display, event):
+        self.errors += 1
+        return 0
+
+
+    def load(self) -> bool:
+        names = [ ctypes.util.find_library(name) for name in [ "X11", "Xext", "c" ] ]
+        if not all(names):
+            return False
+        try:
+            self.x11, self.xext, self.libc = [ ctypes.CDLL(name) for name in names ]
+        except OSError:
+            return False
+
+        self.x11.XOpenDisplay.restype = ctypes.c_void_p
+        self.x11.XOpenDisplay.argtypes = [ ctypes.c_char_p ]
+        self.x11.XCloseDisplay.argtypes = [ ctypes.c_void_p ]
+        self.x11.XDefaultScreen.argtypes = [ ctypes.c_void_p ]
+        self.x11.XRootWindow.restype = ctypes.c_ulong
+        self.x11.XRootWindow.argtypes = [ ctypes.c_void_p, ctypes.c_int ]
+        self.x11.XDefaultVisual.restype = ctypes.c_void_p
+        self.x11.XDefaultVisual.argtypes = [ ctypes.c_void_p, ctypes.c_int ]
+        self.x11.XDefaultDepth.argtypes = [ ctypes.c_void_p, ctypes.c_int ]
+        self.x11.XDisplayWidth.argtypes = [ ctypes.c_void_p, ctypes.c_int ]
+        self.x11.XDisplayHeight.argtypes = [ ctypes.c_void_p, ctypes.c_int ]
+        self.x11.XSync.argtypes = [ ctypes.c_void_p, ctypes.c_int ]
+        self.x11.XFree.argtypes = [ ctypes.c_void_p ]
+        self.x11.XSetErrorHandler.restype = ctypes.c_void_p
+        self.x11.XSetErrorHandler.argtypes = [ ctypes.c_void_p ]
+        self.xext.XShmQueryExtension.argtypes = [ ctypes.c_void_p ]
+        self.xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        self.xext.XShmCreateImage.argtypes = [ ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint ]
+        self.xext.XShmAttach.argtypes = [ ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo) ]
+        self.xext.XShmDetach.argtypes = [ ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo) ]
+        self.xext.XShmGetImage.argtypes = [ ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong ]
+        self.libc.shmget.argtypes = [ ctypes.c_int, ctypes.c_size_t, ctypes.c_int ]
+        self.libc.shmat.restype = ctypes.c_void_p
+        self.libc.shmat.argtypes = [ ctypes.c_int, ctypes.c_void_p, ctypes.c_int ]
+        self.libc.shmdt.argtypes = [ ctypes.c_void_p ]
+        self.libc.shmctl.argtypes = [ ctypes.c_int, ctypes.c_int, ctypes.c_void_p ]
+        return True
+
+
+    def available(self) -> bool:
+        if self.display is not None:
+            return True
+        if QGuiApplication.platformName() != "xcb" or not os.environ.get("DISPLAY") or not self.load():
+            return False
+
+        self.display = self.x11.XOpenDisplay(None)
+        if not self.display:
+            self.display = None
+            return False
+        screen = self.x11.XDefaultScreen(self.display)
+        if not self.xext.XShmQueryExtension(self.display) or self.x11.XDefaultDepth(self.display, screen) not in [ 24, 32 ]:
+            self.close()
+            return False
+
+        self.root = self.x11.XRootWindow(self.display, screen)
+        self.visual = self.x11.XDefaultVisual(self.display, screen)
+        self.depth = self.x11.XDefaultDepth(self.display, screen)
+        self.root_rect = QRect(0, 0, self.x11.XDisplayWidth(self.display, screen), self.x11.XDisplayHeight(self.display, screen))
+        return True
+
+
+    def attach(self, width, height) -> bool:
+        self.detach()
+        segment = XShmSegmentInfo()
+        ximage = self.xext.XShmCreateImage(self.display, self.visual, self.depth, Z_PIXMAP, None, ctypes.byref(segment), width, height)
+        if not ximage:
+            return False
+        if ximage.contents.bits_per_pixel != 32:
+            self.x11.XFree(ximage)
+            return False
+
+        segment.shmid = self.libc.shmget(IPC_PRIVATE, ximage.contents.bytes_per_line * height, IPC_CREAT | 0o600)
+        if segment.shmid < 0:
+            self.x11.XFree(ximage)
+            return False
+        segment.shmaddr = self.libc.shmat(segment.shmid, None, 0)
+        self.libc.shmctl(segment.shmid, IPC_RMID, None)
+        if segment.shmaddr in [ None, ctypes.c_void_p(-1).value ]:
+            self.x11.XFree(ximage)
+            return False
+        segment.readOnly = 0
+        ximage.contents.data = segment.shmaddr
+        self.ximage = ximage
+        self.segment = segment
+        self.allocations += 1
+
+        errors = self.errors
+        previous_handler = self.x11.XSetErrorHandler(ctypes.cast(self.error_handler, ctypes.c_void_p))
+        self.xext.XShmAttach(self.display, ctypes.byref(segment))
+        self.x11.XSync(self.display, 0)
+        self.x11.XSetErrorHandler(previous_handler)
+        self.attached = self.errors == errors
+        if not self.attached:
+            self.detach()
+        return self.attached
+
+
+    def detach(self):
+        if self.ximage is None:
+            return
+
+        if self.attached:
+            self.xext.XShmDetach(self.display, ctypes.byref(self.segment))
+            self.x11.XSync(self.display, 0)
+            self.attached = False
+        self.libc.shmdt(self.segment.shmaddr)
+        self.ximage.contents.data = None
+        self.x11.XFree(self.ximage)
+        self.ximage = None
+        self.segment = None
+
+
+    def grab(self, entry, rect) -> QImage:
+        origin = entry.native_point(rect.x(), rect.y())
+        width = max(1, int(rect.width() * entry.ratio))
+        height = max(1, int(rect.height() * entry.ratio))
+        native_rect = QRect(origin.x(), origin.y(), width, height)
+
+        if self.ximage is None or self.ximage.contents.width != width or self.ximage.contents.height != height:
+            if not self.attach(width, height):
+                return QImage()
+
+        x = min(max(native_rect.x(), 0), self.root_rect.width() - width)
+        y = min(max(native_rect.y(), 0), self.root_rect.height() - height)
+        if x < 0 or y < 0 or not self.xext.XShmGetImage(self.display, self.root, self.ximage, x, y, ALL_PLANES):
+            return QImage()
+
+        allocations = self.pool.allocations
+        image = self.pool.get(width, height)
+        self.allocations += self.pool.allocations - allocations
+        self.grabs += 1
+        source = self.ximage.contents.data
+        source_stride = self.ximage.contents.bytes_per_line
+        target = int(image.bits())
+        target_stride = image.bytesPerLine()
+
+        visible = native_rect.intersected(self.root_rect)
+        if visible == native_rect and source_stride == target_stride:
+            ctypes.memmove(target, source, source_stride * height)
+        else:
+            image.fill(Qt.GlobalColor.black)
+            for row in range(visible.y(), visible.y() + visible.height()):
+                ctypes.memmove(target + (row - native_rect.y()) * target_stride + (visible.x() - native_rect.x()) * 4,
+                               source + (row - y) * source_stride + (visible.x() - x) * 4,
+                               visible.width() * 4)
+        return fill_alpha(image)
+
+
+    def close(self):
+        if self.display is None:
+            return
+
+        self.detach()
+        self.x11.XCloseDisplay(self.display)
+        self.display = None
+
+
+BACKENDS = [ XShmCaptureBackend, QtCaptureBackend ]
+
+
+def calibrate(backend, entry, rect) -> float:
+    start = time.perf_counter()
+    for _ in range(CALIBRATION_GRABS):
+        if backend.grab(entry, rect).isNull():
+            return float("inf")
+    return (time.perf_counter() - start) / CALIBRATION_GRABS
+
+
+def select_backend(entry, rect) -> CaptureBackend:
+    requested = os.environ.get(BACKEND_VARIABLE, "auto").lower()
+    candidates = []
+    for backend_class in BACKENDS:
+        if requested not in [ "auto", backend_class.name ]:
+            continue
+        backend = backend_class()
+        if backend.available():
+            candidates.append(backend)
+    if not candidates:
+        return QtCaptureBackend()
+    if len(candidates) == 1 or entry is None:
+        return candidates[-1]
+
+    timings = [ (calibrate(backend, entry, rect), i) for i, backend in enumerate(candidates) ]
+    fastest = candidates[min(timings)[1]]
+    for backend in candidates:
+        if backend is not fastest:
+            backend.close()
+    return fastest
+
+
+class CaptureRequest:
+    __slots__ = ("position", "capture_rect", "entry", "region", "kernel", "median", "requested")
+
+    def __init__(self, position, capture_rect, entry, region, kernel, median, requested):
+        self.position = position
+        self.capture_rect = capture_rect
+        self.entry = entry
+        self.region = region
+        self.kernel = kernel
+        self.median = median
+        self.requested = requested
+
+
+class Frame:
+    __slots__ = ("position", "capture_rect", "kernel", "median", "image", "color", "requested", "captured")
+
+    def __init__(self, request, image, color):
+        self.position = request.position
+        self.capture_rect = request.capture_rect
+        self.kernel = request.kernel
+        self.median = request.median
+        self.image = image
+        self.color = color
+        self.requested = request.requested
+        self.captured = time.perf_counter()
+
+
+class FrameBuffer:
+
+    def __init__(self, history=240):
+        self.lock = threading.Lock()
+        self.ready = None
+        self.published = 0
+        self.presented = 0
+        self.dropped = 0
+        self.latencies = deque(maxlen=history)
+        self.ages = deque(maxlen=history)
+
+
+    def publish(self, frame):
+        with self.lock:
+            if self.ready is not None:
+                self.dropped += 1
+            self.ready = frame
+            self.published += 1
+            self.latencies.append(frame.captured - frame.requested)
+
+
+    def take(self) -> Frame:
+        with self.lock:
+            frame = self.ready
+            self.ready = None
+            return frame
+
+
+    def present(self, frame):
+        self.presented += 1
+        self.ages.append(time.perf_counter() - frame.captured)
+
+
+    def reset(self):
+        with self.lock:
+            self.ready = None
+
+
+    def statistics(self) -> dict:
+        latencies = list(self.latencies)
+        ages = list(self.ages)
+        return {
+            "published": self.published,
+            "presented": self.presented,
+            "dropped": self.dropped,
+            "latency_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+            "age_ms": sum(ages) / len(ages) * 1000 if ages else 0.0,
+            "age_p95_ms": percentile(ages, 0.95) * 1000,
+        }
+
+
+class CaptureWorker(QThread):
+    frame_ready = pyqtSignal()
+
+    def __init__(self, size, backend=None):
+        super(CaptureWorker, self).__init__()
+        self.size = size
+        self.backend = backend
+        self.kernel = 1
+        self.median = False
+        self.buffer = FrameBuffer()
+        self.condition = threading.Condition()
+        self.pending = None
+        self.running = False
+        self.superseded = 0
+
+
+    def make_request(self, position, entry, region) -> CaptureRequest:
+        half = self.size // 2
+        capture_rect = QRect(position[0] - half, position[1] - half, self.size, self.size)
+        return CaptureRequest(position, capture_rect, entry, region, self.kernel, self.median, time.perf_counter())
+
+
+    def request(self, position, entry, region):
+        request = self.make_request(position, entry, region)
+        with self.condition:
+            if self.pending is not None:
+                self.superseded += 1
+            self.pending = request
+            self.condition.notify()
+
+
+    def start_capture(self):
+        if self.isRunning():
+            return
+
+        self.buffer.reset()
+        self.running = True
+        self.start()
+
+
+    def stop_capture(self):
+        with self.condition:
+            self.running = False
+            self.pending = None
+            self.condition.notify()
+        self.wait()
+
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                request = self.pending
+                self.pending = None
+
+            self.buffer.publish(self.capture(request))
+            self.frame_ready.emit()
+
+
+    def capture(self, request) -> Frame:
+        rect = request.capture_rect
+        if self.backend is None:
+            self.backend = select_backend(request.entry, rect)
+
+        image = QImage()
+        if request.entry is not None:
+            image = self.backend.grab(request.entry, rect)
+        if image.isNull():
+            image = QImage(rect.width(), rect.height(), QImage.Format.Format_RGB32)
+            image.fill(Qt.GlobalColor.black)
+        image.setDevicePixelRatio(1.0)
+        image = black_out_image(image, rect, request.region)
+        return Frame(request, QImage(image), sample_color(image, request.kernel, request.median))
+
+
+    def statistics(self) -> dict:
+        statistics = self.buffer.statistics()
+        statistics["superseded"] = self.superseded
+        if self.backend is not None:
+            statistics.update(self.backend.statistics())
+        return statistics
+
+
+instrumentation.instrument_class(CaptureWorker, [ "capture" ])
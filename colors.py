@@ -0,0 +1,415 @@
+import numpy as np
+
+
+USHRT_MAX = 65535
+ACHROMATIC = USHRT_MAX
+RAW_HUE_LIMIT = 0.999
+FUZZY_NULL = 0.000000000001
+
+HEX_DIGITS = np.array([ "{:02x}".format(i) for i in range(256) ])
+HEX_DIGITS_UPPER = np.char.upper(HEX_DIGITS)
+HEX_VALUES = np.full(256, -1, dtype=np.int32)
+for digit, digit_value in zip(b"0123456789abcdefABCDEF", list(range(16)) + list(range(10, 16))):
+    HEX_VALUES[digit] = digit_value
+
+SRGB_LINEAR = np.arange(256) / 255.0
+SRGB_LINEAR = np.where(SRGB_LINEAR <= 0.04045, SRGB_LINEAR / 12.92, ((SRGB_LINEAR + 0.055) / 1.055) ** 2.4)
+OKLAB_LMS = np.array([ [ 0.4122214708, 0.5363325363, 0.0514459929 ],
+                       [ 0.2119034982, 0.6806995451, 0.1073969566 ],
+                       [ 0.0883024619, 0.2817188376, 0.6299787005 ] ])
+OKLAB_LAB = np.array([ [ 0.2104542553, 0.7936177850, -0.0040720468 ],
+                       [ 1.9779984951, -2.4285922050, 0.4505937099 ],
+                       [ 0.0259040371, 0.7827717662, -0.8086757660 ] ])
+OKLAB_LMS_INVERSE = np.linalg.inv(OKLAB_LMS)
+OKLAB_LAB_INVERSE = np.linalg.inv(OKLAB_LAB)
+
+LINEAR_SRGB_SIZE = 65536
+LINEAR_SRGB = np.arange(LINEAR_SRGB_SIZE) / (LINEAR_SRGB_SIZE - 1)
+LINEAR_SRGB = np.where(LINEAR_SRGB <= 0.0031308, LINEAR_SRGB * 12.92, 1.055 * LINEAR_SRGB ** (1 / 2.4) - 0.055)
+LINEAR_SRGB = np.floor(LINEAR_SRGB * 255.0 + 0.5).astype(np.uint8)
+
+CBRT_SIZE = 256
+CBRT_TABLE = np.cbrt((0.5 + (np.arange(3 * CBRT_SIZE) % CBRT_SIZE + 0.5) / (2 * CBRT_SIZE)) * 2.0 ** (np.arange(3 * CBRT_SIZE) // CBRT_SIZE))
+
+XYZ_WHITE = np.array([ 0.95047, 1.0, 1.08883 ])
+SRGB_XYZ = np.array([ [ 0.4124564, 0.3575761, 0.1804375 ],
+                      [ 0.2126729, 0.7151522, 0.0721750 ],
+                      [ 0.0193339, 0.1191920, 0.9503041 ] ]) / XYZ_WHITE[:, None]
+SRGB_XYZ_INVERSE = np.linalg.inv(SRGB_XYZ)
+LAB_DELTA = 6.0 / 29.0
+
+HUE_STEPS = 36000
+HUE_COS = np.cos(np.radians(np.arange(HUE_STEPS) * 360.0 / HUE_STEPS))
+HUE_SIN = np.sin(np.radians(np.arange(HUE_STEPS) * 360.0 / HUE_STEPS))
+
+
+def q_round(value) -> int:
+    if value >= 0.0:
+        return int(value + 0.5)
+    return int(value - float(int(value - 1)) + 0.5) + int(value - 1)
+
+
+def div_257(value) -> int:
+    value = value + 0x80
+    return (value - (value >> 8)) >> 8
+
+
+def rgb16_to_hsv16(red, green, blue):
+    r = red / USHRT_MAX
+    g = green / USHRT_MAX
+    b = blue / USHRT_MAX
+    maximum = max(r, g, b)
+    delta = maximum - min(r, g, b)
+    value = q_round(maximum * USHRT_MAX)
+    if abs(delta) <= FUZZY_NULL:
+        return ACHROMATIC, 0, value
+
+    saturation = q_round((delta / maximum) * USHRT_MAX)
+    if r == maximum:
+        hue = (g - b) / delta
+    elif g == maximum:
+        hue = 2.0 + (b - r) / delta
+    else:
+        hue = 4.0 + (r - g) / delta
+    hue *= 60.0
+    if hue < 0.0:
+        hue += 360.0
+    return q_round(hue * 100), saturation, value
+
+
+def hsv16_to_rgb16(hue, saturation, value):
+    if saturation == 0 or hue == ACHROMATIC:
+        return value, value, value
+
+    h = 0.0 if hue == 36000 else hue / 6000.0
+    s = saturation / USHRT_MAX
+    v = value / USHRT_MAX
+    i = int(h)
+    f = h - i
+    p = v * (1.0 - s)
+    if i & 1:
+        q = v * (1.0 - (s * f))
+        r, g, b = ((q, v, p), (p, q, v), (v, p, q))[i // 2]
+    else:
+        t = v * (1.0 - (s * (1.0 - f)))
+        r, g, b = ((v, t, p), (p, v, t), (t, p, v))[i // 2]
+    return q_round(r * USHRT_MAX), q_round(g * USHRT_MAX), q_round(b * USHRT_MAX)
+
+
+def clamp_unit(value) -> float:
+    return min(max(value, 0.0), 1.0)
+
+
+class Color:
+    __slots__ = ("spec", "rgb16", "hsv16")
+
+    def __init__(self, spec, rgb16, hsv16):
+        self.spec = spec
+        self.rgb16 = rgb16
+        self.hsv16 = hsv16
+
+
+    @classmethod
+    def from_rgb16(cls, red, green, blue):
+        return cls("rgb", (red, green, blue), rgb16_to_hsv16(red, green, blue))
+
+
+    @classmethod
+    def from_hsv16(cls, hue, saturation, value):
+        return cls("hsv", hsv16_to_rgb16(hue, saturation, value), (hue, saturation, value))
+
+
+    @classmethod
+    def from_rgb(cls, red, green, blue):
+        return cls.from_rgb16(red * 0x101, green * 0x101, blue * 0x101)
+
+
+    @classmethod
+    def from_rgb_f(cls, red, green, blue):
+        red, green, blue = clamp_unit(red), clamp_unit(green), clamp_unit(blue)
+        return cls.from_rgb16(q_round(red * USHRT_MAX), q_round(green * USHRT_MAX), q_round(blue * USHRT_MAX))
+
+
+    @classmethod
+    def from_hsv(cls, hue, saturation, value):
+        hue = ACHROMATIC if hue == -1 else (hue % 360) * 100
+        return cls.from_hsv16(hue, saturation * 0x101, value * 0x101)
+
+
+    @classmethod
+    def from_hsv_f(cls, hue, saturation, value):
+        if hue != -1.0:
+            hue = clamp_unit(hue)
+        saturation, value = clamp_unit(saturation), clamp_unit(value)
+        if hue == 1.0:
+            hue = RAW_HUE_LIMIT
+        hue = ACHROMATIC if hue == -1.0 else q_round(hue * 36000)
+        return cls.from_hsv16(hue, q_round(saturation * USHRT_MAX), q_round(value * USHRT_MAX))
+
+
+    @classmethod
+    def from_name(cls, name):
+        name = name.lstrip("#")
+        if len(name) != 6:
+            raise ValueError("invalid color name: #{}".format(name))
+        return cls.from_rgb(int(name[0:2], 16), int(name[2:4], 16), int(name[4:6], 16))
+
+
+    def red(self) -> int:
+        return div_257(self.rgb16[0])
+
+
+    def green(self) -> int:
+        return div_257(self.rgb16[1])
+
+
+    def blue(self) -> int:
+        return div_257(self.rgb16[2])
+
+
+    def hue(self) -> int:
+        return -1 if self.hsv16[0] == ACHROMATIC else self.hsv16[0] // 100
+
+
+    def saturation(self) -> int:
+        return div_257(self.hsv16[1])
+
+
+    def value(self) -> int:
+        return div_257(self.hsv16[2])
+
+
+    def rgb(self) -> tuple:
+        return div_257(self.rgb16[0]), div_257(self.rgb16[1]), div_257(self.rgb16[2])
+
+
+    def hsv(self) -> tuple:
+        return self.hue(), div_257(self.hsv16[1]), div_257(self.hsv16[2])
+
+
+    def rgb_f(self) -> tuple:
+        return self.rgb16[0] / USHRT_MAX, self.rgb16[1] / USHRT_MAX, self.rgb16[2] / USHRT_MAX
+
+
+    def hsv_f(self) -> tuple:
+        hue = -1.0 if self.hsv16[0] == ACHROMATIC else self.hsv16[0] / 36000.0
+        return hue, self.hsv16[1] / USHRT_MAX, self.hsv16[2] / USHRT_MAX
+
+
+    def name(self) -> str:
+        return "#{:02x}{:02x}{:02x}".format(*self.rgb())
+
+
+    def key(self) -> tuple:
+        if self.spec == "hsv":
+            hue = self.hsv16[0] if self.hsv16[0] == ACHROMATIC else self.hsv16[0] % 36000
+            return self.spec, hue, self.hsv16[1], self.hsv16[2]
+        return (self.spec,) + self.rgb16
+
+
+    def __eq__(self, other):
+        return isinstance(other, Color) and self.key() == other.key()
+
+
+    def __hash__(self):
+        return hash(self.key())
+
+
+    def __repr__(self):
+        return "Color({})".format(self.name())
+
+
+def q_round_array(values):
+    return np.floor(values + 0.5).astype(np.int32)
+
+
+def rgb16_to_hsv16_array(rgb16):
+    rgb = np.asarray(rgb16, dtype=np.float64) / USHRT_MAX
+    r = rgb[..., 0]
+    g = rgb[..., 1]
+    b = rgb[..., 2]
+    maximum = rgb.max(axis=-1)
+    delta = maximum - rgb.min(axis=-1)
+    achromatic = np.abs(delta) <= FUZZY_NULL
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        saturation = (delta / maximum) * USHRT_MAX
+        hue = np.where(r == maximum, (g - b) / delta,
+                       np.where(g == maximum, 2.0 + (b - r) / delta, 4.0 + (r - g) / delta))
+    hue = hue * 60.0
+    hue = np.where(hue < 0.0, hue + 360.0, hue)
+
+    hsv16 = np.empty(rgb.shape, dtype=np.int32)
+    hsv16[..., 0] = np.where(achromatic, ACHROMATIC, q_round_array(np.where(achromatic, 0.0, hue * 100)))
+    hsv16[..., 1] = np.where(achromatic, 0, q_round_array(np.where(achromatic, 0.0, saturation)))
+    hsv16[..., 2] = q_round_array(maximum * USHRT_MAX)
+    return hsv16
+
+
+def hsv16_to_rgb16_array(hsv16):
+    hsv16 = np.asarray(hsv16, dtype=np.int64)
+    hue = hsv16[..., 0]
+    achromatic = (hsv16[..., 1] == 0) | (hue == ACHROMATIC)
+    h = np.where((hue == 36000) | achromatic, 0.0, hue / 6000.0)
+    s = hsv16[..., 1] / USHRT_MAX
+    v = hsv16[..., 2] / USHRT_MAX
+    i = h.astype(np.int64)
+    f = h - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - (s * f))
+    t = v * (1.0 - (s * (1.0 - f)))
+
+    channels = [ (v, q, p, p, t, v), (t, v, v, q, p, p), (p, p, t, v, v, q) ]
+    rgb16 = np.empty(hsv16.shape, dtype=np.int32)
+    for channel, choices in enumerate(channels):
+        rgb16[..., channel] = np.where(achromatic, hsv16[..., 2], q_round_array(np.choose(np.clip(i, 0, 5), choices) * USHRT_MAX))
+    return rgb16
+
+
+def rgb_to_rgb16(rgb):
+    return np.asarray(rgb, dtype=np.int32) * 0x101
+
+
+def rgb_to_hsv(rgb, achromatic_hue=-1):
+    hsv16 = rgb16_to_hsv16_array(rgb_to_rgb16(rgb))
+    hsv = div_257(hsv16)
+    hsv[..., 0] = np.where(hsv16[..., 0] == ACHROMATIC, achromatic_hue, hsv16[..., 0] // 100)
+    return hsv
+
+
+def rgb_to_hsv_f(rgb, achromatic_hue=-1.0):
+    hsv16 = rgb16_to_hsv16_array(rgb_to_rgb16(rgb))
+    hsv_f = hsv16 / USHRT_MAX
+    hsv_f[..., 0] = np.where(hsv16[..., 0] == ACHROMATIC, achromatic_hue, hsv16[..., 0] / 36000.0)
+    return hsv_f
+
+
+def hsv_to_rgb(hsv):
+    hsv = np.asarray(hsv, dtype=np.int64)
+    hsv16 = np.empty(hsv.shape, dtype=np.int64)
+    hsv16[..., 0] = np.where(hsv[..., 0] == -1, ACHROMATIC, (hsv[..., 0] % 360) * 100)
+    hsv16[..., 1:] = hsv[..., 1:] * 0x101
+    return div_257(hsv16_to_rgb16_array(hsv16)).astype(np.uint8)
+
+
+def hsv_f_to_rgb(hsv_f):
+    hsv_f = np.asarray(hsv_f, dtype=np.float64)
+    hue = np.where(hsv_f[..., 0] == 1.0, RAW_HUE_LIMIT, hsv_f[..., 0])
+    hsv16 = np.empty(hsv_f.shape, dtype=np.int64)
+    hsv16[..., 0] = np.where(hue == -1.0, ACHROMATIC, q_round_array(hue * 36000))
+    hsv16[..., 1:] = q_round_array(hsv_f[..., 1:] * USHRT_MAX)
+    return div_257(hsv16_to_rgb16_array(hsv16)).astype(np.uint8)
+
+
+def rgb_to_rgb_f(rgb):
+    return rgb_to_rgb16(rgb) / USHRT_MAX
+
+
+def rgb_f_to_rgb(rgb_f):
+    return div_257(q_round_array(np.asarray(rgb_f, dtype=np.float64) * USHRT_MAX)).astype(np.uint8)
+
+
+def rgb_to_hex(rgb, upper=False):
+    rgb = np.asarray(rgb, dtype=np.uint8)
+    digits = HEX_DIGITS_UPPER if upper else HEX_DIGITS
+    names = np.char.add(np.char.add(digits[rgb[..., 0]], digits[rgb[..., 1]]), digits[rgb[..., 2]])
+    return np.char.add("#", names)
+
+
+def hex_to_rgb(names):
+    names = np.asarray(names, dtype=np.str_)
+    width = max(1, names.dtype.itemsize // 4)
+    codes = np.ascontiguousarray(names).view(np.uint32).reshape(names.shape + (width,))
+    if width < 8:
+        codes = np.concatenate([ codes, np.zeros(names.shape + (8 - width,), dtype=np.uint32) ], axis=-1)
+
+    start = (codes[..., 0] == ord("#")).astype(np.intp)
+    length = np.count_nonzero(codes, axis=-1)
+    digits = np.take_along_axis(codes, start[..., None] + np.arange(6), axis=-1)
+    nibbles = HEX_VALUES[np.minimum(digits, 255)]
+    if np.any(length - start != 6) or np.any((nibbles < 0) | (digits > 255)):
+        raise ValueError("color names must have six hex digits")
+    nibbles = nibbles.reshape(names.shape + (3, 2))
+    return (nibbles[..., 0] * 16 + nibbles[..., 1]).astype(np.uint8)
+
+
+def cbrt(values):
+    values = np.maximum(np.asarray(values, dtype=np.float64), 0.0)
+    mantissa, exponent = np.frexp(values)
+    index = (exponent % 3) * CBRT_SIZE + np.clip(((mantissa - 0.5) * (2 * CBRT_SIZE)).astype(np.intp), 0, CBRT_SIZE - 1)
+    estimate = np.ldexp(CBRT_TABLE[index], exponent // 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(values > 0.0, (2.0 * estimate + values / (estimate * estimate)) / 3.0, 0.0)
+
+
+def linear_to_rgb(linear):
+    index = np.floor(np.clip(linear, 0.0, 1.0) * (LINEAR_SRGB_SIZE - 1) + 0.5).astype(np.intp)
+    return LINEAR_SRGB[index]
+
+
+def rgb_to_oklab(rgb):
+    linear = SRGB_LINEAR[np.asarray(rgb, dtype=np.uint8)]
+    return cbrt(linear @ OKLAB_LMS.T) @ OKLAB_LAB.T
+
+
+def oklab_to_rgb(lab):
+    lms = np.asarray(lab, dtype=np.float64) @ OKLAB_LAB_INVERSE.T
+    return linear_to_rgb((lms * lms * lms) @ OKLAB_LMS_INVERSE.T)
+
+
+def rgb_to_oklch(rgb):
+    lab = rgb_to_oklab(rgb)
+    lch = np.empty(lab.shape, dtype=np.float64)
+    lch[..., 0] = lab[..., 0]
+    lch[..., 1] = np.hypot(lab[..., 1], lab[..., 2])
+    lch[..., 2] = np.degrees(np.arctan2(lab[..., 2], lab[..., 1])) % 360.0
+    return lch
+
+
+def oklch_to_rgb(lch):
+    lch = np.asarray(lch, dtype=np.float64)
+    hue = np.floor(lch[..., 2] * (HUE_STEPS / 360.0) + 0.5).astype(np.intp) % HUE_STEPS
+    lab = np.empty(lch.shape, dtype=np.float64)
+    lab[..., 0] = lch[..., 0]
+    lab[..., 1] = lch[..., 1] * HUE_COS[hue]
+    lab[..., 2] = lch[..., 1] * HUE_SIN[hue]
+    return oklab_to_rgb(lab)
+
+
+def rgb_to_lab(rgb):
+    xyz = SRGB_LINEAR[np.asarray(rgb, dtype=np.uint8)] @ SRGB_XYZ.T
+    f = np.where(xyz > LAB_DELTA ** 3, cbrt(xyz), xyz / (3 * LAB_DELTA ** 2) + 4.0 / 29.0)
+    lab = np.empty(f.shape, dtype=np.float64)
+    lab[..., 0] = 116.0 * f[..., 1] - 16.0
+    lab[..., 1] = 500.0 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200.0 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def lab_to_rgb(lab):
+    lab = np.asarray(lab, dtype=np.float64)
+    f = np.empty(lab.shape, dtype=np.float64)
+    f[..., 1] = (lab[..., 0] + 16.0) / 116.0
+    f[..., 0] = f[..., 1] + lab[..., 1] / 500.0
+    f[..., 2] = f[..., 1] - lab[..., 2] / 200.0
+    xyz = np.where(f > LAB_DELTA, f * f * f, 3 * LAB_DELTA ** 2 * (f - 4.0 / 29.0))
+    return linear_to_rgb(xyz @ SRGB_XYZ_INVERSE.T)
+
+
+class ColorSpace:
+    __slots__ = ("name", "labels", "minimums", "maximums", "steps", "decimals", "hue_channel", "from_rgb", "to_rgb")
+
+    def __init__(self, name, labels, minimums, maximums, steps, decimals, hue_channel, from_rgb, to_rgb):
+        self.name = name
+        self.labels = labels
+        self.minimums = minimums
+        self.maximums = maximums
+        self.steps = steps
+        self.decimals = decimals
+        self.hue_channel = hue_channel
+        self.from_rgb = from_rgb
+        self.to_rgb = to_rgb
+
+
+LAB_SPACE = ColorSpace("LAB", "Lab", [ 0.0, -128.0, -128.0 ], [ 100.0, 127.0, 127.0 ], [ 1.0, 1.0, 1.0 ], [ 1, 1, 1 ], None, rgb_to_lab, lab_to_rgb)
+OKLCH_SPACE = ColorSpace("OKLCH", "LCH", [ 0.0, 0.0, 0.0 ], [ 1.0, 0.4, 360.0 ], [ 0.01, 0.005, 1.0 ], [ 3, 3, 1 ], 2, rgb_to_oklch, oklch_to_rgb)
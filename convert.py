@@ -0,0 +1,151 @@
+import sys
+import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import colors
+
+
+FORMATS = [ "hex", "rgb", "rgbf", "hsv", "hsvf" ]
+
+decimal_strings = None
+unit_strings = None
+hue_strings = None
+
+
+def build_lookup_tables():
+    global decimal_strings, unit_strings, hue_strings
+    if decimal_strings is not None:
+        return
+    decimal_strings = np.array([ str(i) for i in range(colors.USHRT_MAX + 1) ], dtype=object)
+    unit_strings = np.array([ "{:.3f}".format(i / colors.USHRT_MAX) for i in range(colors.USHRT_MAX + 1) ], dtype=object)
+    hue_strings = np.array([ "{:.3f}".format(i / 36000.0) for i in range(36001) ], dtype=object)
+
+
+def invalid_line(lines) -> str:
+    for line in lines:
+        try:
+            if line.count(",") != 2 or np.fromstring(line, dtype=np.float64, sep=",").size != 3:
+                return line.strip()
+        except ValueError:
+            return line.strip()
+    return ""
+
+
+def parse_colors(lines, source) -> np.ndarray:
+    if source == "hex":
+        return colors.hex_to_rgb(np.array([ line.strip() for line in lines ]))
+
+    try:
+        values = np.fromstring(",".join(lines), dtype=np.float64, sep=",")
+    except ValueError:
+        values = np.empty(0)
+    if values.size != len(lines) * 3 or (np.char.count(np.array(lines), ",") != 2).any():
+        raise ValueError("expected three {} values per line, got {!r}".format(source, invalid_line(lines)))
+    values = values.reshape(-1, 3)
+
+    if source == "rgbf":
+        return colors.rgb_f_to_rgb(np.clip(values, 0.0, 1.0))
+    if source == "hsvf":
+        return colors.hsv_f_to_rgb(np.clip(values, 0.0, 1.0))
+    values = values.astype(np.int64)
+    if source == "hsv":
+        values[:, 1:] = np.clip(values[:, 1:], 0, 255)
+        return colors.hsv_to_rgb(values)
+    return np.clip(values, 0, 255).astype(np.uint8)
+
+
+def join_channels(lookup_tables, values) -> list:
+    return list(map(", ".join, zip(*(lookup_tables[i][values[:, i]].tolist() for i in range(3)))))
+
+
+def format_colors(rgb, targets, separator) -> str:
+    build_lookup_tables()
+    rgb16 = colors.rgb_to_rgb16(rgb)
+    hsv16 = colors.rgb16_to_hsv16_array(rgb16)
+    hsv16[:, 0] = np.where(hsv16[:, 0] == colors.ACHROMATIC, 0, hsv16[:, 0])
+
+    columns = []
+    for target in targets:
+        if target == "hex":
+            columns.append(colors.rgb_to_hex(rgb, upper=True).tolist())
+        elif target == "rgb":
+            columns.append(join_channels([ decimal_strings ] * 3, rgb))
+        elif target == "rgbf":
+            columns.append(join_channels([ unit_strings ] * 3, rgb16))
+        elif target == "hsv":
+            hsv = colors.div_257(hsv16)
+            hsv[:, 0] = hsv16[:, 0] // 100
+            columns.append(join_channels([ decimal_strings ] * 3, hsv))
+        else:
+            columns.append(join_channels([ hue_strings, unit_strings, unit_strings ], hsv16))
+    return "".join(row + "\n" for row in map(separator.join, zip(*columns)))
+
+
+def convert_chunk(lines, source, targets, separator) -> str:
+    lines = [ line for line in lines if line.strip() ]
+    if not lines:
+        return ""
+    return format_colors(parse_colors(lines, source), targets, separator)
+
+
+def read_chunks(paths, chunk_size):
+    for path in paths:
+        stream = sys.stdin if path == "-" else open(path, "r", buffering=1 << 20)
+        try:
+            while True:
+                lines = list(itertools.islice(stream, chunk_size))
+                if not lines:
+                    break
+                yield lines
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def convert_parallel(chunks, jobs, source, targets, separator):
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for lines in chunks:
+            pending.append(executor.submit(convert_chunk, lines, source, targets, separator))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def parse_targets(value):
+    targets = [ target.strip().lower() for target in value.split(",") if target.strip() ]
+    for target in targets:
+        if target not in FORMATS:
+            raise argparse.ArgumentTypeError("unknown format: {}".format(target))
+    return targets
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(prog="main.py convert", description="Convert colors between the formats of the Values tab.")
+    parser.add_argument("paths", nargs="*", default=["-"], help="input files, one color per line ('-' for stdin)")
+    parser.add_argument("--from", dest="source", choices=FORMATS, default="hex", help="input format (default: hex)")
+    parser.add_argument("--to", dest="targets", type=parse_targets, default=FORMATS, help="comma separated output formats (default: all)")
+    parser.add_argument("--separator", default="\t", help="separator between output formats (default: tab)")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="lines converted per batch")
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for large inputs")
+    args = parser.parse_args(argv)
+
+    chunks = read_chunks(args.paths, max(1, args.chunk_size))
+    if args.jobs > 1:
+        results = convert_parallel(chunks, args.jobs, args.source, args.targets, args.separator)
+    else:
+        results = (convert_chunk(lines, args.source, args.targets, args.separator) for lines in chunks)
+
+    try:
+        for text in results:
+            sys.stdout.write(text)
+    except ValueError as error:
+        print("convert: {}".format(error), file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        return 1
+    sys.stdout.flush()
+    return 0
@@ -0,0 +1,51 @@
+import os
+import sys
+import socket
+import getpass
+import tempfile
+
+
+COMMANDS = [ "show", "pick", "last", "ping", "quit" ]
+
+
+def socket_path() -> str:
+    path = os.environ.get("SIMPLECOLORPICKER_SOCKET")
+    if path:
+        return path
+    return os.path.join(tempfile.gettempdir(), "SimpleColorPicker-{}.sock".format(getpass.getuser()))
+
+
+def send_command(command, timeout=2.0) -> str:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(socket_path())
+        client.sendall(command.encode() + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            data = client.recv(256)
+            if not data:
+                break
+            reply += data
+    finally:
+        client.close()
+    return reply.decode().strip()
+
+
+def is_running() -> bool:
+    try:
+        return send_command("ping", timeout=0.5) == "pong"
+    except OSError:
+        return False
+
+
+def main(argv) -> int:
+    try:
+        reply = send_command(argv[0])
+    except OSError:
+        print("SimpleColorPicker is not running in daemon mode (start it with --daemon)", file=sys.stderr)
+        return 1
+
+    if reply:
+        print(reply)
+    return 1 if reply.startswith("error") else 0
@@ -0,0 +1,95 @@
+import time
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtCore import Qt, QEvent, QPoint, QTimer
+
+
+FRAME_INTERVAL = 16
+WHEEL_STEP = 120
+ACCELERATION_INTERVAL = 0.05
+MAX_ACCELERATION = 8.0
+WHEEL_IDLE_RESET = 0.5
+
+
+class MoveCompressor:
+
+    def __init__(self, handler, interval=FRAME_INTERVAL):
+        self.handler = handler
+        self.pending = None
+        self.received = 0
+        self.delivered = 0
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+
+
+    def __call__(self, event):
+        self.received += 1
+        self.pending = QMouseEvent(event)
+        if event.type() == QEvent.Type.MouseButtonPress or not self.timer.isActive():
+            self.flush()
+            self.timer.start()
+
+
+    def flush(self):
+        event = self.pending
+        if event is None:
+            return
+
+        self.pending = None
+        self.delivered += 1
+        self.handler(event)
+
+
+class WheelAccumulator:
+
+    def __init__(self, handler, interval=FRAME_INTERVAL):
+        self.handler = handler
+        self.pending_x = 0.0
+        self.pending_y = 0.0
+        self.last_time = None
+        self.average_interval = ACCELERATION_INTERVAL
+        self.received = 0
+        self.delivered = 0
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+
+
+    def acceleration(self, now) -> float:
+        if self.last_time is None or now - self.last_time > WHEEL_IDLE_RESET:
+            self.pending_x = 0.0
+            self.pending_y = 0.0
+            self.average_interval = ACCELERATION_INTERVAL
+        else:
+            self.average_interval = self.average_interval * 0.7 + (now - self.last_time) * 0.3
+        self.last_time = now
+        return max(1.0, min(MAX_ACCELERATION, ACCELERATION_INTERVAL / max(self.average_interval, 0.001)))
+
+
+    def __call__(self, event):
+        self.received += 1
+        scale = self.acceleration(time.perf_counter()) / WHEEL_STEP
+        self.pending_x += event.angleDelta().x() * scale
+        self.pending_y += event.angleDelta().y() * scale
+        event.accept()
+        if not self.timer.isActive():
+            self.flush()
+            self.timer.start()
+
+
+    def flush(self):
+        steps_x = int(self.pending_x)
+        steps_y = int(self.pending_y)
+        if steps_x == 0 and steps_y == 0:
+            return
+
+        self.pending_x -= steps_x
+        self.pending_y -= steps_y
+        self.delivered += 1
+        self.handler(QPoint(steps_x, steps_y))
@@ -0,0 +1,194 @@
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QPainter, QColor, QImage, QLinearGradient, QRegion
+from PyQt5.QtCore import Qt
+from collections import OrderedDict
+import numpy as np
+
+
+HUE_STOPS = [
+    (0.0, QColor(255, 0, 0)),
+    (0.166, QColor(255, 255, 0)),
+    (0.333, QColor(0, 255, 0)),
+    (0.5, QColor(0, 255, 255)),
+    (0.666, QColor(0, 0, 255)),
+    (0.833, QColor(255, 0, 255)),
+    (1.0, QColor(255, 0, 0)),
+]
+
+PLANE_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def render_linear_gradient(width, height, stops, vertical) -> QImage:
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    gradient = QLinearGradient(0, height, 0, 0) if vertical else QLinearGradient(0, 0, width, 0)
+    for position, color in stops:
+        gradient.setColorAt(position, color)
+    painter = QPainter(image)
+    painter.fillRect(image.rect(), gradient)
+    painter.end()
+    return image
+
+
+def render_channel_gradient(width, height, values, channel, minimum, maximum, to_rgb) -> QImage:
+    samples = np.empty((width, 3), dtype=np.float64)
+    samples[:] = values
+    samples[:, channel] = np.linspace(minimum, maximum, width)
+    rgb = to_rgb(samples).astype(np.uint32)
+    row = 0xFF000000 | (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    pixels = np.ascontiguousarray(np.broadcast_to(row, (height, width)))
+    return QImage(pixels.data, width, height, width * 4, QImage.Format.Format_RGB32).copy()
+
+
+def render_plane(width, height, hue) -> QImage:
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    painter = QPainter(image)
+    saturation = QLinearGradient(0, 0, width, 0)
+    saturation.setColorAt(0, QColor(255, 255, 255))
+    saturation.setColorAt(1, QColor.fromHsv(hue, 255, 255))
+    painter.fillRect(image.rect(), saturation)
+    value = QLinearGradient(0, 0, 0, height)
+    value.setColorAt(0, QColor(0, 0, 0, 0))
+    value.setColorAt(1, QColor(0, 0, 0, 255))
+    painter.fillRect(image.rect(), value)
+    painter.end()
+    return image
+
+
+class ImageCache:
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.images = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def get(self, key, render) -> QImage:
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        image = render()
+        self.images[key] = image
+        self.size += image.sizeInBytes()
+        self.evict()
+        return image
+
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.evict()
+
+
+    def evict(self):
+        while self.size > self.max_bytes and len(self.images) > 1:
+            _, image = self.images.popitem(last=False)
+            self.size -= image.sizeInBytes()
+            self.evictions += 1
+
+
+    def clear(self):
+        self.images.clear()
+        self.size = 0
+
+
+    def statistics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.images),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class GradientFrame(QWidget):
+
+    def __init__(self, width, height, vertical=False):
+        super(GradientFrame, self).__init__()
+        self.setFixedSize(width, height)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent, True)
+        self.vertical = vertical
+        self.image = None
+        self.image_key = None
+        self.indicators = []
+        self.indicator_color = QColor()
+
+
+    def set_image(self, key, render):
+        if key == self.image_key:
+            return
+
+        self.image = render()
+        self.image_key = key
+        self.update()
+
+
+    def set_stops(self, stops):
+        key = tuple((position, color.rgba()) for position, color in stops)
+        self.set_image(key, lambda: render_linear_gradient(self.width(), self.height(), stops, self.vertical))
+
+
+    def set_channel(self, values, channel, minimum, maximum, to_rgb):
+        key = (to_rgb, channel) + tuple(value for i, value in enumerate(values) if i != channel)
+        self.set_image(key, lambda: render_channel_gradient(self.width(), self.height(), values, channel, minimum, maximum, to_rgb))
+
+
+    def set_indicators(self, rects, color):
+        if rects == self.indicators and color == self.indicator_color:
+            return
+
+        dirty = QRegion()
+        for rect in self.indicators + rects:
+            dirty = dirty.united(rect)
+        self.indicators = rects
+        self.indicator_color = QColor(color)
+        self.update(dirty)
+
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self.image is not None:
+            painter.drawImage(event.rect(), self.image, event.rect())
+        for rect in self.indicators:
+            painter.fillRect(rect, self.indicator_color)
+
+
+class SaturationValuePlane(GradientFrame):
+
+    def __init__(self, width, height, cache_bytes=PLANE_CACHE_BYTES):
+        super(SaturationValuePlane, self).__init__(width, height)
+        self.cache = ImageCache(cache_bytes)
+
+
+    def set_hue(self, hue):
+        self.set_image(hue, lambda: self.cache.get(hue, lambda: render_plane(self.width(), self.height(), hue)))
+
+
+class ColorSwatch(QWidget):
+
+    def __init__(self):
+        super(ColorSwatch, self).__init__()
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent, True)
+        self.color = QColor()
+
+
+    def set_color(self, color):
+        if color == self.color:
+            return
+
+        self.color = QColor(color)
+        self.update()
+
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), self.color)
@@ -0,0 +1,265 @@
+import os
+import mmap
+import time
+import queue
+import atexit
+import struct
+import threading
+import numpy as np
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, pyqtSignal
+
+
+HISTORY_VARIABLE = "SIMPLECOLORPICKER_HISTORY"
+MAGIC = b"SCPH"
+VERSION = 1
+HEADER = struct.Struct("<4sHH8x")
+RECORD = struct.Struct("<dBBBB")
+RECORD_DTYPE = np.dtype([ ("time", "<f8"), ("red", "u1"), ("green", "u1"), ("blue", "u1"), ("source", "u1") ])
+MAX_RECORDS = 100000
+COMPACT_SLACK = 0.5
+
+PICKED = 0
+EDITED = 1
+SOURCES = [ "picked", "edited" ]
+
+
+def default_path() -> str:
+    path = os.environ.get(HISTORY_VARIABLE)
+    if path:
+        return path
+    base = os.environ.get("XDG_DATA_HOME") or os.environ.get("APPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "SimpleColorPicker", "history.bin")
+
+
+def valid_header(data) -> bool:
+    if len(data) < HEADER.size:
+        return False
+    magic, version, record_size = HEADER.unpack_from(data)
+    return magic == MAGIC and version == VERSION and record_size == RECORD.size
+
+
+class HistoryStore:
+
+    def __init__(self, path=None, max_records=MAX_RECORDS):
+        self.path = path or default_path()
+        self.max_records = max_records
+        self.mapping = None
+        self.mapped = np.zeros(0, dtype=RECORD_DTYPE)
+        self.recent = []
+        self.lock = threading.RLock()
+        self.queue = queue.SimpleQueue()
+        self.writer = None
+        self.listener = None
+        self.file_records = 0
+        self.flushed = 0
+        self.written = 0
+        self.compactions = 0
+        self.load()
+
+
+    def load(self) -> bool:
+        try:
+            stream = open(self.path, "rb")
+        except OSError:
+            return False
+
+        with stream:
+            size = os.fstat(stream.fileno()).st_size
+            if not valid_header(stream.read(HEADER.size)):
+                return False
+            count = (size - HEADER.size) // RECORD.size
+            self.mapped = np.zeros(0, dtype=RECORD_DTYPE)
+            if count:
+                self.mapping = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+                self.mapped = np.frombuffer(self.mapping, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+        self.file_records = count
+        return True
+
+
+    def detach(self):
+        if self.mapping is None:
+            return
+
+        self.mapped = self.mapped.copy()
+        self.mapping.close()
+        self.mapping = None
+
+
+    def rebase(self):
+        with self.lock:
+            self.detach()
+            if self.load():
+                del self.recent[:self.flushed]
+                self.flushed = 0
+
+
+    def file_replaced(self):
+        if self.listener is None:
+            self.rebase()
+        else:
+            self.listener()
+
+
+    def __len__(self):
+        with self.lock:
+            return len(self.mapped) + len(self.recent)
+
+
+    def record(self, index) -> tuple:
+        with self.lock:
+            if index < len(self.mapped):
+                row = self.mapped[index]
+                return float(row["time"]), int(row["red"]), int(row["green"]), int(row["blue"]), int(row["source"])
+            return self.recent[index - len(self.mapped)]
+
+
+    def is_duplicate(self, rgb) -> bool:
+        with self.lock:
+            return len(self) > 0 and self.record(len(self) - 1)[1:4] == tuple(rgb)
+
+
+    def append(self, rgb, source, timestamp=None) -> bool:
+        with self.lock:
+            if self.is_duplicate(rgb):
+                return False
+
+            entry = (time.time() if timestamp is None else timestamp, rgb[0], rgb[1], rgb[2], source)
+            self.recent.append(entry)
+        self.queue.put(entry)
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_loop, name="history", daemon=True)
+            self.writer.start()
+            atexit.register(self.close)
+        return True
+
+
+    def close(self):
+        if self.writer is None:
+            return
+
+        self.queue.put(None)
+        self.writer.join(timeout=2.0)
+        self.writer = None
+
+
+    def open_for_append(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        try:
+            with open(self.path, "rb") as stream:
+                valid = valid_header(stream.read(HEADER.size))
+        except OSError:
+            valid = False
+        if not valid:
+            with open(self.path, "wb") as stream:
+                stream.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+        size = os.path.getsize(self.path)
+        aligned = HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size
+        if aligned != size:
+            with self.lock:
+                self.detach()
+                os.truncate(self.path, aligned)
+            self.file_replaced()
+        self.file_records = (aligned - HEADER.size) // RECORD.size
+        return open(self.path, "ab")
+
+
+    def write_loop(self):
+        stream = self.open_for_append()
+        try:
+            while True:
+                entry = self.queue.get()
+                if entry is None:
+                    break
+                batch = [ entry ]
+                while True:
+                    try:
+                        entry = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if entry is None:
+                        self.queue.put(None)
+                        break
+                    batch.append(entry)
+
+                with self.lock:
+                    stream.write(b"".join(RECORD.pack(*entry) for entry in batch))
+                    stream.flush()
+                    self.file_records += len(batch)
+                    self.flushed += len(batch)
+                    self.written += len(batch)
+                if self.file_records > self.max_records * (1 + COMPACT_SLACK):
+                    stream = self.compact(stream)
+        finally:
+            stream.close()
+
+
+    def compact(self, stream):
+        stream.close()
+        keep = min(self.file_records, self.max_records)
+        temporary_path = self.path + ".tmp"
+        try:
+            with open(self.path, "rb") as source:
+                source.seek(HEADER.size + (self.file_records - keep) * RECORD.size)
+                data = source.read(keep * RECORD.size)
+            with open(temporary_path, "wb") as target:
+                target.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+                target.write(data)
+            with self.lock:
+                self.detach()
+                os.replace(temporary_path, self.path)
+            self.compactions += 1
+            self.file_replaced()
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        return self.open_for_append()
+
+
+class HistoryModel(QAbstractListModel):
+    file_replaced = pyqtSignal()
+
+    def __init__(self, store):
+        super(HistoryModel, self).__init__()
+        self.store = store
+        self.file_replaced.connect(self.rebase)
+        self.store.listener = self.file_replaced.emit
+
+
+    def rebase(self):
+        self.beginResetModel()
+        self.store.rebase()
+        self.endResetModel()
+
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+
+    def entry(self, row) -> tuple:
+        return self.store.record(len(self.store) - 1 - row)
+
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        timestamp, red, green, blue, source = self.entry(index.row())
+        if role == Qt.ItemDataRole.DisplayRole:
+            return "#{:02X}{:02X}{:02X}   {}   {}".format(red, green, blue, time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp)), SOURCES[source])
+        if role == Qt.ItemDataRole.DecorationRole:
+            return QColor(red, green, blue)
+        return None
+
+
+    def add(self, rgb, source):
+        if self.store.is_duplicate(rgb):
+            return
+
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.store.append(rgb, source)
+        self.endInsertRows()
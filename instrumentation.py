@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import atexit
+import tempfile
+import functools
+import threading
+import numpy as np
+
+
+ENVIRONMENT_VARIABLE = "SIMPLECOLORPICKER_INSTRUMENT"
+RING_SIZE = 1024
+DUMP_INTERVAL = 5.0
+OVERLAY_INTERVAL = 0.25
+PERCENTILES = [ 50, 95, 99 ]
+
+enabled = False
+dump_path = None
+timings = {}
+registered = []
+overlay_cache = {}
+
+
+class RingBuffer:
+
+    def __init__(self, size=RING_SIZE):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+        self.total = 0
+
+
+    def add(self, value):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % len(self.samples)
+        self.count = min(self.count + 1, len(self.samples))
+        self.total += 1
+
+
+    def statistics(self) -> dict:
+        samples = self.samples[:self.count] * 1000.0
+        if not self.count:
+            return { "calls": self.total }
+
+        values = np.percentile(samples, PERCENTILES)
+        statistics = { "p{}_ms".format(p): float(value) for p, value in zip(PERCENTILES, values) }
+        statistics["max_ms"] = float(samples.max())
+        statistics["calls"] = self.total
+        return statistics
+
+
+def timed(name, func):
+    ring = timings.setdefault(name, RingBuffer())
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            ring.add(time.perf_counter() - start)
+    return wrapper
+
+
+def patch(cls, names):
+    for name in names:
+        setattr(cls, name, timed("{}.{}".format(cls.__name__, name), getattr(cls, name)))
+
+
+def instrument_class(cls, names):
+    registered.append((cls, names))
+    if enabled:
+        patch(cls, names)
+
+
+def enable(path=None):
+    global enabled, dump_path
+    if enabled:
+        return
+
+    enabled = True
+    for cls, names in registered:
+        patch(cls, names)
+
+    if path in [ None, "", "1", "on" ]:
+        path = os.path.join(tempfile.gettempdir(), "SimpleColorPicker-timings.json")
+    dump_path = path
+    threading.Thread(target=dump_periodically, name="instrumentation", daemon=True).start()
+    atexit.register(dump)
+
+
+def statistics() -> dict:
+    return { name: ring.statistics() for name, ring in sorted(timings.items()) }
+
+
+def overlay_lines(class_names) -> list:
+    key = tuple(class_names)
+    cached = overlay_cache.get(key)
+    if cached is not None and time.perf_counter() - cached[0] < OVERLAY_INTERVAL:
+        return cached[1]
+
+    lines = []
+    for name, ring in sorted(timings.items()):
+        class_name, _, method_name = name.partition(".")
+        if class_name not in class_names or not ring.count:
+            continue
+        values = ring.statistics()
+        lines.append("{} {:.2f}/{:.2f}/{:.2f} ms".format(method_name, values["p50_ms"], values["p95_ms"], values["p99_ms"]))
+    overlay_cache[key] = (time.perf_counter(), lines)
+    return lines
+
+
+def dump():
+    report = { "time": time.time(), "pid": os.getpid(), "timings": statistics() }
+    temporary_path = dump_path + ".tmp"
+    with open(temporary_path, "w") as stream:
+        json.dump(report, stream, indent=2)
+    os.replace(temporary_path, dump_path)
+
+
+def dump_periodically():
+    while True:
+        time.sleep(DUMP_INTERVAL)
+        try:
+            dump()
+        except OSError:
+            pass
+
+
+if os.environ.get(ENVIRONMENT_VARIABLE):
+    enable(os.environ[ENVIRONMENT_VARIABLE])
@@ -1,12 +1,35 @@
 #!/bin/python
-from PyQt5.QtWidgets import QApplication, QWidget, QFrame, QGridLayout, QHBoxLayout, QTabWidget
-from PyQt5.QtWidgets import QCheckBox, QPushButton, QLabel, QLineEdit, QSpacerItem, QSizePolicy
+import os
+import sys
+import time
+
+startup_time = time.perf_counter()
+
+if __name__ == '__main__' and sys.argv[1:2] == ["convert"]:
+    import convert
+    sys.exit(convert.main(sys.argv[2:]))
+
+if __name__ == '__main__' and sys.argv[1:2]:
+    import daemon
+    if sys.argv[1] in daemon.COMMANDS:
+        sys.exit(daemon.main(sys.argv[1:]))
+
+from PyQt5.QtWidgets import QApplication, QWidget, QGridLayout, QHBoxLayout, QTabWidget
+from PyQt5.QtWidgets import QCheckBox, QPushButton, QLabel, QLineEdit, QSpacerItem, QSizePolicy, QListView
+from PyQt5.QtWidgets import QComboBox, QFileDialog
 from PyQt5.QtGui import QIcon, QColor, QRegExpValidator, QMouseEvent
-from PyQt5.QtCore import Qt, QEvent, QRegExp
+from PyQt5.QtCore import Qt, QObject, QEvent, QRegExp, QRect, QTimer
+from PyQt5.QtNetwork import QLocalServer
 from functools import partial
-import sys
-import picker
+import argparse
+import colors
+import daemon
+import events
+import gradients
+import history
 import images_qr
+import instrumentation
+import names
 
 
 class Tab:
@@ -14,23 +37,97 @@ class Tab:
     label: str
     frames = []
     line_edits = []
-    line_indicators = []
 
-    def __init__(self, widget, label):
+    def __init__(self, widget, label, space=None):
         self.widget = widget
         self.label = label
+        self.space = space
         self.frames = []
         self.line_edits = []
-        self.line_indicators = []
+        self.values = [ 0.0, 0.0, 0.0 ]
+        self.source_rgb = None
+
+
+class StartupProfile:
+
+    def __init__(self, start):
+        self.start = start
+        self.last = start
+        self.phases = []
+
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+
+    def report(self) -> str:
+        lines = [ "{:<16} {:8.1f} ms".format(phase, duration * 1000.0) for phase, duration in self.phases ]
+        lines.append("{:<16} {:8.1f} ms".format("total", (self.last - self.start) * 1000.0))
+        return "\n".join(lines)
+
+
+class DaemonServer(QObject):
+
+    def __init__(self, window):
+        super(DaemonServer, self).__init__()
+        self.window = window
+        self.server = QLocalServer()
+        self.server.newConnection.connect(self.on_new_connection)
+
+
+    def listen(self) -> bool:
+        path = daemon.socket_path()
+        QLocalServer.removeServer(path)
+        return self.server.listen(path)
+
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            connection.readyRead.connect(partial(self.on_ready_read, connection))
+            connection.disconnected.connect(connection.deleteLater)
+
+
+    def on_ready_read(self, connection):
+        if not connection.canReadLine():
+            return
+
+        command = bytes(connection.readLine()).decode(errors="replace").strip()
+        connection.write((self.handle_command(command) + "\n").encode())
+        connection.flush()
+        connection.disconnectFromServer()
+
+
+    def handle_command(self, command) -> str:
+        if command == "ping":
+            return "pong"
+        if command == "last":
+            return self.window.current_color.name().upper()
+        if command == "show":
+            self.window.show()
+            self.window.raise_()
+            self.window.activateWindow()
+            return "ok"
+        if command == "pick":
+            self.window.show_picker()
+            return "ok"
+        if command == "quit":
+            QTimer.singleShot(0, QApplication.quit)
+            return "ok"
+        return "error: unknown command '{}'".format(command)
 
 
 class MainWindow(QWidget):
 
-    def __init__(self):
+    def __init__(self, startup_profile=None, resident=False, follow_cursor=False):
         super(MainWindow, self).__init__()
 
-        self.picker_window = picker.PickerWindow(self)
-        self.picker_window.setWindowTitle("SimpleColorMagnifier")
+        self.startup_profile = startup_profile
+        self.resident = resident
+        self.follow_cursor = follow_cursor
+        self.picker_window = None
 
         self.setWindowTitle("SimpleColorPicker")
         self.setStyleSheet("background: #383C4A; color: #CFD6DF")
@@ -45,59 +142,55 @@ class MainWindow(QWidget):
 
         self.current_rgb = []
         self.current_hsv = []
-
-        self.main_gradient = QFrame()
-        self.main_gradient.setFixedSize(main_gradient_size, main_gradient_size)
-
-        black_overlay_stylesheet = """
-            background-color:
-                qlineargradient(spread:pad, x1:0, y1:0, x2:0, y2:1,
-                    stop:0 rgba(0, 0, 0, 0),
-                    stop:1 rgba(0, 0, 0, 255)
-                );"""
-        hue_gradient_stylesheet = """
-            background-color:
-                qlineargradient(spread:pad, x1:0, y1:1, x2:0, y2:0,
-                    stop:0 rgba(255, 0, 0, 255),
-                    stop:0.166 rgba(255, 255, 0, 255),
-                    stop:0.333 rgba(0, 255, 0, 255),
-                    stop:0.5 rgba(0, 255, 255, 255),
-                    stop:0.666 rgba(0, 0, 255, 255),
-                    stop:0.833 rgba(255, 0, 255, 255),
-                    stop:1 rgba(255, 0, 0, 255)
-                );"""
-
-        self.black_overlay = QFrame()
-        self.black_overlay.setFixedSize(main_gradient_size, main_gradient_size)
-        self.black_overlay.setStyleSheet(black_overlay_stylesheet)
-        self.black_overlay.mousePressEvent = self.on_main_gradient_click
-        self.black_overlay.mouseMoveEvent = self.on_main_gradient_click
-        self.black_overlay.wheelEvent = self.on_main_gradient_scroll
-        self.vertical_line = QFrame(self.black_overlay)
-        self.horizontal_line = QFrame(self.black_overlay)
-
-        self.hue_gradient = QFrame()
-        self.hue_gradient.setFixedSize(side_gradient_size, main_gradient_size - 2)
-        self.hue_gradient.setStyleSheet(hue_gradient_stylesheet)
-
-        click_func = partial(self.on_gradient_click, self.hue_gradient.height(), 359, 0, False, True, True)
-        scroll_func = partial(self.on_gradient_scroll, 359, 0, False, False, True)
+        self.frame_interval = 16
+        self.last_update_time = 0.0
+        self.editing_line_edit = None
+        self.invalidate_color_views()
+        self.update_timer = QTimer()
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.update_timer.timeout.connect(self.apply_color_update)
+        self.history_timer = QTimer()
+        self.history_timer.setSingleShot(True)
+        self.history_timer.setInterval(1000)
+        self.history_timer.timeout.connect(self.record_edit)
+
+        self.main_gradient = gradients.SaturationValuePlane(main_gradient_size, main_gradient_size)
+        main_drag = events.MoveCompressor(self.on_main_gradient_click)
+        self.main_gradient.mousePressEvent = main_drag
+        self.main_gradient.mouseMoveEvent = main_drag
+        self.main_gradient.wheelEvent = events.WheelAccumulator(self.on_main_gradient_scroll)
+
+        self.hue_gradient = gradients.GradientFrame(side_gradient_size, main_gradient_size - 2, True)
+        self.hue_gradient.set_stops(gradients.HUE_STOPS)
+
+        click_func = events.MoveCompressor(partial(self.on_gradient_click, self.hue_gradient.height(), 359, 0, False, True, True))
+        scroll_func = events.WheelAccumulator(partial(self.on_gradient_scroll, 359, 0, False, False, True))
         self.hue_gradient.mousePressEvent = click_func
         self.hue_gradient.mouseMoveEvent = click_func
         self.hue_gradient.wheelEvent = scroll_func
-        self.hue_line = QFrame(self.hue_gradient)
 
         self.rgb_tab = self.generate_tab_widget("RGB", [ 255, 255, 255 ], True)
         self.hsv_tab = self.generate_tab_widget("HSV", [ 360, 255, 255 ], False)
+        self.hsv_tab.frames[0].set_stops(gradients.HUE_STOPS)
+        self.perceptual_tabs = [ self.generate_perceptual_tab(colors.LAB_SPACE), self.generate_perceptual_tab(colors.OKLCH_SPACE) ]
+        self.color_names = None
         self.values_tab = self.generate_values_tab()
+        self.history_tab = self.generate_history_tab()
+        self.palette_tab = self.generate_palette_tab()
 
         self.tab_widget = QTabWidget()
-        self.tab_widget.setStyleSheet("QTabWidget::pane { border: 0; }")
+        self.tab_widget.setStyleSheet("QTabWidget::pane { border: 0; } QTabBar::tab { padding: 4px 5px; }")
         self.tab_widget.addTab(self.rgb_tab.widget, "RGB")
         self.tab_widget.addTab(self.hsv_tab.widget, "HSV")
+        for tab in self.perceptual_tabs:
+            self.tab_widget.addTab(tab.widget, tab.label)
         self.tab_widget.addTab(self.values_tab, "Values")
+        self.tab_widget.addTab(self.history_tab, "History")
+        self.tab_widget.addTab(self.palette_tab, "Palette")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
 
-        self.current_color_frame = QFrame()
+        self.current_color_frame = gradients.ColorSwatch()
         self.current_color_frame.setFixedSize(int(main_gradient_size * 0.3), side_gradient_size)
 
         picker_button = QPushButton("")
@@ -132,19 +225,28 @@ class MainWindow(QWidget):
         layout = QGridLayout(self)
         layout.setSpacing(15)
         layout.addWidget(self.main_gradient, 0, 0, 1, 1)
-        layout.addWidget(self.black_overlay, 0, 0, 1, 1)
         layout.addWidget(self.hue_gradient, 0, 1)
         layout.addWidget(self.tab_widget, 2, 0, 1, 2)
         layout.addWidget(bottom_widget, 3, 0, 1, 2)
         self.setLayout(layout)
 
-        self.current_color = QColor(23, 23, 33)
-        self.show()
+        self.names_loader = names.NameIndexLoader()
+        self.names_loader.loaded.connect(self.on_names_loaded)
+        self.names_loader.start()
+
+        self.current_color = colors.Color.from_rgb(23, 23, 33)
+        if not self.resident:
+            self.show()
         self.on_color_updated()
+        self.apply_color_update()
 
 
     def eventFilter(self, source, event):
+        if event.type() == QEvent.Type.Paint and self.startup_profile is not None:
+            QTimer.singleShot(0, self.report_startup)
+            return False
         if event.type() == QEvent.Type.Show:
+            self.invalidate_color_views()
             self.on_color_updated()
             return True
         return False
@@ -152,26 +254,132 @@ class MainWindow(QWidget):
 
     def on_color_updated(self):
         if self.current_color.hue() < 0:
-            self.current_color.setHsv(0, self.current_color.saturation(), self.current_color.value())
-        self.current_rgb = [ self.current_color.red(), self.current_color.green(), self.current_color.blue() ]
-        self.current_hsv = [ self.current_color.hue(), self.current_color.saturation(), self.current_color.value() ]
-        self.current_rgbF = [ self.current_color.redF(), self.current_color.greenF(), self.current_color.blueF() ]
-        self.current_hsvF = [ self.current_color.hueF(), self.current_color.saturationF(), self.current_color.valueF() ]
-
-        current_hue_percent = self.current_color.hue() / 359.0 * 100.0
-        self.main_gradient.setStyleSheet("""background-color:
-                                                qlineargradient(spread:pad, x1:1, x2:0,
-                                                    stop:0 hsl({}%,100%,50%),
-                                                    stop:1 rgba(255, 255, 255, 255));""".format(current_hue_percent))
-        self.current_color_frame.setStyleSheet("background: {}".format(self.current_color.name().upper()))
-
-        self.update_rgb_tab()
-        self.update_hsv_tab()
-        self.update_values_tab()
-        self.update_lines()
-
-        if self.hex_line_edit.text() != self.current_color.name().upper():
+            self.current_color = colors.Color.from_hsv(0, self.current_color.saturation(), self.current_color.value())
+        self.current_rgb = list(self.current_color.rgb())
+        self.current_hsv = list(self.current_color.hsv())
+        self.current_rgbF = list(self.current_color.rgb_f())
+        self.current_hsvF = list(self.current_color.hsv_f())
+        self.schedule_color_update()
+
+
+    def on_color_edited(self):
+        self.on_color_updated()
+        self.history_timer.start()
+
+
+    def on_color_picked(self, color):
+        self.current_color = color
+        self.on_color_updated()
+        self.history_timer.stop()
+        self.history_model.add(self.current_color.rgb(), history.PICKED)
+
+
+    def record_edit(self):
+        self.history_model.add(self.current_color.rgb(), history.EDITED)
+
+
+    def on_history_activated(self, index):
+        _, red, green, blue, _ = self.history_model.entry(index.row())
+        self.current_color = colors.Color.from_rgb(red, green, blue)
+        self.on_color_updated()
+
+
+    def on_names_loaded(self, index):
+        self.color_names = index
+        self.update_name_line_edit()
+
+
+    def on_open_image(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open image", "", "Images (*.png *.jpg *.jpeg *.bmp *.gif *.webp *.tif *.tiff);;All files (*)")
+        if path:
+            self.extract_palette(path)
+
+
+    def on_palette_method_changed(self):
+        if self.palette_path is not None:
+            self.extract_palette(self.palette_path)
+
+
+    def extract_palette(self, path):
+        if self.palette_extractor is None:
+            import palette
+            self.palette_extractor = palette.PaletteExtractor()
+            self.palette_extractor.finished.connect(self.on_palette_extracted)
+            self.palette_extractor.failed.connect(self.on_palette_failed)
+
+        self.palette_path = path
+        self.palette_status_label.setText("Reading {}...".format(os.path.basename(path)))
+        self.palette_extractor.extract(path, len(self.palette_swatches), self.palette_method_combo_box.currentText())
+
+
+    def on_palette_extracted(self, path, palette):
+        self.palette = palette
+        for i, swatch in enumerate(self.palette_swatches):
+            if i < len(palette):
+                rgb, fraction = palette[i]
+                swatch.set_color(QColor(*rgb))
+                swatch.setToolTip("#{:02X}{:02X}{:02X}   {:.1f}%".format(*rgb, fraction * 100))
+            swatch.setVisible(i < len(palette))
+        self.palette_status_label.setText(os.path.basename(path))
+
+
+    def on_palette_failed(self, path, message):
+        self.palette_status_label.setText(message)
+
+
+    def on_swatch_clicked(self, index, a0):
+        if index < len(self.palette):
+            self.on_color_picked(colors.Color.from_rgb(*self.palette[index][0]))
+
+
+    def schedule_color_update(self):
+        if self.update_timer.isActive():
+            return
+
+        elapsed = (time.perf_counter() - self.last_update_time) * 1000.0
+        self.update_timer.start(max(0, int(self.frame_interval - elapsed)))
+
+
+    def invalidate_color_views(self):
+        self.rendered_rgbF = None
+        self.rendered_hsvF = None
+        self.rendered_raw = None
+        self.rendered_line_color = None
+
+
+    def changed_channels(self, current, rendered):
+        if rendered is None:
+            return [ True, True, True ]
+        return [ current[i] != rendered[i] for i in range(3) ]
+
+
+    def apply_color_update(self):
+        self.update_timer.stop()
+        self.last_update_time = time.perf_counter()
+
+        raw = bool(self.raw_check_box.checkState())
+        rgb_changed = self.changed_channels(self.current_rgbF, self.rendered_rgbF)
+        hsv_changed = self.changed_channels(self.current_hsvF, self.rendered_hsvF)
+        format_changed = raw != self.rendered_raw
+        self.rendered_rgbF = list(self.current_rgbF)
+        self.rendered_hsvF = list(self.current_hsvF)
+        self.rendered_raw = raw
+
+        if hsv_changed[0]:
+            self.main_gradient.set_hue(self.current_color.hue())
+        if any(rgb_changed):
+            self.current_color_frame.set_color(QColor(*self.current_rgb))
+
+        self.update_rgb_tab(rgb_changed, format_changed)
+        self.update_hsv_tab(hsv_changed, format_changed)
+        self.update_values_tab(rgb_changed, hsv_changed)
+        self.update_lines(rgb_changed, hsv_changed)
+        for tab in self.perceptual_tabs:
+            self.update_perceptual_tab(tab)
+
+        if any(rgb_changed) and self.hex_line_edit.text() != self.current_color.name().upper():
             self.set_text_with_blocked_signals(self.hex_line_edit, self.current_color.name().upper())
+        self.editing_line_edit = None
 
 
     def on_raw_changed(self):
@@ -181,14 +389,35 @@ class MainWindow(QWidget):
             else:
                 self.set_non_raw_validator(line_edit)
 
-        self.update_rgb_tab()
-        self.update_hsv_tab()
+        self.schedule_color_update()
+
+
+    def on_tab_changed(self, index):
+        for tab in self.perceptual_tabs:
+            self.update_perceptual_tab(tab)
 
 
     def show_picker(self):
+        self.create_picker_window()
         self.picker_window.show()
 
 
+    def create_picker_window(self):
+        if self.picker_window is None:
+            import picker
+            self.picker_window = picker.PickerWindow(self, self.follow_cursor)
+            self.picker_window.setWindowTitle("SimpleColorMagnifier")
+
+
+    def report_startup(self):
+        if self.startup_profile is None:
+            return
+
+        self.startup_profile.mark("first paint")
+        print(self.startup_profile.report(), file=sys.stderr)
+        self.startup_profile = None
+
+
     def on_hex_value_changed(self):
         text = self.hex_line_edit.text()
         if len(text) == 0:
@@ -202,8 +431,8 @@ class MainWindow(QWidget):
         if len(text) < 7:
             return
 
-        self.current_color = QColor(self.hex_line_edit.text())
-        self.on_color_updated()
+        self.current_color = colors.Color.from_name(self.hex_line_edit.text())
+        self.on_color_edited()
 
 
     def set_text_with_blocked_signals(self, line_edit, text) -> str:
@@ -232,25 +461,24 @@ class MainWindow(QWidget):
             return
 
         self.current_color = color
-        self.on_color_updated()
+        self.on_color_edited()
 
 
     def on_line_edit_clicked(self, line_edit, a0):
         line_edit.setSelection(0, len(line_edit.text()))
 
 
-    def on_main_gradient_scroll(self, a0):
-        if a0.angleDelta().y() != 0:
-            self.on_gradient_scroll(255, 1, False, False, True, a0)
-        if a0.angleDelta().x() != 0:
-            self.on_gradient_scroll(255, 2, False, True, False, a0)
+    def on_main_gradient_scroll(self, steps):
+        if steps.y() != 0:
+            self.on_gradient_scroll(255, 1, False, False, True, steps)
+        if steps.x() != 0:
+            self.on_gradient_scroll(255, 2, False, True, False, steps)
 
 
-    def on_gradient_scroll(self, max_value, changing_index, is_rgb, is_horizontal, invert_scroll, a0):
+    def on_gradient_scroll(self, max_value, changing_index, is_rgb, is_horizontal, invert_scroll, steps):
         current_colors = self.current_rgb if is_rgb else self.current_hsv
         current_value = current_colors[changing_index]
-        angle = a0.angleDelta().x() if is_horizontal else a0.angleDelta().y()
-        delta = 1 if angle > 0 else -1
+        delta = steps.x() if is_horizontal else steps.y()
         if invert_scroll:
             delta = -delta
         value = current_value - int(delta)
@@ -260,7 +488,7 @@ class MainWindow(QWidget):
             return
 
         self.current_color = color
-        self.on_color_updated()
+        self.on_color_edited()
 
 
     def on_text_changed(self, line_edit, max_value, changing_index, is_rgb):
@@ -281,18 +509,58 @@ class MainWindow(QWidget):
             line_edit.setText(str(max))
             line_edit.blockSignals(False)
 
-        current_colors = self.current_rgb if is_rgb else self.current_hsv
+        if self.raw_check_box.checkState():
+            current_colors = self.current_rgbF if is_rgb else self.current_hsvF
+        else:
+            current_colors = self.current_rgb if is_rgb else self.current_hsv
         color = self.current_color_with_value(value, changing_index, current_colors, is_rgb, True)
         if self.current_color == color:
             return
 
         self.current_color = color
-        line_edit.blockSignals(True)
-        self.on_color_updated()
+        self.editing_line_edit = line_edit
+        self.on_color_edited()
+
+
+
+    def on_perceptual_click(self, tab, changing_index, a0):
+        frame = tab.frames[changing_index]
+        fraction = max(0.0, min(1.0, a0.x() / (frame.width() - 1)))
+        minimum = tab.space.minimums[changing_index]
+        self.set_perceptual_value(tab, changing_index, minimum + fraction * (tab.space.maximums[changing_index] - minimum))
+
+
+    def on_perceptual_scroll(self, tab, changing_index, steps):
+        self.set_perceptual_value(tab, changing_index, tab.values[changing_index] + steps.y() * tab.space.steps[changing_index])
+
+
+    def on_perceptual_text_changed(self, tab, changing_index, line_edit):
+        try:
+            value = float(line_edit.text())
+        except ValueError:
+            return
+
+        self.editing_line_edit = line_edit
+        self.set_perceptual_value(tab, changing_index, value)
+
+
+    def set_perceptual_value(self, tab, changing_index, value):
+        space = tab.space
+        tab.values[changing_index] = max(space.minimums[changing_index], min(space.maximums[changing_index], value))
+        rgb = [ int(channel) for channel in space.to_rgb(tab.values) ]
+        tab.source_rgb = rgb
+        color = colors.Color.from_rgb(*rgb)
+        if self.current_color == color:
+            self.update_perceptual_tab(tab)
+            self.editing_line_edit = None
+            return
 
+        self.current_color = color
+        self.on_color_edited()
 
 
-    def current_color_with_value(self, value, changing_index, current_colors, is_rgb, check_raw) -> QColor:
+
+    def current_color_with_value(self, value, changing_index, current_colors, is_rgb, check_raw) -> colors.Color:
         v = [ 0.0, 0.0, 0.0 ]
         for i in range(3):
             if changing_index == i:
@@ -302,69 +570,50 @@ class MainWindow(QWidget):
 
         if self.raw_check_box.checkState() and check_raw:
             if is_rgb:
-                color = QColor.fromRgbF(v[0], v[1], v[2])
+                color = colors.Color.from_rgb_f(v[0], v[1], v[2])
             else:
-                if v[0] == 1.0:
-                    v[0] = 0.999
-                color = QColor.fromHsvF(v[0], v[1], v[2])
+                color = colors.Color.from_hsv_f(v[0], v[1], v[2])
         else:
             if is_rgb:
-                color = QColor.fromRgb(int(v[0]), int(v[1]), int(v[2]))
+                color = colors.Color.from_rgb(int(v[0]), int(v[1]), int(v[2]))
             else:
-                color = QColor.fromHsv(int(v[0]), int(v[1]), int(v[2]))
+                color = colors.Color.from_hsv(int(v[0]), int(v[1]), int(v[2]))
         return color
 
 
-    def update_rgb_tab(self):
-        c1 = "stop:0 rgba(0, {}, {}, 255), stop:1 rgba(255, {}, {}, 255)".format(
-            self.current_color.green(), self.current_color.blue(), self.current_color.green(), self.current_color.blue())
-        c2 = "stop:0 rgba({}, 0, {}, 255), stop:1 rgba({}, 255, {}, 255)".format(
-            self.current_color.red(), self.current_color.blue(), self.current_color.red(), self.current_color.blue())
-        c3 = "stop:0 rgba({}, {}, 0, 255), stop:1 rgba({}, {}, 255, 255)".format(
-            self.current_color.red(), self.current_color.green(), self.current_color.red(), self.current_color.green())
+    def update_rgb_tab(self, changed, format_changed):
+        red, green, blue = self.current_rgb
+        c1 = [ (0, QColor(0, green, blue)), (1, QColor(255, green, blue)) ]
+        c2 = [ (0, QColor(red, 0, blue)), (1, QColor(red, 255, blue)) ]
+        c3 = [ (0, QColor(red, green, 0)), (1, QColor(red, green, 255)) ]
         arr = [ c1, c2, c3 ]
         tarr = self.current_rgbF if self.raw_check_box.checkState() else self.current_rgb
-        self.update_color_tab(self.rgb_tab, arr, tarr)
-
-
-    def update_hsv_tab(self):
-        c1 = """
-            stop:0 rgba(255, 0, 0, 255),
-            stop:0.166 rgba(255, 255, 0, 255),
-            stop:0.333 rgba(0, 255, 0, 255),
-            stop:0.5 rgba(0, 255, 255, 255),
-            stop:0.666 rgba(0, 0, 255, 255),
-            stop:0.833 rgba(255, 0, 255, 255),
-            stop:1 rgba(255, 0, 0, 255)
-        """
-
-        saturated = QColor(self.current_color)
-        unsaturated = QColor(self.current_color)
-        saturated.setHsv(saturated.hue(), 255, saturated.value())
-        unsaturated.setHsv(unsaturated.hue(), 0, unsaturated.value())
-        c2 = "stop:0 rgba({}, {}, {}, 255), stop:1 rgba({}, {}, {}, 255)".format(
-            unsaturated.red(), unsaturated.green(), unsaturated.blue(), saturated.red(), saturated.green(), saturated.blue())
-
-        valued = QColor(self.current_color)
-        unvalued = QColor(self.current_color)
-        valued.setHsv(valued.hue(), valued.saturation(), 255)
-        unvalued.setHsv(unvalued.hue(), unvalued.saturation(), 0)
-        c3 = "stop:0 rgba({}, {}, {}, 255), stop:1 rgba({}, {}, {}, 255)".format(
-            unvalued.red(), unvalued.green(), unvalued.blue(), valued.red(), valued.green(), valued.blue())
+        stops_changed = [ changed[1] or changed[2], changed[0] or changed[2], changed[0] or changed[1] ]
+        self.update_color_tab(self.rgb_tab, arr, tarr, stops_changed, changed, format_changed)
 
-        arr = [ c1, c2, c3 ]
+
+    def update_hsv_tab(self, changed, format_changed):
+        hue, saturation, value = self.current_hsv
+        saturated = colors.Color.from_hsv(hue, 255, value)
+        unsaturated = colors.Color.from_hsv(hue, 0, value)
+        c2 = [ (0, QColor(*unsaturated.rgb())), (1, QColor(*saturated.rgb())) ]
+
+        valued = colors.Color.from_hsv(hue, saturation, 255)
+        unvalued = colors.Color.from_hsv(hue, saturation, 0)
+        c3 = [ (0, QColor(*unvalued.rgb())), (1, QColor(*valued.rgb())) ]
+
+        arr = [ gradients.HUE_STOPS, c2, c3 ]
         tarr = self.current_hsvF if self.raw_check_box.checkState() else self.current_hsv
-        self.update_color_tab(self.hsv_tab, arr, tarr)
+        stops_changed = [ False, changed[0] or changed[2], changed[0] or changed[1] ]
+        self.update_color_tab(self.hsv_tab, arr, tarr, stops_changed, changed, format_changed)
 
 
-    def update_color_tab(self, tab, arr, tarr):
-        stylesheet_start = "background-color: qlineargradient(spread:pad, x1:0, y1:0, x2:1, y2:0"
+    def update_color_tab(self, tab, arr, tarr, stops_changed, changed, format_changed):
         for i in range(len(tab.frames)):
-            if tab.line_edits[i].signalsBlocked():
-                tab.line_edits[i].blockSignals(False)
+            if stops_changed[i]:
+                tab.frames[i].set_stops(arr[i])
+            if tab.line_edits[i] is self.editing_line_edit or not (changed[i] or format_changed):
                 continue
-            stylesheet = stylesheet_start + ", {});".format(arr[i])
-            tab.frames[i].setStyleSheet(stylesheet)
             tab.line_edits[i].blockSignals(True)
             if self.raw_check_box.checkState():
                 tab.line_edits[i].setText("{:.3f}".format(tarr[i]))
@@ -373,57 +622,96 @@ class MainWindow(QWidget):
             tab.line_edits[i].blockSignals(False)
 
 
-    def update_values_tab(self):
-        self.values_hex_line_edit.setText("{}".format(self.current_color.name().upper()))
-        self.values_rgb_line_edit.setText("{}, {}, {}".format(self.current_color.red(), self.current_color.green(), self.current_color.blue()))
-        self.values_rgbf_line_edit.setText("{:.3f}, {:.3f}, {:.3f}".format(self.current_color.redF(), self.current_color.greenF(), self.current_color.blueF()))
-        self.values_hsv_line_edit.setText("{}, {}, {}".format(self.current_color.hue(), self.current_color.saturation(), self.current_color.value()))
-        self.values_hsvf_line_edit.setText("{:.3f}, {:.3f}, {:.3f}".format(self.current_color.hueF(), self.current_color.saturationF(), self.current_color.valueF()))
-
-
-    def update_lines(self):
-        inverted_color = QColor(self.current_color)
-        inverted_color.setHsv(
-            (inverted_color.hue() + 180) % 359,
-            min(inverted_color.saturation(), inverted_color.value()),
-            max(inverted_color.saturation(), 255 - inverted_color.value()))
-        inverted_color.setHsv(inverted_color.hue(), 255, 255)
-
-        stylesheet = "background-color: rgba({},{},{},185)".format(
-            inverted_color.red(), inverted_color.green(), inverted_color.blue())
-        self.vertical_line.setStyleSheet(stylesheet)
-        self.horizontal_line.setStyleSheet(stylesheet)
-        self.hue_line.setStyleSheet(stylesheet)
-
-        self.vertical_line.setGeometry(
-            int(self.current_color.saturation() * self.main_gradient.width() / 255.0) - 1,
-            0,
-            2,
-            self.main_gradient.height())
-
-        self.horizontal_line.setGeometry(
-            0,
-            int((255 - self.current_color.value()) * self.main_gradient.height() / 255.0) - 1,
-            self.main_gradient.width(),
-            2)
-
-        self.hue_line.setGeometry(
-            0,
-            int((359 - self.current_color.hue()) * self.hue_gradient.height() / 359.0) - 1,
-            self.hue_gradient.width(),
-            2)
-
-        self.update_tab_lines(self.rgb_tab, self.current_rgb, stylesheet)
-        self.update_tab_lines(self.hsv_tab, self.current_hsv, stylesheet)
-
-
-    def update_tab_lines(self, tab, current_colors, stylesheet):
-        for i in range(len(tab.line_indicators)):
+    def update_perceptual_tab(self, tab):
+        if self.tab_widget.currentWidget() is not tab.widget:
+            return
+
+        space = tab.space
+        if self.current_rgb != tab.source_rgb:
+            values = [ float(value) for value in space.from_rgb(self.current_rgb) ]
+            if space.hue_channel is not None and values[1] < 0.0005:
+                values[space.hue_channel] = tab.values[space.hue_channel]
+            tab.values = values
+            tab.source_rgb = list(self.current_rgb)
+
+        for i in range(3):
+            minimum = space.minimums[i]
+            maximum = space.maximums[i]
+            tab.frames[i].set_channel(tab.values, i, minimum, maximum, space.to_rgb)
+            if self.rendered_line_color is not None:
+                ax = int((tab.values[i] - minimum) / (maximum - minimum) * tab.frames[i].width())
+                tab.frames[i].set_indicators([ QRect(ax - 1, 0, 2, tab.frames[i].height()) ], self.rendered_line_color)
+            if tab.line_edits[i] is self.editing_line_edit:
+                continue
+            text = "{:.{}f}".format(tab.values[i], space.decimals[i])
+            if tab.line_edits[i].text() != text:
+                self.set_text_with_blocked_signals(tab.line_edits[i], text)
+
+
+    def update_values_tab(self, rgb_changed, hsv_changed):
+        if any(rgb_changed):
+            self.values_hex_line_edit.setText("{}".format(self.current_color.name().upper()))
+            self.values_rgb_line_edit.setText("{}, {}, {}".format(*self.current_rgb))
+            self.values_rgbf_line_edit.setText("{:.3f}, {:.3f}, {:.3f}".format(*self.current_rgbF))
+            self.update_name_line_edit()
+        if any(hsv_changed):
+            self.values_hsv_line_edit.setText("{}, {}, {}".format(*self.current_hsv))
+            self.values_hsvf_line_edit.setText("{:.3f}, {:.3f}, {:.3f}".format(*self.current_hsvF))
+
+
+    def update_name_line_edit(self):
+        if self.color_names is None:
+            return
+
+        nearest = self.color_names.nearest(*self.current_rgb)
+        if nearest is None:
+            self.values_name_line_edit.setText("")
+            return
+        name, rgb, _ = nearest
+        self.values_name_line_edit.setText(name if list(rgb) == self.current_rgb else "~" + name)
+
+
+    def update_lines(self, rgb_changed, hsv_changed):
+        line_color = self.rendered_line_color
+        if any(hsv_changed):
+            inverted_color = colors.Color.from_hsv((self.current_color.hue() + 180) % 359, 255, 255)
+            line_color = QColor(*inverted_color.rgb(), 185)
+
+            vertical_line = QRect(
+                int(self.current_color.saturation() * self.main_gradient.width() / 255.0) - 1,
+                0,
+                2,
+                self.main_gradient.height())
+
+            horizontal_line = QRect(
+                0,
+                int((255 - self.current_color.value()) * self.main_gradient.height() / 255.0) - 1,
+                self.main_gradient.width(),
+                2)
+
+            hue_line = QRect(
+                0,
+                int((359 - self.current_color.hue()) * self.hue_gradient.height() / 359.0) - 1,
+                self.hue_gradient.width(),
+                2)
+
+            self.main_gradient.set_indicators([ vertical_line, horizontal_line ], line_color)
+            self.hue_gradient.set_indicators([ hue_line ], line_color)
+
+        color_changed = line_color != self.rendered_line_color
+        self.rendered_line_color = line_color
+        self.update_tab_lines(self.rgb_tab, self.current_rgb, line_color, [ c or color_changed for c in rgb_changed ])
+        self.update_tab_lines(self.hsv_tab, self.current_hsv, line_color, [ c or color_changed for c in hsv_changed ])
+
+
+    def update_tab_lines(self, tab, current_colors, line_color, changed):
+        for i in range(len(tab.frames)):
+            if not changed[i]:
+                continue
             ax = int(current_colors[i] / 255.0 * tab.frames[i].width())
             if tab.label == "HSV" and i == 0:
                 ax = int(ax * 255.0 / 359.0)
-            tab.line_indicators[i].setGeometry(ax - 1, 0, 2, tab.frames[i].height())
-            tab.line_indicators[i].setStyleSheet(stylesheet)
+            tab.frames[i].set_indicators([ QRect(ax - 1, 0, 2, tab.frames[i].height()) ], line_color)
 
 
     def generate_tab_widget(self, name, max_values, is_rgb) -> Tab:
@@ -441,8 +729,7 @@ class MainWindow(QWidget):
             layout.addWidget(label, i, 0)
 
             frame_width = 310
-            frame = QFrame()
-            frame.setFixedSize(frame_width, 20)
+            frame = gradients.GradientFrame(frame_width, 20)
             layout.addWidget(frame, i, 1)
             tab.frames.append(frame)
 
@@ -453,8 +740,8 @@ class MainWindow(QWidget):
             layout.addWidget(line_edit, i, 2)
             tab.line_edits.append(line_edit)
 
-            click_func = partial(self.on_gradient_click, frame_width, max_values[i], i, is_rgb, False, False)
-            scroll_func = partial(self.on_gradient_scroll, max_values[i], i, is_rgb, False, True)
+            click_func = events.MoveCompressor(partial(self.on_gradient_click, frame_width, max_values[i], i, is_rgb, False, False))
+            scroll_func = events.WheelAccumulator(partial(self.on_gradient_scroll, max_values[i], i, is_rgb, False, True))
             text_change_func = partial(self.on_text_changed, line_edit, max_values[i], i, is_rgb)
 
             frame.mousePressEvent = click_func
@@ -463,8 +750,43 @@ class MainWindow(QWidget):
             line_edit.wheelEvent = scroll_func
             line_edit.textChanged.connect(text_change_func)
 
-            line_indicator = QFrame(frame)
-            tab.line_indicators.append(line_indicator)
+        return tab
+
+
+    def generate_perceptual_tab(self, space) -> Tab:
+        layout = QGridLayout()
+        layout.setHorizontalSpacing(10)
+        layout.setVerticalSpacing(7)
+        layout.setContentsMargins(0, 20, 0, 15)
+        widget = QWidget()
+        widget.setLayout(layout)
+        tab = Tab(widget, space.name, space)
+        for i in range(3):
+            label = QLabel(space.labels[i])
+            label.setFixedWidth(10)
+            label.setAlignment(Qt.AlignmentFlag(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter))
+            layout.addWidget(label, i, 0)
+
+            frame_width = 310
+            frame = gradients.GradientFrame(frame_width, 20)
+            layout.addWidget(frame, i, 1)
+            tab.frames.append(frame)
+
+            line_edit = QLineEdit()
+            line_edit.setFixedSize(55, 20)
+            line_edit.setAlignment(Qt.AlignmentFlag(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter))
+            line_edit.setValidator(QRegExpValidator(QRegExp("-?[0-9]{,3}(\\.[0-9]{,3})?"), line_edit))
+            layout.addWidget(line_edit, i, 2)
+            tab.line_edits.append(line_edit)
+
+            click_func = events.MoveCompressor(partial(self.on_perceptual_click, tab, i))
+            scroll_func = events.WheelAccumulator(partial(self.on_perceptual_scroll, tab, i))
+
+            frame.mousePressEvent = click_func
+            frame.mouseMoveEvent = click_func
+            frame.wheelEvent = scroll_func
+            line_edit.wheelEvent = scroll_func
+            line_edit.textChanged.connect(partial(self.on_perceptual_text_changed, tab, i, line_edit))
 
         return tab
 
@@ -475,6 +797,7 @@ class MainWindow(QWidget):
         values_rgbf_label = QLabel("RGBF:")
         values_hsv_label = QLabel("HSV:")
         values_hsvf_label = QLabel("HSVF:")
+        values_name_label = QLabel("Name:")
 
         self.values_hex_line_edit = QLineEdit()
         self.values_hex_line_edit.setReadOnly(True)
@@ -491,6 +814,9 @@ class MainWindow(QWidget):
         self.values_hsvf_line_edit = QLineEdit()
         self.values_hsvf_line_edit.setReadOnly(True)
         self.values_hsvf_line_edit.mouseReleaseEvent = partial(self.on_line_edit_clicked, self.values_hsvf_line_edit)
+        self.values_name_line_edit = QLineEdit()
+        self.values_name_line_edit.setReadOnly(True)
+        self.values_name_line_edit.mouseReleaseEvent = partial(self.on_line_edit_clicked, self.values_name_line_edit)
 
         values_layout = QGridLayout()
         values_layout.setContentsMargins(0, 20, 0, 15)
@@ -505,6 +831,8 @@ class MainWindow(QWidget):
         values_layout.addWidget(self.values_rgb_line_edit, 1, 1)
         values_layout.addWidget(values_rgbf_label, 2, 0)
         values_layout.addWidget(self.values_rgbf_line_edit, 2, 1)
+        values_layout.addWidget(values_name_label, 0, 3)
+        values_layout.addWidget(self.values_name_line_edit, 0, 4)
         values_layout.addWidget(values_hsv_label, 1, 3)
         values_layout.addWidget(self.values_hsv_line_edit, 1, 4)
         values_layout.addWidget(values_hsvf_label, 2, 3)
@@ -514,6 +842,56 @@ class MainWindow(QWidget):
         return values_widget
 
 
+    def generate_history_tab(self):
+        self.history_model = history.HistoryModel(history.HistoryStore())
+        self.history_view = QListView()
+        self.history_view.setUniformItemSizes(True)
+        self.history_view.setModel(self.history_model)
+        self.history_view.activated.connect(self.on_history_activated)
+        self.history_view.clicked.connect(self.on_history_activated)
+
+        history_layout = QGridLayout()
+        history_layout.setContentsMargins(0, 10, 0, 5)
+        history_layout.addWidget(self.history_view, 0, 0)
+        history_widget = QWidget()
+        history_widget.setLayout(history_layout)
+        return history_widget
+
+
+    def generate_palette_tab(self):
+        self.palette = []
+        self.palette_path = None
+        self.palette_extractor = None
+
+        open_button = QPushButton("Open image...")
+        open_button.released.connect(self.on_open_image)
+        self.palette_method_combo_box = QComboBox()
+        self.palette_method_combo_box.addItems([ "median-cut", "k-means" ])
+        self.palette_method_combo_box.currentIndexChanged.connect(self.on_palette_method_changed)
+        self.palette_status_label = QLabel("")
+
+        palette_layout = QGridLayout()
+        palette_layout.setContentsMargins(0, 20, 0, 15)
+        palette_layout.setHorizontalSpacing(6)
+        palette_layout.setVerticalSpacing(10)
+        palette_layout.addWidget(open_button, 0, 0, 1, 3)
+        palette_layout.addWidget(self.palette_method_combo_box, 0, 3, 1, 2)
+        palette_layout.addWidget(self.palette_status_label, 0, 5, 1, 3)
+
+        self.palette_swatches = []
+        for i in range(8):
+            swatch = gradients.ColorSwatch()
+            swatch.setFixedSize(44, 30)
+            swatch.mousePressEvent = partial(self.on_swatch_clicked, i)
+            swatch.setVisible(False)
+            palette_layout.addWidget(swatch, 1, i)
+            self.palette_swatches.append(swatch)
+
+        palette_widget = QWidget()
+        palette_widget.setLayout(palette_layout)
+        return palette_widget
+
+
     def set_raw_validator(self, line_edit):
         reg_ex = QRegExp("^([01.]{,1}|[01].)[0-9]{,3}")
         input_validator = QRegExpValidator(reg_ex, line_edit)
@@ -527,10 +905,49 @@ class MainWindow(QWidget):
 
 
     def closeEvent(self, event):
+        if self.resident:
+            event.ignore()
+            self.hide()
+            return
+        self.names_loader.wait()
+        if self.palette_extractor is not None:
+            self.palette_extractor.shutdown()
         app.quit()
 
 
+instrumentation.instrument_class(MainWindow, [ "on_color_updated", "apply_color_update", "update_rgb_tab", "update_hsv_tab", "update_color_tab",
+                                               "update_perceptual_tab", "update_values_tab", "update_name_line_edit", "update_lines", "update_tab_lines" ])
+
+
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    w = MainWindow()
+    parser = argparse.ArgumentParser(description="A minimal color picker")
+    parser.add_argument("--profile-startup", action="store_true", help="print a startup time breakdown to stderr")
+    parser.add_argument("--daemon", action="store_true", help="stay resident and hidden, controlled through 'main.py show|pick|last|quit'")
+    parser.add_argument("--follow-cursor", action="store_true", help="use a small magnifier window that follows the cursor instead of a desktop overlay")
+    parser.add_argument("--instrument", nargs="?", const="1", metavar="PATH", help="time the hot paths, show them on the magnifier and dump them as JSON to PATH")
+    args, qt_args = parser.parse_known_args()
+    if args.instrument:
+        instrumentation.enable(args.instrument)
+
+    if args.daemon and daemon.is_running():
+        print("SimpleColorPicker is already running in daemon mode", file=sys.stderr)
+        sys.exit(1)
+
+    profile = StartupProfile(startup_time) if args.profile_startup else None
+    if profile is not None:
+        profile.mark("imports")
+    app = QApplication(sys.argv[:1] + qt_args)
+    if profile is not None:
+        profile.mark("application")
+    w = MainWindow(profile, args.daemon, args.follow_cursor)
+    if profile is not None:
+        profile.mark("main window")
+
+    if args.daemon:
+        app.setQuitOnLastWindowClosed(False)
+        w.create_picker_window()
+        server = DaemonServer(w)
+        if not server.listen():
+            print("could not listen on {}".format(daemon.socket_path()), file=sys.stderr)
+            sys.exit(1)
     sys.exit(app.exec_())
@@ -2,7 +2,7 @@
 
 
 a = Analysis(
-    ['main.py','picker.py'],
+    ['main.py','picker.py','gradients.py','colors.py','convert.py','daemon.py','screens.py','capture.py','instrumentation.py','events.py','history.py','names.py','recording.py','palette.py','matching.py'],
     pathex=[],
     binaries=[],
     datas=[('./picker_icon.png', './picker_icon.png')],
@@ -0,0 +1,209 @@
+import os
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QImage, QColor, QPainter, QRegion
+from PyQt5.QtCore import Qt, QObject, QRect, pyqtSignal
+import capture
+import instrumentation
+
+
+TOLERANCE_VARIABLE = "SIMPLECOLORPICKER_MATCH_TOLERANCE"
+TOLERANCE_STEPS = [ 0, 1, 2, 4, 8, 16, 32, 64 ]
+DEFAULT_TOLERANCE = 8
+TILE_ROWS = 64
+HIGHLIGHTS = [ QColor(255, 0, 255), QColor(0, 255, 0) ]
+
+
+def default_tolerance() -> int:
+    try:
+        return max(0, min(255, int(os.environ.get(TOLERANCE_VARIABLE, DEFAULT_TOLERANCE))))
+    except ValueError:
+        return DEFAULT_TOLERANCE
+
+
+def step_tolerance(tolerance, step) -> int:
+    if step > 0:
+        return next((value for value in TOLERANCE_STEPS if value > tolerance), tolerance)
+    return next((value for value in reversed(TOLERANCE_STEPS) if value < tolerance), tolerance)
+
+
+def highlight_color(rgb) -> QColor:
+    return max(HIGHLIGHTS, key=lambda color: sum(abs(a - b) for a, b in zip(color.getRgb()[:3], rgb)))
+
+
+def channel_tables(rgb, tolerance) -> list:
+    values = np.arange(256)
+    accepted = [ np.abs(values - value) <= tolerance for value in rgb ]
+    channels = [ accepted[capture.RGB_CHANNELS.index(i)] if i in capture.RGB_CHANNELS else np.ones(256, dtype=bool) for i in range(4) ]
+    pairs = np.arange(1 << 16, dtype=np.uint16).view(np.uint8).reshape(-1, 2)
+    return [ channels[i][pairs[:, 0]] & channels[i + 1][pairs[:, 1]] for i in [ 0, 2 ] ]
+
+
+def match_tile(words, tables, highlight, target) -> int:
+    mask = np.take(tables[0], words[..., 0])
+    mask &= np.take(tables[1], words[..., 1])
+    np.multiply(mask, highlight, out=target)
+    return int(np.count_nonzero(mask))
+
+
+def match_images(pool, images, rgb, tolerance, highlight) -> list:
+    tables = channel_tables(rgb, tolerance)
+    highlight = np.uint32(highlight)
+    jobs = []
+    for image in images:
+        words = capture.image_array(image).view(np.uint16)
+        target = np.empty((image.height(), image.width()), dtype=np.uint32)
+        futures = [ pool.submit(match_tile, words[row:row + TILE_ROWS], tables, highlight, target[row:row + TILE_ROWS]) for row in range(0, image.height(), TILE_ROWS) ]
+        jobs.append((target, futures))
+    return [ (target, sum(future.result() for future in futures)) for target, futures in jobs ]
+
+
+def exclude_rect(entry, target, rect) -> int:
+    visible = rect.intersected(entry.geometry)
+    if visible.isEmpty():
+        return 0
+
+    ratio = entry.ratio
+    left = int((visible.x() - entry.geometry.x()) * ratio)
+    top = int((visible.y() - entry.geometry.y()) * ratio)
+    pixels = target[top:top + int(visible.height() * ratio) + 1, left:left + int(visible.width() * ratio) + 1]
+    count = int(np.count_nonzero(pixels))
+    pixels[:] = 0
+    return count
+
+
+class ScreenMatches:
+    __slots__ = ("entry", "pixels", "image", "count")
+
+    def __init__(self, entry, pixels, count):
+        self.entry = entry
+        self.pixels = pixels
+        self.count = count
+        height, width = pixels.shape
+        self.image = QImage(pixels.data, width, height, width * 4, QImage.Format.Format_ARGB32_Premultiplied)
+        self.image.setDevicePixelRatio(entry.ratio)
+
+
+class MatchFinder(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, workers=None, backend=None):
+        super(MatchFinder, self).__init__()
+        self.pool = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1), thread_name_prefix="matching")
+        self.jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix="matching-job")
+        self.backend = backend
+        self.snapshot = []
+        self.generation = 0
+
+
+    def find(self, entries, rgb, tolerance, excluded=None):
+        self.generation += 1
+        future = self.jobs.submit(self.run, entries, rgb, tolerance, excluded or [])
+        future.add_done_callback(partial(self.on_done, self.generation))
+
+
+    def refine(self, rgb, tolerance, excluded=None):
+        self.find(None, rgb, tolerance, excluded)
+
+
+    def clear(self):
+        self.generation += 1
+        self.jobs.submit(self.snapshot.clear)
+
+
+    def grab(self, entries) -> list:
+        if self.backend is None:
+            self.backend = capture.QtCaptureBackend()
+
+        snapshot = []
+        for entry in entries:
+            image = self.backend.grab(entry, entry.geometry)
+            if image.isNull():
+                continue
+            if image.format() not in capture.PIXEL_FORMATS:
+                image = image.convertToFormat(QImage.Format.Format_RGB32)
+            snapshot.append((entry, image))
+        return snapshot
+
+
+    def run(self, entries, rgb, tolerance, excluded) -> list:
+        if entries is not None:
+            self.snapshot[:] = self.grab(entries)
+
+        highlight = highlight_color(rgb).rgba()
+        results = match_images(self.pool, [ image for _, image in self.snapshot ], rgb, tolerance, highlight)
+        matches = []
+        for (entry, _), (pixels, count) in zip(self.snapshot, results):
+            for rect in excluded:
+                count -= exclude_rect(entry, pixels, rect)
+            matches.append(ScreenMatches(entry, pixels, count))
+        return matches
+
+
+    def on_done(self, generation, future):
+        if generation != self.generation or future.cancelled():
+            return
+        try:
+            matches = future.result()
+        except Exception as error:
+            self.failed.emit(str(error))
+            return
+        self.finished.emit(matches)
+
+
+    def shutdown(self):
+        self.generation += 1
+        self.jobs.shutdown(wait=False, cancel_futures=True)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class MatchOverlay(QWidget):
+
+    def __init__(self):
+        super(MatchOverlay, self).__init__()
+        flags = Qt.WindowType(Qt.WindowType.BypassWindowManagerHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool | Qt.WindowType.WindowTransparentForInput)
+        self.setWindowFlags(flags)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
+        self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating, True)
+        self.matches = []
+        self.hole = QRect()
+
+
+    def count(self) -> int:
+        return sum(match.count for match in self.matches)
+
+
+    def set_matches(self, rect, matches):
+        self.matches = matches
+        if self.geometry() != rect:
+            self.setGeometry(rect)
+        self.update()
+
+
+    def set_hole(self, rect):
+        if rect == self.hole:
+            return
+
+        dirty = QRegion(self.hole.translated(-self.x(), -self.y())).united(rect.translated(-self.x(), -self.y()))
+        self.hole = QRect(rect)
+        self.update(dirty)
+
+
+    def clear(self):
+        self.matches = []
+        self.hide()
+
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setClipRegion(QRegion(event.rect()).subtracted(QRegion(self.hole.translated(-self.x(), -self.y()))))
+        for match in self.matches:
+            if match.count:
+                painter.drawImage(match.entry.geometry.topLeft() - self.pos(), match.image)
+
+
+instrumentation.instrument_class(MatchFinder, [ "grab", "run" ])
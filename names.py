@@ -0,0 +1,257 @@
+import os
+import glob
+import hashlib
+import functools
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+import colors
+
+
+NAMES_VARIABLE = "SIMPLECOLORPICKER_NAMES"
+RGB_TXT_PATHS = [ "/usr/share/X11/rgb.txt", "/etc/X11/rgb.txt", "/usr/X11R6/lib/X11/rgb.txt", "/opt/X11/share/X11/rgb.txt" ]
+CACHE_VERSION = 1
+CELL_OCCUPANCY = 2
+MAX_CELLS_PER_AXIS = 48
+LOOKUP_CACHE_SIZE = 4096
+LINEAR_VALUES = colors.SRGB_LINEAR.tolist()
+
+CSS_COLORS = """
+aliceblue f0f8ff antiquewhite faebd7 aqua 00ffff aquamarine 7fffd4 azure f0ffff beige f5f5dc bisque ffe4c4 black 000000
+blanchedalmond ffebcd blue 0000ff blueviolet 8a2be2 brown a52a2a burlywood deb887 cadetblue 5f9ea0 chartreuse 7fff00
+chocolate d2691e coral ff7f50 cornflowerblue 6495ed cornsilk fff8dc crimson dc143c cyan 00ffff darkblue 00008b
+darkcyan 008b8b darkgoldenrod b8860b darkgray a9a9a9 darkgreen 006400 darkgrey a9a9a9 darkkhaki bdb76b
+darkmagenta 8b008b darkolivegreen 556b2f darkorange ff8c00 darkorchid 9932cc darkred 8b0000 darksalmon e9967a
+darkseagreen 8fbc8f darkslateblue 483d8b darkslategray 2f4f4f darkslategrey 2f4f4f darkturquoise 00ced1
+darkviolet 9400d3 deeppink ff1493 deepskyblue 00bfff dimgray 696969 dimgrey 696969 dodgerblue 1e90ff
+firebrick b22222 floralwhite fffaf0 forestgreen 228b22 fuchsia ff00ff gainsboro dcdcdc ghostwhite f8f8ff gold ffd700
+goldenrod daa520 gray 808080 green 008000 greenyellow adff2f grey 808080 honeydew f0fff0 hotpink ff69b4
+indianred cd5c5c indigo 4b0082 ivory fffff0 khaki f0e68c lavender e6e6fa lavenderblush fff0f5 lawngreen 7cfc00
+lemonchiffon fffacd lightblue add8e6 lightcoral f08080 lightcyan e0ffff lightgoldenrodyellow fafad2 lightgray d3d3d3
+lightgreen 90ee90 lightgrey d3d3d3 lightpink ffb6c1 lightsalmon ffa07a lightseagreen 20b2aa lightskyblue 87cefa
+lightslategray 778899 lightslategrey 778899 lightsteelblue b0c4de lightyellow ffffe0 lime 00ff00 limegreen 32cd32
+linen faf0e6 magenta ff00ff maroon 800000 mediumaquamarine 66cdaa mediumblue 0000cd mediumorchid ba55d3
+mediumpurple 9370db mediumseagreen 3cb371 mediumslateblue 7b68ee mediumspringgreen 00fa9a mediumturquoise 48d1cc
+mediumvioletred c71585 midnightblue 191970 mintcream f5fffa mistyrose ffe4e1 moccasin ffe4b5 navajowhite ffdead
+navy 000080 oldlace fdf5e6 olive 808000 olivedrab 6b8e23 orange ffa500 orangered ff4500 orchid da70d6
+palegoldenrod eee8aa palegreen 98fb98 paleturquoise afeeee palevioletred db7093 papayawhip ffefd5 peachpuff ffdab9
+peru cd853f pink ffc0cb plum dda0dd powderblue b0e0e6 purple 800080 rebeccapurple 663399 red ff0000
+rosybrown bc8f8f royalblue 4169e1 saddlebrown 8b4513 salmon fa8072 sandybrown f4a460 seagreen 2e8b57
+seashell fff5ee sienna a0522d silver c0c0c0 skyblue 87ceeb slateblue 6a5acd slategray 708090 slategrey 708090
+snow fffafa springgreen 00ff7f steelblue 4682b4 tan d2b48c teal 008080 thistle d8bfd8 tomato ff6347
+turquoise 40e0d0 violet ee82ee wheat f5deb3 white ffffff whitesmoke f5f5f5 yellow ffff00 yellowgreen 9acd32
+"""
+
+
+def css_colors() -> list:
+    words = CSS_COLORS.split()
+    return [ (name, (int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16))) for name, value in zip(words[0::2], words[1::2]) ]
+
+
+def parse_line(line):
+    line = line.strip()
+    if not line or line[0] in "!;":
+        return None
+
+    if "," in line:
+        fields = [ field.strip() for field in line.split(",") ]
+        hex_fields = [ field for field in fields if len(field.lstrip("#")) == 6 and field.startswith("#") ]
+        if hex_fields:
+            name = next((field for field in fields if field and field not in hex_fields), None)
+            return None if name is None else (name, colors.Color.from_name(hex_fields[0]).rgb())
+
+    fields = line.split(None, 3)
+    if fields[0].startswith("#") and len(fields) > 1:
+        return " ".join(line.split()[1:]), colors.Color.from_name(fields[0]).rgb()
+    if len(fields) == 4:
+        rgb = tuple(int(value) for value in fields[:3])
+        if all(0 <= value <= 255 for value in rgb):
+            return fields[3], rgb
+    return None
+
+
+def read_names(path) -> list:
+    entries = []
+    with open(path, "r", encoding="utf-8", errors="replace") as stream:
+        for line in stream:
+            try:
+                entry = parse_line(line)
+            except ValueError:
+                continue
+            if entry is not None:
+                entries.append(entry)
+    return entries
+
+
+def data_directory() -> str:
+    base = os.environ.get("XDG_DATA_HOME") or os.environ.get("APPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "SimpleColorPicker")
+
+
+def cache_directory() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "SimpleColorPicker")
+
+
+def user_paths() -> list:
+    paths = [ path for path in os.environ.get(NAMES_VARIABLE, "").split(os.pathsep) if path ]
+    paths.extend(sorted(glob.glob(os.path.join(data_directory(), "names", "*"))))
+    return [ path for path in paths if os.path.isfile(path) ]
+
+
+def rgb_txt_paths() -> list:
+    return [ path for path in RGB_TXT_PATHS if os.path.isfile(path) ][:1]
+
+
+def read_sources(paths) -> list:
+    entries = []
+    for path in paths:
+        try:
+            entries.extend(read_names(path))
+        except OSError:
+            continue
+    return entries
+
+
+def cache_path(paths) -> str:
+    digest = hashlib.sha1(str(CACHE_VERSION).encode())
+    for path in paths:
+        status = os.stat(path)
+        digest.update("{}\0{}\0{}\0".format(os.path.abspath(path), status.st_size, status.st_mtime_ns).encode())
+    return os.path.join(cache_directory(), "names-{}.npz".format(digest.hexdigest()[:16]))
+
+
+class NameIndex:
+
+    def __init__(self, names, rgb, lab, lower, cell_size, shape, cell_start):
+        self.names = names
+        self.rgb = rgb
+        self.lab = lab
+        self.lower = lower.tolist()
+        self.cell_size = float(cell_size)
+        self.shape = tuple(int(size) for size in shape)
+        self.cell_start = cell_start.tolist()
+        self.nearest = functools.lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self.find_nearest)
+
+
+    @classmethod
+    def build(cls, entries):
+        names = np.array([ name for name, _ in entries ])
+        rgb = np.array([ value for _, value in entries ], dtype=np.uint8).reshape(-1, 3)
+        packed = (rgb[:, 0].astype(np.int32) << 16) | (rgb[:, 1].astype(np.int32) << 8) | rgb[:, 2]
+        _, first = np.unique(packed, return_index=True)
+        names = names[first]
+        rgb = rgb[first]
+        lab = colors.rgb_to_oklab(rgb)
+
+        lower = lab.min(axis=0)
+        extent = np.maximum(lab.max(axis=0) - lower, 1e-6)
+        cell_size = max(float(np.prod(extent) * CELL_OCCUPANCY / len(lab)) ** (1 / 3), float(extent.max()) / MAX_CELLS_PER_AXIS)
+        shape = np.minimum(np.floor(extent / cell_size).astype(np.int64) + 1, MAX_CELLS_PER_AXIS)
+        cell = np.minimum(((lab - lower) / cell_size).astype(np.int64), shape - 1)
+        linear = (cell[:, 0] * shape[1] + cell[:, 1]) * shape[2] + cell[:, 2]
+
+        order = np.argsort(linear, kind="stable")
+        cell_start = np.searchsorted(linear[order], np.arange(int(np.prod(shape)) + 1))
+        return cls(names[order], rgb[order], np.ascontiguousarray(lab[order]), lower, cell_size, shape, cell_start)
+
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["names"], data["rgb"], data["lab"], data["lower"], data["cell_size"], data["shape"], data["cell_start"])
+
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = path + ".tmp.npz"
+        np.savez(temporary_path, names=self.names, rgb=self.rgb, lab=self.lab, lower=np.array(self.lower),
+                 cell_size=np.array(self.cell_size), shape=np.array(self.shape), cell_start=np.array(self.cell_start, dtype=np.int64))
+        os.replace(temporary_path, path)
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    def find_nearest(self, red, green, blue) -> tuple:
+        linear = LINEAR_VALUES
+        r, g, b = linear[red], linear[green], linear[blue]
+        l = (0.4122214708 * r + 0.5363325363 * g + 0.0514459929 * b) ** (1 / 3)
+        m = (0.2119034982 * r + 0.6806995451 * g + 0.1073969566 * b) ** (1 / 3)
+        s = (0.0883024619 * r + 0.2817188376 * g + 0.6299787005 * b) ** (1 / 3)
+        point = (0.2104542553 * l + 0.7936177850 * m - 0.0040720468 * s,
+                 1.9779984951 * l - 2.4285922050 * m + 0.4505937099 * s,
+                 0.0259040371 * l + 0.7827717662 * m - 0.8086757660 * s)
+
+        position = [ (point[axis] - self.lower[axis]) / self.cell_size for axis in range(3) ]
+        center = [ min(max(int(position[axis]), 0), self.shape[axis] - 1) for axis in range(3) ]
+        radius = 1
+        while True:
+            low = [ max(center[axis] - radius, 0) for axis in range(3) ]
+            high = [ min(center[axis] + radius, self.shape[axis] - 1) for axis in range(3) ]
+            ranges = []
+            for i in range(low[0], high[0] + 1):
+                for j in range(low[1], high[1] + 1):
+                    row = (i * self.shape[1] + j) * self.shape[2]
+                    start = self.cell_start[row + low[2]]
+                    end = self.cell_start[row + high[2] + 1]
+                    if end > start:
+                        if ranges and ranges[-1][1] == start:
+                            ranges[-1] = (ranges[-1][0], end)
+                        else:
+                            ranges.append((start, end))
+
+            bound = float("inf")
+            for axis in range(3):
+                if low[axis] > 0:
+                    bound = min(bound, (position[axis] - low[axis]) * self.cell_size)
+                if high[axis] < self.shape[axis] - 1:
+                    bound = min(bound, (high[axis] + 1 - position[axis]) * self.cell_size)
+
+            if ranges:
+                candidates = self.lab[ranges[0][0]:ranges[0][1]] if len(ranges) == 1 else np.concatenate([ self.lab[start:end] for start, end in ranges ])
+                distances = ((candidates - point) ** 2).sum(axis=1)
+                best = int(distances.argmin())
+                distance = float(distances[best]) ** 0.5
+                if distance <= bound or bound == float("inf"):
+                    for start, end in ranges:
+                        if best < end - start:
+                            index = start + best
+                            break
+                        best -= end - start
+                    return str(self.names[index]), tuple(int(value) for value in self.rgb[index]), distance
+            if bound == float("inf"):
+                return None
+            radius += 1
+
+
+def load_index(paths=None) -> NameIndex:
+    paths = user_paths() if paths is None else list(paths)
+    system_paths = rgb_txt_paths()
+    path = cache_path(paths + system_paths)
+    try:
+        return NameIndex.load(path)
+    except (OSError, KeyError, ValueError):
+        pass
+
+    index = NameIndex.build(read_sources(paths) + css_colors() + read_sources(system_paths))
+    try:
+        index.save(path)
+        for stale in glob.glob(os.path.join(os.path.dirname(path), "names-*.npz")):
+            if stale != path:
+                os.remove(stale)
+    except OSError:
+        pass
+    return index
+
+
+class NameIndexLoader(QThread):
+    loaded = pyqtSignal(object)
+
+    def __init__(self, paths=None):
+        super(NameIndexLoader, self).__init__()
+        self.paths = paths
+
+
+    def run(self):
+        self.loaded.emit(load_index(self.paths))
@@ -0,0 +1,161 @@
+import os
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PyQt5.QtGui import QImage, QImageReader
+from PyQt5.QtCore import QObject, QSize, pyqtSignal
+import colors
+import capture
+
+
+METHODS = [ "median-cut", "k-means" ]
+MAX_PIXELS = 1 << 20
+HISTOGRAM_BITS = 5
+KMEANS_ITERATIONS = 30
+KMEANS_BATCH = 4096
+ASSIGN_CHUNK = 1 << 18
+
+
+def scaled_size(width, height, max_pixels) -> QSize:
+    if width * height <= max_pixels:
+        return QSize(width, height)
+    scale = (max_pixels / (width * height)) ** 0.5
+    return QSize(max(1, int(width * scale)), max(1, int(height * scale)))
+
+
+def image_pixels(image) -> np.ndarray:
+    if image.format() not in capture.PIXEL_FORMATS:
+        image = image.convertToFormat(QImage.Format.Format_RGB32)
+    return capture.image_array(image)[..., capture.RGB_CHANNELS].reshape(-1, 3).copy()
+
+
+def load_pixels(path, max_pixels=MAX_PIXELS) -> np.ndarray:
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid():
+        reader.setScaledSize(scaled_size(size.width(), size.height(), max_pixels))
+    image = reader.read()
+    if image.isNull():
+        raise OSError("could not read {}: {}".format(path, reader.errorString()))
+    return sample_pixels(image_pixels(image), max_pixels)
+
+
+def sample_pixels(pixels, max_pixels=MAX_PIXELS) -> np.ndarray:
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    if len(pixels) <= max_pixels:
+        return pixels
+    return pixels[::(len(pixels) + max_pixels - 1) // max_pixels]
+
+
+def histogram(pixels, bits=HISTOGRAM_BITS):
+    quantized = (pixels >> (8 - bits)).astype(np.intp)
+    keys = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+    counts = np.bincount(keys, minlength=1 << (3 * bits))
+    occupied = np.flatnonzero(counts)
+    means = np.empty((len(occupied), 3), dtype=np.float64)
+    for channel in range(3):
+        means[:, channel] = np.bincount(keys, weights=pixels[:, channel], minlength=len(counts))[occupied] / counts[occupied]
+    return means, counts[occupied].astype(np.float64)
+
+
+def median_cut(pixels, count):
+    values, weights = histogram(pixels)
+    boxes = [ np.arange(len(values)) ]
+    while len(boxes) < count:
+        scores = []
+        for box in boxes:
+            spread = values[box].max(axis=0) - values[box].min(axis=0) if len(box) > 1 else np.zeros(3)
+            scores.append(spread.max() * weights[box].sum())
+        index = int(np.argmax(scores))
+        if scores[index] <= 0.0:
+            break
+
+        box = boxes.pop(index)
+        channel = int(np.argmax(values[box].max(axis=0) - values[box].min(axis=0)))
+        ordered = box[np.argsort(values[box, channel], kind="stable")]
+        cumulative = np.cumsum(weights[ordered])
+        cut = int(np.clip(np.searchsorted(cumulative, cumulative[-1] / 2.0), 1, len(ordered) - 1))
+        boxes.extend([ ordered[:cut], ordered[cut:] ])
+
+    centers = np.array([ np.average(values[box], axis=0, weights=weights[box]) for box in boxes ])
+    populations = np.array([ weights[box].sum() for box in boxes ])
+    return centers, populations
+
+
+def nearest_centers(points, centers) -> np.ndarray:
+    labels = np.empty(len(points), dtype=np.intp)
+    center_norms = (centers * centers).sum(axis=1)
+    for start in range(0, len(points), ASSIGN_CHUNK):
+        chunk = points[start:start + ASSIGN_CHUNK]
+        labels[start:start + len(chunk)] = (center_norms - 2.0 * chunk @ centers.T).argmin(axis=1)
+    return labels
+
+
+def kmeans(pixels, count, iterations=KMEANS_ITERATIONS, batch_size=KMEANS_BATCH, seed=0):
+    lab = colors.rgb_to_oklab(pixels)
+    initial, _ = median_cut(pixels, count)
+    centers = colors.rgb_to_oklab(np.floor(initial + 0.5).astype(np.uint8))
+    totals = np.zeros(len(centers))
+    random = np.random.default_rng(seed)
+    for _ in range(iterations):
+        batch = lab[random.integers(0, len(lab), min(batch_size, len(lab)))]
+        labels = nearest_centers(batch, centers)
+        batch_counts = np.bincount(labels, minlength=len(centers)).astype(np.float64)
+        totals += batch_counts
+        hit = batch_counts > 0
+        for channel in range(3):
+            sums = np.bincount(labels, weights=batch[:, channel], minlength=len(centers))
+            centers[hit, channel] += (sums[hit] - batch_counts[hit] * centers[hit, channel]) / totals[hit]
+
+    populations = np.bincount(nearest_centers(lab, centers), minlength=len(centers)).astype(np.float64)
+    return colors.oklab_to_rgb(centers).astype(np.float64), populations
+
+
+def extract(source, count=8, method="median-cut", max_pixels=MAX_PIXELS) -> list:
+    pixels = load_pixels(source, max_pixels) if isinstance(source, str) else sample_pixels(source, max_pixels)
+    if not len(pixels):
+        return []
+    if method == "k-means":
+        centers, populations = kmeans(pixels, count)
+    elif method == "median-cut":
+        centers, populations = median_cut(pixels, count)
+    else:
+        raise ValueError("unknown palette method: {}".format(method))
+
+    total = populations.sum()
+    order = np.argsort(-populations, kind="stable")
+    rgb = np.clip(np.floor(centers + 0.5), 0, 255).astype(int)
+    return [ (tuple(rgb[i].tolist()), float(populations[i] / total)) for i in order if populations[i] > 0 ]
+
+
+class PaletteExtractor(QObject):
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+    def __init__(self, workers=None):
+        super(PaletteExtractor, self).__init__()
+        self.pool = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1), thread_name_prefix="palette")
+        self.generation = 0
+
+
+    def extract(self, source, count=8, method="median-cut"):
+        self.generation += 1
+        future = self.pool.submit(extract, source, count, method)
+        future.add_done_callback(partial(self.on_done, source, self.generation))
+
+
+    def on_done(self, source, generation, future):
+        if generation != self.generation or future.cancelled():
+            return
+        try:
+            palette = future.result()
+        except Exception as error:
+            self.failed.emit(source, str(error))
+            return
+        self.finished.emit(source, palette)
+
+
+    def shutdown(self):
+        self.generation += 1
+        self.pool.shutdown(wait=False, cancel_futures=True)
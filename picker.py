@@ -1,130 +1,443 @@
 #!/bin/python
-from PyQt5.QtWidgets import QApplication, QWidget
-from PyQt5.QtGui import QPainter, QColor, QPen, QPainterPath, QPixmap
-from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, QEvent
-from PyQt5.sip import voidptr
-from pynput.mouse import Controller
-from pynput.keyboard import Listener
+import os
+import sys
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QGuiApplication, QPainter, QColor, QPen, QPainterPath, QCursor
+from PyQt5.QtCore import Qt, QObject, QTimer, QPoint, QRect, QRectF, QEvent
+import colors
+import screens
+import capture
+import instrumentation
+import recording
+import matching
+
+
+PYNPUT_VARIABLE = "SIMPLECOLORPICKER_PYNPUT"
+NUDGE_KEYS = {
+    Qt.Key.Key_Left: (-1, 0),
+    Qt.Key.Key_Right: (1, 0),
+    Qt.Key.Key_Up: (0, -1),
+    Qt.Key.Key_Down: (0, 1),
+}
+CONFIRM_KEYS = [ Qt.Key.Key_Return, Qt.Key.Key_Enter ]
+RECORD_KEY = Qt.Key.Key_R
+MATCH_KEY = Qt.Key.Key_F
+TOLERANCE_KEYS = {
+    Qt.Key.Key_Plus: 1,
+    Qt.Key.Key_Equal: 1,
+    Qt.Key.Key_Minus: -1,
+}
+MODIFIER_KEYS = [ Qt.Key.Key_Shift, Qt.Key.Key_Control, Qt.Key.Key_Alt, Qt.Key.Key_AltGr, Qt.Key.Key_Meta,
+                  Qt.Key.Key_Super_L, Qt.Key.Key_Super_R, Qt.Key.Key_CapsLock, Qt.Key.Key_NumLock, Qt.Key.Key_ScrollLock ]
+KEEP_CHARS = [ "r", "R", "f", "F", "+", "=", "-" ]
+KEEP_KEYS = [ "left", "right", "up", "down", "enter", "shift", "shift_l", "shift_r", "ctrl", "ctrl_l", "ctrl_r",
+              "alt", "alt_l", "alt_r", "alt_gr", "cmd", "cmd_l", "cmd_r", "caps_lock", "num_lock", "scroll_lock" ]
+
+
+def use_pynput() -> bool:
+    if os.environ.get(PYNPUT_VARIABLE):
+        return os.environ[PYNPUT_VARIABLE] != "0"
+    return QGuiApplication.platformName().startswith("wayland")
+
+
+class RefreshScheduler(QObject):
+
+    def __init__(self, position_source, repaint, frame_rate=60, idle_interval=100, idle_threshold=30):
+        super(RefreshScheduler, self).__init__()
+        self.position_source = position_source
+        self.repaint = repaint
+        self.idle_interval = idle_interval
+        self.idle_threshold = idle_threshold
+        self.frame_interval = 1
+        self.last_position = None
+        self.idle_ticks = 0
+        self.painted = 0
+        self.skipped = 0
+        self.refreshed = 0
+
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.set_frame_rate(frame_rate)
+
+
+    def set_frame_rate(self, frame_rate):
+        self.frame_rate = max(1, frame_rate)
+        self.frame_interval = max(1, int(1000 / self.frame_rate))
+        if self.timer.isActive() and self.idle_ticks < self.idle_threshold:
+            self.timer.setInterval(self.frame_interval)
+
+
+    def start(self):
+        self.last_position = None
+        self.idle_ticks = 0
+        self.timer.start(self.frame_interval)
+
+
+    def stop(self):
+        self.timer.stop()
+
+
+    def invalidate(self):
+        self.last_position = None
+
+
+    def tick(self):
+        position = self.position_source()
+        if position == self.last_position:
+            self.idle_ticks += 1
+            if self.idle_ticks == self.idle_threshold:
+                self.timer.setInterval(self.idle_interval)
+            if self.idle_ticks < self.idle_threshold:
+                self.skipped += 1
+                return
+            self.refreshed += 1
+            self.repaint(position)
+            return
+
+        if self.idle_ticks >= self.idle_threshold:
+            self.timer.setInterval(self.frame_interval)
+        self.idle_ticks = 0
+        self.last_position = position
+        self.painted += 1
+        self.repaint(position)
+
+
+    def statistics(self) -> dict:
+        total = self.painted + self.skipped + self.refreshed
+        return {
+            "frame_rate": self.frame_rate,
+            "painted": self.painted,
+            "skipped": self.skipped,
+            "refreshed": self.refreshed,
+            "skipped_ratio": self.skipped / total if total else 0.0,
+            "idle": self.idle_ticks >= self.idle_threshold,
+        }
 
 
 class PickerWindow(QWidget):
 
-    def __init__(self, parent):
+    def __init__(self, parent, follow_cursor=False):
         super(PickerWindow, self).__init__()
 
         flags = Qt.WindowType(Qt.WindowType.BypassWindowManagerHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool)
         self.setWindowFlags(flags)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
 
-        width = 0
-        height = 0
-        largest_x = -1
-        largest_y = -1
-        for m in QApplication.screens():
-            if m.availableGeometry().x() > largest_x:
-                largest_x = m.availableGeometry().x()
-                width = m.availableGeometry().x() + m.availableGeometry().width()
-            if m.availableGeometry().y() > largest_y:
-                largest_y = m.availableGeometry().y()
-                height = m.availableGeometry().y() + m.availableGeometry().height()
-
-        self.move(0, 0)
-        self.resize(width, height)
+        self.screens = screens.ScreenIndex()
+        self.screens.changed.connect(self.on_screens_changed)
+        self.follow_cursor = follow_cursor
+        self.magnifier_size = 221
+        self.margin = 4
+        if self.follow_cursor:
+            self.setFixedSize(self.magnifier_size + 20 + self.margin * 2, self.magnifier_size + self.margin * 2)
+        else:
+            self.on_screens_changed()
 
         self.installEventFilter(self)
         self.setMouseTracking(True)
 
         self.parent = parent
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_painter)
-        self.timer.start(1)
+        self.scheduler = RefreshScheduler(self.cursor_position, self.update_painter)
+        self.capture = capture.CaptureWorker(int(self.magnifier_size * 0.2))
+        self.capture.frame_ready.connect(self.on_frame_ready)
+        self.recorder = recording.Recorder()
+        self.matcher = matching.MatchFinder()
+        self.matcher.finished.connect(self.on_matches_found)
+        self.matcher.failed.connect(self.on_matches_failed)
+        self.match_overlay = matching.MatchOverlay()
+        self.match_color = None
+        self.match_excluded = []
+        self.match_tolerance = matching.default_tolerance()
+        self.frame = None
+        self.current_color = QColor()
         self.running = True
-        self.magnifier_size = 221
         self.cursorX = -1
         self.cursorY = -1
 
+        self.listener = None
+        self.mouse_controller = None
+        if use_pynput():
+            try:
+                from pynput.mouse import Controller
+                self.mouse_controller = Controller()
+            except ImportError:
+                pass
+
+
+    def on_screens_changed(self):
+        if not self.follow_cursor:
+            self.setGeometry(self.screens.virtual_rect)
+        self.update()
+
+
+    def magnifier_offset(self):
+        entry = self.screens.screen_at(self.cursorX, self.cursorY)
+        bounds = entry.geometry if entry is not None else self.screens.virtual_rect
+        offsetX = 20 if (self.cursorX + 20 + self.magnifier_size - 20 + 40) < bounds.x() + bounds.width() else -self.magnifier_size - 40
+        offsetY = 20 if (self.cursorY + 20 + self.magnifier_size - 20 + 40) < bounds.y() + bounds.height() else -(self.magnifier_size + 10)
+        return offsetX, offsetY
+
+
+    def magnifier_rect(self) -> QRect:
+        offsetX, offsetY = self.magnifier_offset()
+        return QRect(self.cursorX + offsetX - self.margin, self.cursorY + offsetY - self.margin, self.magnifier_size + 20 + self.margin * 2, self.magnifier_size + self.margin * 2)
+
 
-    def keyReleaseEvent(self, key):
-        if not self.isVisible():
+    def backing_store_bytes(self) -> int:
+        ratio = self.devicePixelRatioF()
+        return int(self.width() * ratio) * int(self.height() * ratio) * 4
+
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        if key in MODIFIER_KEYS:
+            event.accept()
+            return
+        if key in NUDGE_KEYS:
+            step = 10 if event.modifiers() & Qt.KeyboardModifier.ShiftModifier else 1
+            dx = NUDGE_KEYS[key][0] * step
+            dy = NUDGE_KEYS[key][1] * step
+            if self.mouse_controller is not None:
+                self.mouse_controller.move(dx, dy)
+            else:
+                position = QCursor.pos()
+                QCursor.setPos(position.x() + dx, position.y() + dy)
+            self.scheduler.invalidate()
+        elif key in CONFIRM_KEYS:
+            self.finish(True)
+        elif key == RECORD_KEY:
+            if not event.isAutoRepeat():
+                self.toggle_recording()
+        elif key == MATCH_KEY:
+            if not event.isAutoRepeat():
+                self.toggle_matches()
+        elif key in TOLERANCE_KEYS:
+            self.change_tolerance(TOLERANCE_KEYS[key])
+        elif not event.isAutoRepeat():
+            self.finish(False)
+        event.accept()
+
+
+    def on_pynput_key_release(self, key):
+        if not self.isVisible() or getattr(key, "char", None) in KEEP_CHARS or getattr(key, "name", None) in KEEP_KEYS:
             return
 
         self.running = False
-        self.hide()
+        self.scheduler.invalidate()
+
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            self.capture.median = not self.capture.median
+        else:
+            index = capture.KERNEL_SIZES.index(self.capture.kernel)
+            step = 1 if event.angleDelta().y() > 0 else -1
+            self.capture.kernel = capture.KERNEL_SIZES[max(0, min(len(capture.KERNEL_SIZES) - 1, index + step))]
+        self.recorder.kernel = self.capture.kernel
+        self.recorder.median = self.capture.median
+        self.scheduler.invalidate()
+        event.accept()
+
+
+    def toggle_recording(self):
+        if self.recorder.recording:
+            self.recorder.stop_recording()
+            print("recorded {} samples to {}".format(self.recorder.written, self.recorder.path), file=sys.stderr)
+        else:
+            position = self.cursor_position()
+            target = (position, self.screens.screen_at(position[0], position[1]))
+            try:
+                self.recorder.start_recording(target, self.capture.kernel, self.capture.median)
+            except OSError as error:
+                print("could not start recording: {}".format(error), file=sys.stderr)
+        self.scheduler.invalidate()
+
+
+    def toggle_matches(self):
+        if self.match_color is not None:
+            self.clear_matches()
+            return
+
+        self.match_color = (self.current_color.red(), self.current_color.green(), self.current_color.blue())
+        self.match_excluded = [ self.magnifier_rect() ]
+        self.matcher.find(self.screens.entries, self.match_color, self.match_tolerance, self.match_excluded)
+
+
+    def change_tolerance(self, step):
+        tolerance = matching.step_tolerance(self.match_tolerance, step)
+        if tolerance == self.match_tolerance:
+            return
+
+        self.match_tolerance = tolerance
+        if self.match_color is not None:
+            self.matcher.refine(self.match_color, self.match_tolerance, self.match_excluded)
+        self.update(self.magnifier_rect())
+
+
+    def clear_matches(self):
+        if self.match_color is None:
+            return
+
+        self.match_color = None
+        self.matcher.clear()
+        self.match_overlay.clear()
+        self.update(self.magnifier_rect())
+
+
+    def on_matches_found(self, matches):
+        if self.match_color is None or not self.isVisible():
+            return
+
+        self.match_overlay.set_hole(self.capture_hole(self.cursor_position()))
+        self.match_overlay.set_matches(self.screens.virtual_rect, matches)
+        if not self.match_overlay.isVisible():
+            self.match_overlay.show()
+            self.raise_()
+        self.update(self.magnifier_rect())
+
+
+    def on_matches_failed(self, error):
+        print("could not find matching pixels: {}".format(error), file=sys.stderr)
+        self.clear_matches()
+
+
+    def capture_hole(self, position) -> QRect:
+        size = self.capture.size * 3
+        return QRect(position[0] - size // 2, position[1] - size // 2, size, size)
 
 
     def closeEvent(self, event):
         self.running = False
-        self.listener.stop()
-        self.timer.stop()
+        self.stop_listener()
+        self.scheduler.stop()
+        self.recorder.stop_recording()
+        self.clear_matches()
+        self.matcher.shutdown()
+        self.match_overlay.close()
 
 
-    def update_painter(self):
-        if not self.running:
+    def start_listener(self):
+        if self.mouse_controller is None:
+            return
+
+        from pynput.keyboard import Listener
+        self.listener = Listener(on_release=self.on_pynput_key_release)
+        self.listener.start()
+
+
+    def stop_listener(self):
+        if self.listener is not None:
             self.listener.stop()
-            self.timer.stop()
-            self.hide()
+            self.listener = None
+
+
+    def cursor_position(self):
+        if self.mouse_controller is not None:
+            return self.mouse_controller.position
+        position = QCursor.pos()
+        return position.x(), position.y()
+
+
+    def finish(self, pick):
+        self.stop_listener()
+        self.scheduler.stop()
+        if self.recorder.recording:
+            self.toggle_recording()
+        if pick:
+            self.current_color = self.fresh_color()
+        self.clear_matches()
+        self.running = False
+        self.releaseMouse()
+        self.releaseKeyboard()
+        self.hide()
+        if pick:
+            self.parent.on_color_picked(colors.Color.from_rgb(self.current_color.red(), self.current_color.green(), self.current_color.blue()))
+
+
+    def fresh_color(self) -> QColor:
+        self.capture.stop_capture()
+        position = self.cursor_position()
+        entry = self.screens.screen_at(position[0], position[1])
+        return self.capture.capture(self.capture.make_request(position, entry, self.screens.region)).color
+
+
+    def update_painter(self, position):
+        if not self.running:
+            self.finish(False)
             return
 
-        self.cursorX = Controller().position[0]
-        self.cursorY = Controller().position[1]
-        self.update()
+        entry = self.screens.screen_at(position[0], position[1])
+        if self.recorder.recording:
+            self.recorder.target = (position, entry)
+        if self.match_overlay.isVisible():
+            self.match_overlay.set_hole(self.capture_hole(position))
+        self.capture.request(position, entry, self.screens.region)
+
+
+    def on_frame_ready(self):
+        frame = self.capture.buffer.take()
+        if frame is not None and self.isVisible():
+            self.set_frame(frame)
+
+
+    def set_frame(self, frame):
+        previous_rect = self.magnifier_rect()
+        self.frame = frame
+        self.current_color = frame.color
+        self.cursorX = frame.position[0]
+        self.cursorY = frame.position[1]
+        if self.follow_cursor:
+            self.move(self.magnifier_rect().topLeft())
+            self.update()
+        else:
+            self.update(previous_rect.united(self.magnifier_rect()))
 
 
     def eventFilter(self, source, event):
         if event.type() == QEvent.Type.MouseButtonRelease:
-            self.listener.stop()
-            self.timer.stop()
-            self.running = False
-            self.hide()
-            if event.button() != Qt.MouseButton.LeftButton:
-                return False
-            self.parent.current_color = self.current_color
-            self.parent.on_color_updated()
-            return True
+            self.finish(event.button() == Qt.MouseButton.LeftButton)
+            return event.button() == Qt.MouseButton.LeftButton
         if event.type() == QEvent.Type.Show:
-            self.listener = Listener(on_release=self.keyReleaseEvent)
-            self.listener.start()
+            self.start_listener()
             self.running = True
-            self.timer.start()
+            self.frame = None
+            self.capture.start_capture()
+            self.scheduler.start()
+            if self.follow_cursor:
+                self.grabMouse(Qt.CursorShape.CrossCursor)
+            self.activateWindow()
+            self.grabKeyboard()
             return True
+        if event.type() == QEvent.Type.Hide:
+            self.capture.stop_capture()
+            self.releaseMouse()
+            self.releaseKeyboard()
 
         return super(PickerWindow, self).eventFilter(source, event)
 
 
     def paintEvent(self, event):
-        current_screen = QApplication.screenAt(QPoint(self.cursorX, self.cursorY))
-        current_screen_x = self.cursorX
-        if current_screen_x > current_screen.size().width():
-            current_screen_x %= current_screen.size().width()
-        current_screen_y = self.cursorY
-        if current_screen_y > current_screen.size().height():
-            current_screen_y %= current_screen.size().height()
-
-        center_rect_size = 6
-        offsetX = 20 if (self.cursorX + 20 + self.magnifier_size - 20 + 40) < self.width() else -self.magnifier_size - 40
-        offsetY = 20 if (self.cursorY + 20 + self.magnifier_size - 20 + 40) < self.height() else -(self.magnifier_size + 10)
-        top_rect = QRect(self.cursorX + offsetX + self.magnifier_size - 20, self.cursorY + offsetY, 40, 30)
-        center_rect = QRect(int(self.cursorX + offsetX + self.magnifier_size * 0.5 - center_rect_size * 0.5) - 1,
-                            int(self.cursorY + offsetY + self.magnifier_size * 0.5 - center_rect_size * 0.5) - 1,
-                            center_rect_size,
-                            center_rect_size)
-
-        image_size = self.magnifier_size * 0.2
-        image_half_size = self.magnifier_size * 0.1
-        pixmap = current_screen.grabWindow(voidptr(0), current_screen_x - int(image_half_size), current_screen_y - int(image_half_size), int(image_size), int(image_size))
-
-        if self.cursorX - image_half_size < 0:
-            pixmap = self.black_out_pixmap(pixmap, 0, image_size - int(self.cursorX + image_half_size), 0, image_size)
-        elif self.cursorX + image_half_size > self.width():
-            pixmap = self.black_out_pixmap(pixmap, self.width() - int(self.cursorX - image_half_size + 2), image_size, 0, image_size)
-        if self.cursorY - image_half_size < 0:
-            pixmap = self.black_out_pixmap(pixmap, 0, image_size, 0, image_size - int(self.cursorY + image_half_size))
-        elif self.cursorY + image_half_size > self.height():
-            pixmap = self.black_out_pixmap(pixmap, 0, image_size, self.height() - int(self.cursorY - image_half_size + 2), image_size)
-        pixmap = pixmap.scaled(self.magnifier_size, self.magnifier_size)
-
-        self.current_color = QColor(pixmap.toImage().pixel(int(self.magnifier_size * 0.5 - center_rect_size * 0.5),
-                                                           int(self.magnifier_size * 0.5 - center_rect_size * 0.5)))
+        if self.frame is None:
+            return
+
+        origin = self.magnifier_rect().topLeft() + QPoint(self.margin, self.margin) - self.geometry().topLeft()
+        originX = origin.x()
+        originY = origin.y()
+        top_rect = QRect(originX + self.magnifier_size - 20, originY, 40, 30)
+
+        image = self.frame.image
+        sample_x = image.width() // 2
+        sample_y = image.height() // 2
+        self.capture.buffer.present(self.frame)
+
+        scale_x = self.magnifier_size / max(1, image.width())
+        scale_y = self.magnifier_size / max(1, image.height())
+        half = self.frame.kernel // 2
+        center_rect = QRectF(originX + (sample_x - half) * scale_x,
+                             originY + (sample_y - half) * scale_y,
+                             self.frame.kernel * scale_x,
+                             self.frame.kernel * scale_y)
 
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing, True)
@@ -135,23 +448,68 @@ class PickerWindow(QWidget):
 
         painter.fillRect(top_rect, self.current_color)
         painter.drawRect(top_rect)
+        if self.frame.kernel > 1:
+            label = "{0}x{0}{1}".format(self.frame.kernel, " med" if self.frame.median else "")
+            painter.drawText(QRect(top_rect.x() - 20, top_rect.bottom() + 4, 60, 16), Qt.AlignmentFlag.AlignCenter, label)
+        if self.recorder.recording:
+            self.draw_recording(painter, originX, originY)
+        if self.match_color is not None:
+            self.draw_matches(painter, originX, originY)
 
         pen.setWidth(1)
         painter.setPen(pen)
         circlePath = QPainterPath()
-        circlePath.addEllipse(self.cursorX + offsetX, self.cursorY + offsetY, self.magnifier_size, self.magnifier_size)
+        circlePath.addEllipse(originX, originY, self.magnifier_size, self.magnifier_size)
         painter.setClipPath(circlePath)
-        painter.drawPixmap(self.cursorX + offsetX, self.cursorY + offsetY, pixmap)
+        painter.save()
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, False)
+        painter.translate(originX, originY)
+        painter.scale(scale_x, scale_y)
+        painter.drawImage(0, 0, image)
+        painter.restore()
         painter.drawRect(center_rect)
 
         pen.setWidth(6)
         painter.setPen(pen)
-        painter.drawEllipse(self.cursorX + offsetX, self.cursorY + offsetY, self.magnifier_size, self.magnifier_size)
+        painter.drawEllipse(originX, originY, self.magnifier_size, self.magnifier_size)
+
+        if instrumentation.enabled:
+            self.draw_timings(painter, originX, originY)
+
+
+    def draw_recording(self, painter, originX, originY):
+        statistics = self.recorder.statistics()
+        label = "REC {}".format(statistics["samples"])
+        if statistics["dropped"] or statistics["missed"]:
+            label += " -{}".format(statistics["dropped"] + statistics["missed"])
+        painter.save()
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor(220, 40, 40))
+        painter.drawEllipse(originX, originY, 10, 10)
+        painter.restore()
+        painter.drawText(QRect(originX + 14, originY - 3, 120, 16), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, label)
+
+
+    def draw_matches(self, painter, originX, originY):
+        if self.match_overlay.isVisible():
+            label = "±{} {} px".format(self.match_tolerance, self.match_overlay.count())
+        else:
+            label = "±{} ...".format(self.match_tolerance)
+        painter.drawText(QRect(originX, originY + self.magnifier_size - 12, 120, 16), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, label)
+
+
+    def draw_timings(self, painter, originX, originY):
+        lines = instrumentation.overlay_lines([ "PickerWindow", "CaptureWorker", "MatchFinder" ])
+        if not lines:
+            return
+
+        rect = QRect(originX + 20, originY + self.magnifier_size - 50 - 12 * len(lines), self.magnifier_size - 40, 12 * len(lines) + 4)
+        font = painter.font()
+        font.setPixelSize(10)
+        painter.setFont(font)
+        painter.setClipping(False)
+        painter.fillRect(rect, QColor(0, 0, 0, 170))
+        painter.drawText(rect.adjusted(2, 2, -2, -2), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, "\n".join(lines))
 
 
-    def black_out_pixmap(self, pixmap, from_width, to_width, from_height, to_height):
-        image = pixmap.toImage()
-        for x in range(int(from_width), int(to_width)):
-            for y in range(int(from_height), int(to_height)):
-                image.setPixelColor(x, y, QColor("#000"))
-        return QPixmap.fromImage(image)
+instrumentation.instrument_class(PickerWindow, [ "update_painter", "set_frame", "paintEvent" ])
@@ -0,0 +1,240 @@
+import os
+import time
+import struct
+import threading
+import numpy as np
+from PyQt5.QtCore import QThread, QRect
+import capture
+
+
+RECORDING_VARIABLE = "SIMPLECOLORPICKER_RECORDING"
+FORMAT_VARIABLE = "SIMPLECOLORPICKER_RECORDING_FORMAT"
+RATE_VARIABLE = "SIMPLECOLORPICKER_RECORDING_RATE"
+FORMATS = [ "csv", "bin" ]
+DEFAULT_RATE = 100
+RING_SECONDS = 10
+FLUSH_INTERVAL = 0.5
+FLUSH_FRACTION = 0.25
+
+MAGIC = b"SCPR"
+VERSION = 1
+HEADER = struct.Struct("<4sHH8x")
+RECORD_DTYPE = np.dtype([ ("time", "<f8"), ("x", "<i4"), ("y", "<i4"), ("red", "u1"), ("green", "u1"), ("blue", "u1"), ("padding", "u1") ])
+CSV_COLUMNS = [ "time", "x", "y", "red", "green", "blue" ]
+CSV_FORMAT = "%.6f,%d,%d,%d,%d,%d"
+
+
+def default_directory() -> str:
+    directory = os.environ.get(RECORDING_VARIABLE)
+    if directory:
+        return directory
+    base = os.environ.get("XDG_DATA_HOME") or os.environ.get("APPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "SimpleColorPicker", "recordings")
+
+
+def default_format() -> str:
+    file_format = os.environ.get(FORMAT_VARIABLE, "csv").lower()
+    return file_format if file_format in FORMATS else "csv"
+
+
+def default_rate() -> int:
+    try:
+        return max(1, int(os.environ.get(RATE_VARIABLE, DEFAULT_RATE)))
+    except ValueError:
+        return DEFAULT_RATE
+
+
+def new_path(directory, file_format) -> str:
+    name = time.strftime("recording-%Y%m%d-%H%M%S")
+    path = os.path.join(directory, "{}.{}".format(name, file_format))
+    suffix = 1
+    while os.path.exists(path):
+        suffix += 1
+        path = os.path.join(directory, "{}-{}.{}".format(name, suffix, file_format))
+    return path
+
+
+def read_binary(path) -> np.ndarray:
+    with open(path, "rb") as stream:
+        magic, version, record_size = HEADER.unpack(stream.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError("{} is not a recording".format(path))
+        return np.fromfile(stream, dtype=RECORD_DTYPE)
+
+
+class SampleRing:
+
+    def __init__(self, capacity):
+        self.records = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self.capacity = capacity
+        self.pushed = 0
+        self.taken = 0
+        self.dropped = 0
+
+
+    def pending(self) -> int:
+        return self.pushed - self.taken
+
+
+    def push(self, timestamp, x, y, red, green, blue) -> bool:
+        if self.pushed - self.taken >= self.capacity:
+            self.dropped += 1
+            return False
+
+        self.records[self.pushed % self.capacity] = (timestamp, x, y, red, green, blue, 0)
+        self.pushed += 1
+        return True
+
+
+    def take(self) -> np.ndarray:
+        end = self.pushed
+        start = self.taken
+        if start == end:
+            return self.records[:0].copy()
+
+        first = start % self.capacity
+        last = end % self.capacity
+        if first < last:
+            records = self.records[first:last].copy()
+        else:
+            records = np.concatenate([ self.records[first:], self.records[:last] ])
+        self.taken = end
+        return records
+
+
+class Recorder(QThread):
+
+    def __init__(self, rate=None, backend=None):
+        super(Recorder, self).__init__()
+        self.rate = rate or default_rate()
+        self.backend = backend
+        self.ring = None
+        self.target = None
+        self.kernel = 1
+        self.median = False
+        self.path = None
+        self.stream = None
+        self.writer = None
+        self.wake = threading.Event()
+        self.recording = False
+        self.draining = False
+        self.missed = 0
+        self.offscreen = 0
+        self.written = 0
+
+
+    def start_recording(self, target, kernel=1, median=False, directory=None, file_format=None):
+        if self.recording:
+            return
+
+        file_format = file_format or default_format()
+        directory = directory or default_directory()
+        os.makedirs(directory, exist_ok=True)
+        self.path = new_path(directory, file_format)
+        self.stream = open(self.path, "wb")
+        if file_format == "bin":
+            self.stream.write(HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize))
+        else:
+            self.stream.write((",".join(CSV_COLUMNS) + "\n").encode())
+        self.file_format = file_format
+
+        self.ring = SampleRing(self.rate * RING_SECONDS)
+        self.target = target
+        self.kernel = kernel
+        self.median = median
+        self.missed = 0
+        self.offscreen = 0
+        self.written = 0
+        self.recording = True
+        self.draining = False
+        self.wake.clear()
+        self.writer = threading.Thread(target=self.write_loop, name="recording", daemon=True)
+        self.writer.start()
+        self.start()
+
+
+    def stop_recording(self):
+        if not self.recording:
+            return
+
+        self.recording = False
+        self.wait()
+        self.draining = True
+        self.wake.set()
+        self.writer.join()
+        self.writer = None
+        self.stream.close()
+        self.stream = None
+
+
+    def run(self):
+        interval = 1.0 / self.rate
+        flush_size = max(1, int(self.ring.capacity * FLUSH_FRACTION))
+        next_tick = time.perf_counter()
+        while self.recording:
+            self.sample()
+            if self.ring.pending() >= flush_size:
+                self.wake.set()
+
+            next_tick += interval
+            now = time.perf_counter()
+            if now > next_tick + interval:
+                missed = int((now - next_tick) / interval)
+                self.missed += missed
+                next_tick += missed * interval
+            elif next_tick > now:
+                time.sleep(next_tick - now)
+
+
+    def sample(self):
+        position, entry = self.target
+        if entry is None:
+            self.offscreen += 1
+            return
+
+        if self.backend is None:
+            self.backend = capture.QtCaptureBackend()
+        half = self.kernel // 2
+        image = self.backend.grab(entry, QRect(position[0] - half, position[1] - half, self.kernel, self.kernel))
+        if image.isNull():
+            self.offscreen += 1
+            return
+        color = capture.sample_color(image, self.kernel, self.median)
+        self.ring.push(time.time(), position[0], position[1], color.red(), color.green(), color.blue())
+
+
+    def write_loop(self):
+        while True:
+            self.wake.wait(FLUSH_INTERVAL)
+            self.wake.clear()
+            draining = self.draining
+            self.write(self.ring.take())
+            if draining:
+                return
+
+
+    def write(self, records):
+        if not len(records):
+            return
+
+        if self.file_format == "bin":
+            self.stream.write(records.tobytes())
+        else:
+            columns = np.column_stack([ records[name] for name in CSV_COLUMNS ])
+            np.savetxt(self.stream, columns, fmt=CSV_FORMAT)
+        self.stream.flush()
+        self.written += len(records)
+
+
+    def statistics(self) -> dict:
+        ring = self.ring
+        return {
+            "recording": self.recording,
+            "rate": self.rate,
+            "samples": ring.pushed if ring is not None else 0,
+            "dropped": ring.dropped if ring is not None else 0,
+            "pending": ring.pending() if ring is not None else 0,
+            "missed": self.missed,
+            "offscreen": self.offscreen,
+            "written": self.written,
+        }
@@ -0,0 +1,81 @@
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QRegion
+from PyQt5.QtCore import QObject, QPoint, QRect, pyqtSignal
+from bisect import bisect_right
+
+
+class ScreenEntry:
+    __slots__ = ("screen", "geometry", "ratio")
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.geometry = screen.geometry()
+        self.ratio = screen.devicePixelRatio()
+
+
+    def local_point(self, x, y) -> QPoint:
+        return QPoint(x - self.geometry.x(), y - self.geometry.y())
+
+
+    def native_point(self, x, y) -> QPoint:
+        return QPoint(self.geometry.x() + int((x - self.geometry.x()) * self.ratio),
+                      self.geometry.y() + int((y - self.geometry.y()) * self.ratio))
+
+
+class ScreenIndex(QObject):
+    changed = pyqtSignal()
+
+    def __init__(self):
+        super(ScreenIndex, self).__init__()
+        self.entries = []
+        self.lefts = []
+        self.max_width = 0
+        self.virtual_rect = QRect()
+        self.region = QRegion()
+        self.last_entry = None
+
+        application = QApplication.instance()
+        application.screenAdded.connect(self.on_screen_added)
+        application.screenRemoved.connect(self.rebuild)
+        for screen in QApplication.screens():
+            self.watch(screen)
+        self.rebuild()
+
+
+    def watch(self, screen):
+        screen.geometryChanged.connect(self.rebuild)
+        screen.logicalDotsPerInchChanged.connect(self.rebuild)
+
+
+    def on_screen_added(self, screen):
+        self.watch(screen)
+        self.rebuild()
+
+
+    def rebuild(self, *args):
+        self.entries = sorted((ScreenEntry(screen) for screen in QApplication.screens()), key=lambda entry: entry.geometry.x())
+        self.lefts = [ entry.geometry.x() for entry in self.entries ]
+        self.max_width = max((entry.geometry.width() for entry in self.entries), default=0)
+        self.virtual_rect = QRect()
+        self.region = QRegion()
+        for entry in self.entries:
+            self.virtual_rect = self.virtual_rect.united(entry.geometry)
+            self.region = self.region.united(entry.geometry)
+        self.last_entry = None
+        self.changed.emit()
+
+
+    def screen_at(self, x, y) -> ScreenEntry:
+        if self.last_entry is not None and self.last_entry.geometry.contains(x, y):
+            return self.last_entry
+
+        i = bisect_right(self.lefts, x)
+        while i > 0:
+            i -= 1
+            entry = self.entries[i]
+            if entry.geometry.x() + self.max_width <= x:
+                break
+            if entry.geometry.contains(x, y):
+                self.last_entry = entry
+                return entry
+        return None
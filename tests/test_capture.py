@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+import numpy as np
+import pytest
+from PyQt5.QtGui import QImage, QPainter, QColor
+import capture
+
+
+GRAB_SCRIPT = """
+import sys, json, time
+import numpy as np
+from PyQt5.QtWidgets import QApplication, QWidget
+from PyQt5.QtGui import QImage, QPainter, QColor
+from PyQt5.QtCore import QRect, Qt
+app = QApplication(sys.argv[:1])
+import capture, screens
+
+
+class Pattern(QWidget):
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        for i in range(8):
+            painter.fillRect(QRect(i * 20, 0, 20, 120), QColor.fromHsv(i * 45, 200, 230))
+
+
+window = Pattern()
+window.setWindowFlags(Qt.WindowType.BypassWindowManagerHint | Qt.WindowType.FramelessWindowHint)
+window.setGeometry(0, 0, 160, 120)
+window.show()
+end = time.time() + 1.0
+while time.time() < end:
+    app.processEvents()
+    time.sleep(0.01)
+
+entry = screens.ScreenIndex().screen_at(10, 10)
+rect = QRect(10, 10, 100, 80)
+backend = capture.XShmCaptureBackend()
+if not backend.available():
+    print(json.dumps({ "skip": "MIT-SHM is not available" }))
+    sys.exit(0)
+
+shm = backend.grab(entry, rect)
+qt = capture.QtCaptureBackend().grab(entry, rect).convertToFormat(QImage.Format.Format_RGB32)
+surface = QImage(shm.size(), QImage.Format.Format_ARGB32_Premultiplied)
+surface.fill(Qt.GlobalColor.transparent)
+painter = QPainter(surface)
+painter.drawImage(0, 0, shm)
+painter.end()
+shm_pixels = capture.image_array(shm)
+qt_pixels = capture.image_array(qt)
+print(json.dumps({
+    "size": [ shm.width(), shm.height() ],
+    "opaque": bool(((shm_pixels.view(np.uint32) >> 24) == 255).all()),
+    "painted_opaque": bool(((capture.image_array(surface).view(np.uint32) >> 24) == 255).all()),
+    "equal": bool((shm_pixels[..., capture.RGB_CHANNELS] == qt_pixels[..., capture.RGB_CHANNELS]).all()),
+}))
+backend.close()
+"""
+
+
+def test_fill_alpha_sets_pad_byte():
+    image = QImage(5, 3, QImage.Format.Format_RGB32)
+    bits = image.bits()
+    bits.setsize(image.sizeInBytes())
+    pixels = np.frombuffer(bits, dtype=np.uint32)
+    pixels[:] = 0x00336699
+    capture.fill_alpha(image)
+
+    assert ((capture.image_array(image).view(np.uint32) >> 24) == 255).all()
+    assert image.pixelColor(2, 1) == QColor(0x33, 0x66, 0x99)
+
+    surface = QImage(5, 3, QImage.Format.Format_ARGB32_Premultiplied)
+    surface.fill(0)
+    painter = QPainter(surface)
+    painter.drawImage(0, 0, image)
+    painter.end()
+    assert surface.pixelColor(4, 2).alpha() == 255
+
+
+@pytest.mark.skipif(shutil.which("Xvfb") is None, reason="Xvfb is not installed")
+def test_xshm_grab_matches_qt_grab_under_xvfb():
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen([ "Xvfb", "-displayfd", str(write_fd), "-screen", "0", "320x240x24", "-nolisten", "tcp" ],
+                              pass_fds=[ write_fd ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    try:
+        with os.fdopen(read_fd) as stream:
+            display = stream.readline().strip()
+        if not display:
+            pytest.skip("Xvfb did not start")
+
+        environment = dict(os.environ, DISPLAY=":" + display, QT_QPA_PLATFORM="xcb",
+                           PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        output = subprocess.run([ sys.executable, "-c", GRAB_SCRIPT ], env=environment, capture_output=True, text=True, timeout=60)
+        assert output.returncode == 0, output.stderr
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        if "skip" in result:
+            pytest.skip(result["skip"])
+
+        assert result["size"] == [ 100, 80 ]
+        assert result["opaque"]
+        assert result["painted_opaque"]
+        assert result["equal"]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def address(image) -> int:
+    return int(image.constBits())
+
+
+def test_image_pool_skips_images_held_by_frames():
+    pool = capture.ImagePool()
+    held = []
+    for _ in range(4):
+        image = pool.get(8, 8)
+        image.fill(QColor(len(held), 0, 0))
+        held.append(QImage(image))
+    assert len({ address(image) for image in held }) == 4
+    assert [ QColor(image.pixel(0, 0)).red() for image in held ] == [ 0, 1, 2, 3 ]
+
+    released = address(held.pop(1))
+    assert address(pool.get(8, 8)) == released
+
+
+def test_frame_buffer_keeps_latest_frame():
+    import time
+    from PyQt5.QtCore import QRect
+    buffer = capture.FrameBuffer()
+    frames = []
+    for i in range(3):
+        request = capture.CaptureRequest((i, 0), QRect(i, 0, 4, 4), None, None, 1, False, time.perf_counter())
+        frames.append(capture.Frame(request, QImage(4, 4, QImage.Format.Format_RGB32), QColor(i, 0, 0)))
+    buffer.publish(frames[0])
+    buffer.publish(frames[1])
+    assert buffer.take() is frames[1]
+    assert buffer.take() is None
+    buffer.publish(frames[2])
+    buffer.reset()
+    assert buffer.take() is None
+    assert (buffer.published, buffer.dropped) == (3, 1)
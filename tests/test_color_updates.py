@@ -0,0 +1,101 @@
+from collections import Counter
+import pytest
+import colors
+
+
+@pytest.fixture
+def window(app):
+    import main
+    window = main.MainWindow(resident=True)
+    window.current_color = colors.Color.from_rgb(200, 100, 50)
+    window.on_color_updated()
+    window.apply_color_update()
+    yield window
+    window.close()
+
+
+def count_mutations(window) -> Counter:
+    mutations = Counter()
+
+    def wrap(widget, method, name):
+        original = getattr(widget, method)
+
+        def counted(*args):
+            mutations[(name, method)] += 1
+            return original(*args)
+        setattr(widget, method, counted)
+
+    for tab in [ window.rgb_tab, window.hsv_tab ]:
+        for i, frame in enumerate(tab.frames):
+            wrap(frame, "set_stops", "{}.frame{}".format(tab.label, i))
+            wrap(frame, "set_indicators", "{}.frame{}".format(tab.label, i))
+        for i, line_edit in enumerate(tab.line_edits):
+            wrap(line_edit, "setText", "{}.edit{}".format(tab.label, i))
+    wrap(window.main_gradient, "set_indicators", "main")
+    wrap(window.hue_gradient, "set_indicators", "hue")
+    for name in [ "hex", "rgb", "rgbf", "hsv", "hsvf" ]:
+        wrap(getattr(window, "values_{}_line_edit".format(name)), "setText", "values.{}".format(name))
+    wrap(window.hex_line_edit, "setText", "hex")
+    return mutations
+
+
+def apply(window, color):
+    window.current_color = color
+    window.on_color_updated()
+    window.apply_color_update()
+
+
+def test_unchanged_color_touches_nothing(window):
+    mutations = count_mutations(window)
+    apply(window, colors.Color.from_rgb(200, 100, 50))
+    assert not mutations
+
+
+def test_value_change_touches_only_dependent_widgets(window):
+    mutations = count_mutations(window)
+    apply(window, colors.Color.from_rgb(160, 80, 40))
+
+    hsv = { key: count for key, count in mutations.items() if key[0].startswith("HSV") }
+    assert hsv == {
+        ("HSV.frame1", "set_stops"): 1,
+        ("HSV.frame2", "set_indicators"): 1,
+        ("HSV.edit2", "setText"): 1,
+    }
+    for i in range(3):
+        assert mutations[("RGB.frame{}".format(i), "set_stops")] == 1
+        assert mutations[("RGB.frame{}".format(i), "set_indicators")] == 1
+        assert mutations[("RGB.edit{}".format(i), "setText")] == 1
+    assert mutations[("main", "set_indicators")] == 1
+    assert mutations[("hue", "set_indicators")] == 1
+    assert all(count == 1 for count in mutations.values())
+
+
+def test_red_change_touches_only_dependent_widgets(window):
+    apply(window, colors.Color.from_rgb(200, 50, 50))
+    mutations = count_mutations(window)
+    apply(window, colors.Color.from_rgb(220, 50, 50))
+
+    rgb = { key: count for key, count in mutations.items() if key[0].startswith("RGB") }
+    assert rgb == {
+        ("RGB.frame1", "set_stops"): 1,
+        ("RGB.frame2", "set_stops"): 1,
+        ("RGB.frame0", "set_indicators"): 1,
+        ("RGB.edit0", "setText"): 1,
+    }
+    assert ("HSV.edit0", "setText") not in mutations
+    assert ("HSV.frame0", "set_indicators") not in mutations
+    assert mutations[("values.hex", "setText")] == 1
+    assert mutations[("hex", "setText")] == 1
+
+
+def test_raw_edit_keeps_other_channels(window):
+    window.raw_check_box.setCheckState(2)
+    window.apply_color_update()
+    window.rgb_tab.line_edits[0].setText("0.5")
+    window.apply_color_update()
+    assert window.current_color.rgb() == (128, 100, 50)
+    assert window.hex_line_edit.text() == "#806432"
+
+    window.hsv_tab.line_edits[1].setText("0.25")
+    window.apply_color_update()
+    assert all(0.0 <= value <= 1.0 for value in window.current_color.rgb_f())
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import colors
+
+
+def srgb_cube(step=1) -> np.ndarray:
+    axis = np.arange(0, 256, step)
+    return np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3).astype(np.uint8)
+
+
+def reference_linear(rgb) -> np.ndarray:
+    c = rgb / 255.0
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+def test_float_constructors_clamp_like_qcolor():
+    assert colors.Color.from_rgb_f(2.0, -1.0, 0.5).rgb16 == (65535, 0, 32768)
+    assert colors.Color.from_hsv_f(1.5, 2.0, -3.0).hsv16 == (35964, 65535, 0)
+    assert colors.Color.from_hsv_f(-1.0, 0.5, 0.5).hsv16 == (colors.ACHROMATIC, 32768, 32768)
+
+
+def test_cbrt_matches_numpy():
+    values = np.concatenate([ np.logspace(-12, 3, 200001), np.random.default_rng(0).random(100000) ])
+    expected = np.cbrt(values)
+    assert np.max(np.abs(colors.cbrt(values) - expected) / expected) < 1e-6
+    assert colors.cbrt(np.zeros(3)).tolist() == [ 0.0, 0.0, 0.0 ]
+
+
+@pytest.mark.parametrize("space", [ colors.LAB_SPACE, colors.OKLCH_SPACE ], ids=lambda space: space.name)
+def test_round_trip_is_exact_for_every_8bit_color(space):
+    for chunk in np.array_split(srgb_cube(), 64):
+        assert np.array_equal(space.to_rgb(space.from_rgb(chunk)), chunk)
+
+
+def test_oklab_matches_float_reference():
+    rgb = srgb_cube(3)
+    expected = np.cbrt(reference_linear(rgb) @ colors.OKLAB_LMS.T) @ colors.OKLAB_LAB.T
+    assert np.max(np.abs(colors.rgb_to_oklab(rgb) - expected)) < 2e-6
+
+    lch = colors.rgb_to_oklch(rgb)
+    assert np.max(np.abs(lch[..., 1] - np.hypot(expected[..., 1], expected[..., 2]))) < 2e-6
+
+
+def test_lab_matches_float_reference():
+    rgb = srgb_cube(3)
+    xyz = reference_linear(rgb) @ colors.SRGB_XYZ.T
+    delta = 6.0 / 29.0
+    f = np.where(xyz > delta ** 3, np.cbrt(xyz), xyz / (3 * delta ** 2) + 4.0 / 29.0)
+    expected = np.stack([ 116.0 * f[..., 1] - 16.0, 500.0 * (f[..., 0] - f[..., 1]), 200.0 * (f[..., 1] - f[..., 2]) ], axis=-1)
+    assert np.max(np.abs(colors.rgb_to_lab(rgb) - expected)) < 5e-4
+
+    white = colors.rgb_to_lab(np.array([ 255, 255, 255 ], dtype=np.uint8))
+    assert np.allclose(white, [ 100.0, 0.0, 0.0 ], atol=1e-3)
+
+
+def qcolor_rgb16(color) -> tuple:
+    rgba64 = color.rgba64()
+    return rgba64.red(), rgba64.green(), rgba64.blue()
+
+
+def qcolor_hsv16(color) -> tuple:
+    hue = color.hsvHueF()
+    return colors.ACHROMATIC if hue == -1 else round(hue * 36000), round(color.hsvSaturationF() * 65535), round(color.valueF() * 65535)
+
+
+def test_from_rgb_matches_qcolor():
+    from PyQt5.QtGui import QColor
+    for red, green, blue in srgb_cube(15).tolist():
+        color = colors.Color.from_rgb(red, green, blue)
+        expected = QColor.fromRgb(red, green, blue)
+        assert color.rgb16 == qcolor_rgb16(expected)
+        assert color.hsv16 == qcolor_hsv16(expected), (red, green, blue)
+
+
+@pytest.mark.parametrize("hue", list(range(0, 361, 15)) + [ 1, 359, -1 ])
+def test_from_hsv_matches_qcolor(hue):
+    from PyQt5.QtGui import QColor
+    for saturation in range(0, 256, 15):
+        for value in range(0, 256, 15):
+            color = colors.Color.from_hsv(hue, saturation, value)
+            expected = QColor.fromHsv(hue if hue == -1 else hue % 360, saturation, value)
+            assert color.rgb16 == qcolor_rgb16(expected), (hue, saturation, value)
+            assert color.hsv16 == qcolor_hsv16(expected), (hue, saturation, value)
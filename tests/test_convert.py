@@ -0,0 +1,24 @@
+import pytest
+import convert
+
+
+def test_parse_colors_rejects_lines_with_wrong_field_count():
+    with pytest.raises(ValueError, match="'10, 20'"):
+        convert.parse_colors([ "10, 20\n", "1,2,3,4\n" ], "rgb")
+
+
+def test_parse_colors_reports_unparsable_line():
+    with pytest.raises(ValueError, match="'4,x,6'"):
+        convert.parse_colors([ "1,2,3\n", "4,x,6\n" ], "rgb")
+
+
+def test_parse_colors_accepts_spaced_values():
+    assert convert.parse_colors([ "10, 20, 30\n", " 1 ,2, 3 \n" ], "rgb").tolist() == [ [ 10, 20, 30 ], [ 1, 2, 3 ] ]
+
+
+def test_parse_colors_wraps_hue_like_color():
+    import colors
+    hues = [ 0, 359, 360, 365, 720, -1, -90 ]
+    parsed = convert.parse_colors([ "{}, 200, 300\n".format(hue) for hue in hues ], "hsv")
+    assert parsed.tolist() == [ list(colors.Color.from_hsv(hue, 200, 255).rgb()) for hue in hues ]
+    assert parsed[2].tolist() == parsed[0].tolist()
@@ -0,0 +1,87 @@
+import os
+import itertools
+import pytest
+import history
+
+
+counter = itertools.count()
+
+
+@pytest.fixture
+def path():
+    path = "{}.{}".format(history.default_path(), next(counter))
+    yield path
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def color(index) -> tuple:
+    return index & 255, (index >> 8) & 255, (index >> 16) & 255
+
+
+def file_records(path) -> int:
+    return (os.path.getsize(path) - history.HEADER.size) // history.RECORD.size
+
+
+def test_append_and_reload(path):
+    store = history.HistoryStore(path)
+    assert store.append((1, 2, 3), history.PICKED, timestamp=10.0)
+    assert not store.append((1, 2, 3), history.EDITED, timestamp=11.0)
+    assert store.append((4, 5, 6), history.EDITED, timestamp=12.0)
+    store.close()
+
+    assert file_records(path) == 2
+    loaded = history.HistoryStore(path)
+    assert len(loaded) == 2
+    assert loaded.record(0) == (10.0, 1, 2, 3, history.PICKED)
+    assert loaded.record(1) == (12.0, 4, 5, 6, history.EDITED)
+
+
+def test_torn_record_is_truncated(path):
+    store = history.HistoryStore(path)
+    store.append((1, 2, 3), history.PICKED, timestamp=10.0)
+    store.close()
+    with open(path, "ab") as stream:
+        stream.write(history.RECORD.pack(11.0, 4, 5, 6, history.PICKED)[:5])
+
+    store = history.HistoryStore(path)
+    assert len(store) == 1
+    store.append((7, 8, 9), history.EDITED, timestamp=12.0)
+    store.close()
+
+    assert file_records(path) == 2
+    assert os.path.getsize(path) == history.HEADER.size + 2 * history.RECORD.size
+    assert [ history.HistoryStore(path).record(i) for i in range(2) ] == [ (10.0, 1, 2, 3, history.PICKED), (12.0, 7, 8, 9, history.EDITED) ]
+
+
+def test_compaction_keeps_newest_records(path):
+    store = history.HistoryStore(path)
+    total = int(history.MAX_RECORDS * (1 + history.COMPACT_SLACK)) + 1
+    for index in range(total):
+        store.append(color(index), history.PICKED, timestamp=float(index))
+    store.close()
+
+    assert store.compactions == 1
+    assert history.MAX_RECORDS <= file_records(path) < total
+    assert len(store) == file_records(path)
+    assert store.recent == []
+    assert store.record(0)[0] == total - len(store)
+    assert store.record(len(store) - 1) == (float(total - 1),) + color(total - 1) + (history.PICKED,)
+
+    loaded = history.HistoryStore(path)
+    assert len(loaded) == len(store)
+    assert loaded.record(0) == store.record(0)
+
+
+def test_model_rebases_after_compaction(app, path):
+    model = history.HistoryModel(history.HistoryStore(path, max_records=10))
+    resets = []
+    model.modelReset.connect(lambda: resets.append(True))
+    for index in range(16):
+        model.add(color(index), history.PICKED)
+    model.store.close()
+    app.processEvents()
+
+    assert resets
+    assert model.rowCount() == file_records(path) == 10
+    assert model.entry(0)[1:4] == color(15)
@@ -0,0 +1,52 @@
+import os
+import numpy as np
+import pytest
+import history
+import instrumentation
+
+
+@pytest.mark.parametrize("count", [ 1, 100, instrumentation.RING_SIZE, 3000 ])
+def test_ring_buffer_percentiles(count):
+    ring = instrumentation.RingBuffer()
+    values = np.random.default_rng(count).exponential(0.002, count)
+    for value in values:
+        ring.add(value)
+
+    kept = values[-instrumentation.RING_SIZE:] * 1000.0
+    statistics = ring.statistics()
+    assert statistics["calls"] == count
+    assert [ statistics["p{}_ms".format(p)] for p in instrumentation.PERCENTILES ] == pytest.approx(np.percentile(kept, instrumentation.PERCENTILES).tolist())
+    assert statistics["max_ms"] == pytest.approx(kept.max())
+
+
+def test_empty_ring_buffer():
+    assert instrumentation.RingBuffer().statistics() == { "calls": 0 }
+
+
+class Worker:
+
+    def work(self, value):
+        return value * 2
+
+
+def test_methods_are_patched_on_enable(monkeypatch):
+    original = Worker.work
+    monkeypatch.setattr(Worker, "work", original)
+    monkeypatch.setattr(instrumentation, "enabled", False)
+    monkeypatch.setattr(instrumentation, "registered", [])
+    monkeypatch.setattr(instrumentation, "timings", {})
+    monkeypatch.setattr(instrumentation, "dump_path", None)
+    monkeypatch.setattr(instrumentation, "dump_periodically", lambda: None)
+    monkeypatch.setattr("atexit.register", lambda func: func)
+
+    instrumentation.instrument_class(Worker, [ "work" ])
+    assert Worker.work is original
+    assert Worker().work(2) == 4
+    assert instrumentation.timings == {}
+
+    instrumentation.enable(os.path.join(os.path.dirname(history.default_path()), "timings.json"))
+    assert Worker.work is not original
+    assert Worker().work(3) == 6
+    assert instrumentation.statistics()["Worker.work"]["calls"] == 1
+    instrumentation.dump()
+    assert os.path.exists(instrumentation.dump_path)
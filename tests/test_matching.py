@@ -0,0 +1,48 @@
+import time
+import numpy as np
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import QRect
+import capture
+import matching
+
+
+class BrokenBackend(capture.CaptureBackend):
+
+    def grab(self, entry, rect) -> QImage:
+        raise RuntimeError("grab failed")
+
+
+class Entry:
+    geometry = QRect(0, 0, 8, 4)
+    ratio = 1.0
+
+
+def wait_for(app, results, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not results and time.perf_counter() < deadline:
+        app.processEvents()
+    return results
+
+
+def test_match_images_counts_pixels_within_tolerance():
+    pixels = np.zeros((4, 8, 4), dtype=np.uint8)
+    pixels[..., capture.RGB_CHANNELS] = (10, 20, 30)
+    pixels[1:2, 2:5, capture.RGB_CHANNELS] = (200, 100, 50)
+    pixels[3:4, 7:8, capture.RGB_CHANNELS] = (204, 96, 52)
+    image = QImage(pixels.data, 8, 4, 32, QImage.Format.Format_RGB32).copy()
+
+    with matching.ThreadPoolExecutor(max_workers=2) as pool:
+        [ (target, count) ] = matching.match_images(pool, [ image ], (200, 100, 50), 4, 0xFF00FF00)
+        assert count == 4
+        assert np.count_nonzero(target) == 4
+        [ (_, count) ] = matching.match_images(pool, [ image ], (200, 100, 50), 0, 0xFF00FF00)
+        assert count == 3
+
+
+def test_unexpected_errors_are_reported(app):
+    finder = matching.MatchFinder(workers=1, backend=BrokenBackend())
+    failures = []
+    finder.failed.connect(failures.append)
+    finder.find([ Entry() ], (1, 2, 3), 8)
+    assert wait_for(app, failures) == [ "grab failed" ]
+    finder.shutdown()
@@ -0,0 +1,54 @@
+import os
+import numpy as np
+import pytest
+import colors
+import history
+import names
+
+
+def random_entries(count, seed, high=256) -> list:
+    rng = np.random.default_rng(seed)
+    return [ ("color{}".format(i), tuple(int(value) for value in rgb)) for i, rgb in enumerate(rng.integers(0, high, (count, 3))) ]
+
+
+def exhaustive_distance(index, rgb) -> float:
+    point = colors.rgb_to_oklab(np.array([ rgb ], dtype=np.uint8))[0]
+    return float(np.sqrt(((index.lab - point) ** 2).sum(axis=1).min()))
+
+
+@pytest.mark.parametrize("count, clustered", [ (1, 0), (7, 0), (500, 0), (5000, 0), (50, 3000), (5, 5000) ])
+def test_find_nearest_matches_exhaustive_search(count, clustered):
+    index = names.NameIndex.build(random_entries(count, count) + random_entries(clustered, clustered, 48))
+    rng = np.random.default_rng(count + 1)
+    for rgb in rng.integers(0, 256, (300, 3)).tolist() + [ [ 0, 0, 0 ], [ 255, 255, 255 ] ]:
+        name, found, distance = index.find_nearest(*rgb)
+        assert distance == pytest.approx(exhaustive_distance(index, rgb), abs=1e-6)
+        assert index.names[index.rgb.tolist().index(list(found))] == name
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("255 250 250\t\tsnow", ("snow", (255, 250, 250))),
+    ("248 248 255\t\tghost white", ("ghost white", (248, 248, 255))),
+    (" 25  25 112\t\tmidnight blue", ("midnight blue", (25, 25, 112))),
+    ("250 250 210\t\tlight goldenrod yellow", ("light goldenrod yellow", (250, 250, 210))),
+    ("#FF8000 deep safety orange", ("deep safety orange", (255, 128, 0))),
+    ("! $Xorg: rgb.txt $", None),
+    ("", None),
+])
+def test_parse_line(line, expected):
+    assert names.parse_line(line) == expected
+
+
+def test_cache_round_trip():
+    index = names.NameIndex.build(random_entries(300, 3) + [ ("ghost white", (248, 248, 255)) ])
+    path = os.path.join(os.path.dirname(history.default_path()), "names", "index.npz")
+    index.save(path)
+    loaded = names.NameIndex.load(path)
+
+    assert len(loaded) == len(index)
+    assert loaded.names.tolist() == index.names.tolist()
+    assert np.array_equal(loaded.rgb, index.rgb)
+    assert np.array_equal(loaded.lab, index.lab)
+    assert (loaded.lower, loaded.cell_size, loaded.shape, loaded.cell_start) == (index.lower, index.cell_size, index.shape, index.cell_start)
+    assert loaded.find_nearest(248, 248, 254) == index.find_nearest(248, 248, 254)
+    assert loaded.find_nearest(248, 248, 255)[:2] == ("ghost white", (248, 248, 255))
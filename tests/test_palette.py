@@ -0,0 +1,29 @@
+import time
+import numpy as np
+import palette
+
+
+def wait_for(app, results, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not results and time.perf_counter() < deadline:
+        app.processEvents()
+    return results
+
+
+def test_extract_finds_dominant_colors():
+    pixels = np.zeros((100, 3), dtype=np.uint8)
+    pixels[:70] = (200, 30, 40)
+    pixels[70:] = (20, 120, 200)
+    for method in palette.METHODS:
+        colors = palette.extract(pixels, 2, method)
+        assert [ rgb for rgb, _ in colors ] == [ (200, 30, 40), (20, 120, 200) ]
+        assert [ round(fraction, 2) for _, fraction in colors ] == [ 0.7, 0.3 ]
+
+
+def test_unexpected_errors_are_reported(app):
+    extractor = palette.PaletteExtractor(workers=1)
+    failures = []
+    extractor.failed.connect(lambda source, message: failures.append(message))
+    extractor.extract(None, 2, "median-cut")
+    assert len(wait_for(app, failures)) == 1
+    extractor.shutdown()
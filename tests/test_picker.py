@@ -0,0 +1,88 @@
+import enum
+import pytest
+from PyQt5.QtCore import Qt
+
+
+class Key(enum.Enum):
+    left = 1
+    shift = 2
+    enter = 3
+    esc = 4
+
+
+class KeyCode:
+
+    def __init__(self, char):
+        self.char = char
+
+
+@pytest.fixture
+def window(app):
+    import picker
+    window = picker.PickerWindow(None)
+    window.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen, True)
+    window.show()
+    window.running = True
+    yield window
+    window.close()
+
+
+@pytest.mark.parametrize("key", [ Key.left, Key.shift, Key.enter, KeyCode("r"), KeyCode("F"), KeyCode("+") ])
+def test_pynput_release_keeps_picking(window, key):
+    window.on_pynput_key_release(key)
+    assert window.running
+
+
+@pytest.mark.parametrize("key", [ Key.esc, KeyCode("q") ])
+def test_pynput_release_cancels(window, key):
+    window.on_pynput_key_release(key)
+    assert not window.running
+
+
+def send_key(app, window, key, modifiers=Qt.KeyboardModifier.NoModifier, text=""):
+    from PyQt5.QtGui import QKeyEvent
+    from PyQt5.QtCore import QEvent
+    app.sendEvent(window, QKeyEvent(QEvent.Type.KeyPress, key, modifiers, text))
+
+
+@pytest.mark.parametrize("key", [ Qt.Key.Key_Shift, Qt.Key.Key_Control, Qt.Key.Key_Alt, Qt.Key.Key_Meta, Qt.Key.Key_CapsLock ])
+def test_modifier_press_keeps_picking(app, window, key):
+    send_key(app, window, key)
+    assert window.running
+    assert window.isVisible()
+
+
+def test_shift_arrow_nudges_by_ten(app, window):
+    from PyQt5.QtGui import QCursor
+    QCursor.setPos(200, 200)
+    send_key(app, window, Qt.Key.Key_Shift)
+    send_key(app, window, Qt.Key.Key_Right, Qt.KeyboardModifier.ShiftModifier)
+    assert window.running
+    assert window.isVisible()
+    assert QCursor.pos().x() == 210
+
+
+def test_ctrl_wheel_toggles_median(app, window):
+    from PyQt5.QtGui import QWheelEvent
+    from PyQt5.QtCore import QPoint, QPointF
+    median = window.capture.median
+    kernel = window.capture.kernel
+    send_key(app, window, Qt.Key.Key_Control)
+    for expected in [ not median, median ]:
+        app.sendEvent(window, QWheelEvent(QPointF(5, 5), QPointF(5, 5), QPoint(), QPoint(0, 120), Qt.MouseButton.NoButton,
+                                          Qt.KeyboardModifier.ControlModifier, Qt.ScrollPhase.NoScrollPhase, False))
+        assert window.running
+        assert window.capture.median == expected
+        assert window.recorder.median == expected
+    assert window.capture.kernel == kernel
+
+
+def test_shift_plus_steps_tolerance(app, window):
+    import matching
+    tolerance = window.match_tolerance
+    send_key(app, window, Qt.Key.Key_Shift)
+    send_key(app, window, Qt.Key.Key_Plus, Qt.KeyboardModifier.ShiftModifier, "+")
+    assert window.running
+    assert window.match_tolerance == matching.step_tolerance(tolerance, 1)
+    send_key(app, window, Qt.Key.Key_Minus, text="-")
+    assert window.match_tolerance == tolerance
@@ -0,0 +1,86 @@
+import os
+import time
+import numpy as np
+import pytest
+from PyQt5.QtGui import QImage, QColor
+import history
+import recording
+
+
+class SolidBackend:
+
+    def grab(self, entry, rect):
+        image = QImage(rect.width(), rect.height(), QImage.Format.Format_RGB32)
+        image.fill(QColor(10, 20, 30))
+        return image
+
+
+def directory() -> str:
+    return os.path.join(os.path.dirname(history.default_path()), "recordings")
+
+
+def push(ring, start, count) -> list:
+    return [ ring.push(float(i), i, -i, i & 255, 1, 2) for i in range(start, start + count) ]
+
+
+def test_ring_drops_when_full():
+    ring = recording.SampleRing(8)
+    assert push(ring, 0, 10) == [ True ] * 8 + [ False ] * 2
+    assert ring.dropped == 2
+    assert ring.pending() == 8
+    assert ring.take()["x"].tolist() == list(range(8))
+    assert ring.pending() == 0
+    assert len(ring.take()) == 0
+
+
+def test_ring_take_keeps_order_across_wrap():
+    ring = recording.SampleRing(8)
+    push(ring, 0, 5)
+    assert ring.take()["x"].tolist() == list(range(5))
+    push(ring, 5, 7)
+    records = ring.take()
+    assert records["x"].tolist() == list(range(5, 12))
+    assert records["time"].tolist() == [ float(i) for i in range(5, 12) ]
+    assert records["y"].tolist() == [ -i for i in range(5, 12) ]
+    assert ring.dropped == 0
+
+
+def record(app, file_format) -> recording.Recorder:
+    recorder = recording.Recorder(rate=200, backend=SolidBackend())
+    recorder.start_recording(((12, 34), object()), kernel=3, directory=directory(), file_format=file_format)
+    deadline = time.monotonic() + 5.0
+    while recorder.ring.pushed < 20 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    recorder.stop_recording()
+    return recorder
+
+
+def test_binary_recording_round_trip(app):
+    recorder = record(app, "bin")
+    records = recording.read_binary(recorder.path)
+    assert len(records) == recorder.written == recorder.ring.pushed >= 20
+    assert set(records["x"].tolist()) == { 12 }
+    assert set(records["y"].tolist()) == { 34 }
+    assert set(zip(records["red"].tolist(), records["green"].tolist(), records["blue"].tolist())) == { (10, 20, 30) }
+    assert np.all(np.diff(records["time"]) >= 0)
+
+
+def test_csv_recording(app):
+    recorder = record(app, "csv")
+    with open(recorder.path) as stream:
+        lines = stream.read().splitlines()
+    assert lines[0] == ",".join(recording.CSV_COLUMNS)
+    assert len(lines) - 1 == recorder.written == recorder.ring.pushed >= 20
+    for line in lines[1:]:
+        timestamp, *values = line.split(",")
+        assert float(timestamp) == pytest.approx(time.time(), abs=60)
+        assert values == [ "12", "34", "10", "20", "30" ]
+
+
+def test_read_binary_rejects_other_files():
+    path = os.path.join(directory(), "not-a-recording.bin")
+    os.makedirs(directory(), exist_ok=True)
+    with open(path, "wb") as stream:
+        stream.write(b"\0" * 64)
+    with pytest.raises(ValueError):
+        recording.read_binary(path)